@@ -26,17 +26,30 @@ from .forms import (
     ContactForm,
 )
 
-try:
-    from deepface import DeepFace
-except ImportError:
-    DeepFace = None
-
-try:
-    import cv2
-    import numpy as np
-except ImportError:
-    cv2 = None
-    np = None
+
+def _faces_match(captured_b64, stored_b64):
+    """
+    Compare the login snapshot with the registered photo using DeepFace.
+    Returns True when verification is unavailable (DeepFace/OpenCV missing)
+    or fails to run; the libraries are imported on first use.
+    """
+    try:
+        from deepface import DeepFace
+        import cv2
+        import numpy as np
+    except ImportError:
+        return True
+    try:
+        nparr1 = np.frombuffer(base64.b64decode(captured_b64), np.uint8)
+        nparr2 = np.frombuffer(base64.b64decode(stored_b64), np.uint8)
+        im1 = cv2.imdecode(nparr1, cv2.IMREAD_COLOR)
+        im2 = cv2.imdecode(nparr2, cv2.IMREAD_COLOR)
+        if im1 is not None and im2 is not None:
+            result = DeepFace.verify(im1, im2, enforce_detection=False)
+            return bool(result.get("verified", False))
+    except Exception:
+        pass
+    return True
 
 # Placeholder base64 image when user does not capture photo
 PLACEHOLDER_IMAGE_B64 = (
@@ -183,17 +196,8 @@ def login_view(request):
                 return render(request, "login.html", {"form": form})
 
             verified = True
-            if DeepFace and user.user_image and imgdata1 and cv2 is not None and np is not None:
-                try:
-                    nparr1 = np.frombuffer(base64.b64decode(imgdata1), np.uint8)
-                    nparr2 = np.frombuffer(base64.b64decode(user.user_image), np.uint8)
-                    im1 = cv2.imdecode(nparr1, cv2.IMREAD_COLOR)
-                    im2 = cv2.imdecode(nparr2, cv2.IMREAD_COLOR)
-                    if im1 is not None and im2 is not None:
-                        result = DeepFace.verify(im1, im2, enforce_detection=False)
-                        verified = bool(result.get("verified", False))
-                except Exception:
-                    pass
+            if user.user_image and imgdata1:
+                verified = _faces_match(imgdata1, user.user_image)
 
             if not verified:
                 messages.error(request, "Face verification failed. Please try again.")
@@ -0,0 +1,192 @@
+"""
+Async variants of the proctoring endpoints, for ASGI deployments
+(``PROCTORING_ASYNC_VIEWS = True`` with e.g. ``uvicorn quizapp.asgi:application``).
+
+A request waiting on the detector or the database no longer holds a worker
+thread: the event loop keeps serving other connections while
+
+* frame scoring (decode, inference, rules) runs on a bounded thread pool of
+  ``PROCTORING_ASYNC_WORKERS`` threads; once ``PROCTORING_ASYNC_MAX_PENDING``
+  frames are waiting for it, further frames are answered ``busy`` at once
+  instead of queueing without limit, and
+* ORM work goes through ``sync_to_async``.
+
+The request handling itself is shared with the sync views in ``views``.
+"""
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.db import close_old_connections
+from django.http import JsonResponse
+
+from . import views
+from .scoring import TAB_SWITCH_EVENT, record_violations
+
+
+class _BoundedExecutor:
+    """Thread pool that turns work away once ``max_pending`` jobs are queued or running."""
+
+    def __init__(self, workers, max_pending):
+        self.workers = max(1, int(workers))
+        self.max_pending = max(self.workers, int(max_pending))
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+
+    def try_acquire(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                return False
+            self._pending += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn, *args):
+        """Run ``fn(*args)`` on the pool; the caller must hold a slot (``try_acquire``)."""
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor(), partial(_job, fn, *args))
+        finally:
+            self.release()
+
+    def _executor(self):
+        # Pool threads do not survive a fork
+        pid = os.getpid()
+        if self._pool is None or self._pid != pid:
+            with self._lock:
+                if self._pool is None or self._pid != pid:
+                    self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="proctoring")
+                    self._pid = pid
+        return self._pool
+
+
+def _job(fn, *args):
+    # Pool threads are not request threads: drop their connections like a request would
+    try:
+        return fn(*args)
+    finally:
+        close_old_connections()
+
+
+EXECUTOR = _BoundedExecutor(
+    workers=getattr(settings, 'PROCTORING_ASYNC_WORKERS', None) or min(8, os.cpu_count() or 1),
+    max_pending=getattr(settings, 'PROCTORING_ASYNC_MAX_PENDING', 64),
+)
+
+
+def _busy():
+    return JsonResponse({'status': 'busy', 'alert': None, 'score': 0})
+
+
+def _resolve_user(request):
+    # Touching request.user loads the session and user from the database
+    user = request.user
+    return user if user.is_authenticated else None
+
+
+def async_login_required(view):
+    """``login_required`` + ``csrf_exempt`` for async views; the view receives the resolved user."""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await sync_to_async(_resolve_user)(request)
+        if user is None:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, user, *args, **kwargs)
+
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+@async_login_required
+async def video_feed_view(request, user):
+    """Async ``views.video_feed_view``."""
+    if request.method != 'POST':
+        return JsonResponse({'status': 'processed'})
+    try:
+        image_data = request.POST.get('data[imgData]')
+        voice_db = request.POST.get('data[voice_db]')
+        test_id = request.POST.get('data[testid]')
+        if not image_data:
+            return JsonResponse({'status': 'no_image'})
+
+        frame = views.Frame.from_base64(image_data)
+        if views.FRAME_QUEUE is not None:
+            # Reads the session total from the database before the first verdict
+            return await sync_to_async(views._queue_frame)(user, test_id, frame, voice_db)
+
+        if not EXECUTOR.try_acquire():
+            return _busy()
+        return JsonResponse(await EXECUTOR.run(views._score_frame, user, test_id, frame, voice_db))
+
+    except Exception as e:
+        print(f"Monitoring error: {e}")
+        return JsonResponse({'status': 'error', 'message': str(e)})
+
+
+@async_login_required
+async def process_scan_frame(request, user):
+    """Async ``views.process_scan_frame``."""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid method'}, status=405)
+    try:
+        data = json.loads(request.body)
+        image_data = data.get('image')
+        test_id = data.get('test_id')
+        if not image_data or not test_id:
+            return JsonResponse({'error': 'Missing data'}, status=400)
+
+        if not EXECUTOR.try_acquire():
+            return JsonResponse({'error': 'Busy, retry shortly'}, status=503)
+        return JsonResponse(await EXECUTOR.run(views._scan_frame, user, test_id, image_data))
+
+    except Exception as e:
+        print(f"Scan processing error: {e}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@async_login_required
+async def window_event_view(request, user):
+    """Async ``views.window_event_view``."""
+    if request.method == 'POST':
+        test_id = request.POST.get('testid')
+        await sync_to_async(record_violations)(user, test_id, [TAB_SWITCH_EVENT])
+        return JsonResponse({'status': 'logged'})
+    return JsonResponse({'status': 'ignored'})
+
+
+async def check_environment_view(request):
+    """Async ``views.check_environment_view``."""
+    try:
+        # A stat() and, when the file changed, a small JSON read
+        snapshot = views.ENVIRONMENT_PROBE.snapshot()
+        if snapshot is None:
+            return JsonResponse({'is_safe': True, 'pending': True, 'checks': {}})
+
+        if not snapshot['is_safe']:
+            user = await sync_to_async(_resolve_user)(request)
+            if user is not None:
+                test_id = request.POST.get('test_id') or request.GET.get('test_id') or 'SYSTEM_CHECK'
+                await sync_to_async(views._record_environment_violation)(user, test_id, snapshot['checks'])
+
+        return JsonResponse({
+            'is_safe': snapshot['is_safe'],
+            'checks': snapshot['checks'],
+            'checked_at': snapshot['checked_at'],
+        })
+
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+check_environment_view.csrf_exempt = True
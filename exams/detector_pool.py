@@ -0,0 +1,392 @@
+"""
+Out-of-process object detector pool.
+
+A dedicated set of detector processes (started with
+``python manage.py run_detector_pool``) holds the only copies of the YOLO
+model. Web workers stay small: they write each decoded frame into a
+``multiprocessing.shared_memory`` ring they own and send the pool just the
+slot coordinates over a ``multiprocessing.connection``. Detector processes
+map the same slot as a NumPy array without copying it, run a batched forward
+pass over whatever frames are waiting, and send back compact detection
+arrays.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from multiprocessing import get_context, resource_tracker, shared_memory
+from multiprocessing.connection import Client, Listener
+
+from .inference import Detections
+
+
+def parse_address(address):
+    """``"host:port"`` -> ``(host, port)``; anything else is a Unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return (host or "127.0.0.1", int(port))
+    return address
+
+
+def pool_authkey():
+    """Shared secret for pool connections (DETECTOR_POOL_AUTHKEY or SECRET_KEY)."""
+    from django.conf import settings
+
+    key = getattr(settings, "DETECTOR_POOL_AUTHKEY", None) or settings.SECRET_KEY
+    return key.encode() if isinstance(key, str) else key
+
+
+# ---------------------------------------------------------------------------
+# Detector side
+# ---------------------------------------------------------------------------
+
+def _attach(segments, name):
+    shm = segments.get(name)
+    if shm is None:
+        shm = shared_memory.SharedMemory(name=name)
+        # The web worker owns the segment; stop this process's resource
+        # tracker from unlinking it when the detector exits.
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        segments[name] = shm
+    return shm
+
+
+def _detector_main(task_queue, result_queue, max_batch_size):
+    """Entry point of one detector process."""
+    import django
+    import numpy as np
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "quizapp.settings")
+    django.setup()
+    # Only the detector functions: importing exams.views would also build
+    # the web workers' queues, trackers and probes in every detector.
+    from exams.detectors import load_detector, predict_with, warm_up
+
+    try:
+        model = load_detector()
+        warm_up(model)
+    except Exception as e:
+        print(f"Detector {os.getpid()} could not load the model: {e}")
+        model = None
+    result_queue.put(("ready", os.getpid(), dict(getattr(model, "names", None) or {})))
+
+    segments = {}
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        batch = [task]
+        while len(batch) < max_batch_size:
+            try:
+                task = task_queue.get_nowait()
+            except queue.Empty:
+                break
+            if task is None:
+                task_queue.put(None)
+                break
+            batch.append(task)
+        # Lets the pool answer these requests if this process dies
+        result_queue.put(("batch", os.getpid(), [task[0] for task in batch]))
+
+        frames = []
+        for _, name, offset, shape, _ in batch:
+            shm = _attach(segments, name)
+            frames.append(np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset))
+        conf = min(task[4] for task in batch)
+        try:
+            if model is None:
+                raise RuntimeError("Detector model is not loaded")
+            outputs = predict_with(model, frames, conf)
+            for (req_id, _, _, _, task_conf), detections in zip(batch, outputs):
+                detections = detections.filter(task_conf)
+                result_queue.put(("ok", req_id, detections.class_ids, detections.confidences, detections.boxes))
+        except Exception as e:
+            for task in batch:
+                result_queue.put(("error", task[0], str(e)))
+        # Drop the views before the next batch so segments can be closed.
+        del frames
+
+    for shm in segments.values():
+        shm.close()
+
+
+class DetectorPool:
+    """Server half: N detector processes behind a connection listener."""
+
+    def __init__(self, address, workers=2, authkey=b"", max_batch_size=8):
+        self.address = parse_address(address) if isinstance(address, str) else address
+        self.workers = max(1, int(workers))
+        self.authkey = authkey
+        self.max_batch_size = max_batch_size
+        self.names = {}
+        self._ctx = get_context("spawn")
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._processes = []
+        self._running = {}
+        self._closing = False
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._next_id = 0
+
+    def _start_detector(self):
+        process = self._ctx.Process(
+            target=_detector_main,
+            args=(self._tasks, self._results, self.max_batch_size),
+            daemon=True,
+        )
+        process.start()
+        self._processes.append(process)
+
+    def serve_forever(self):
+        for _ in range(self.workers):
+            self._start_detector()
+
+        # Wait until every detector has loaded its model before accepting work.
+        ready = 0
+        while ready < self.workers:
+            message = self._results.get()
+            if message[0] == "ready":
+                ready += 1
+                self.names = message[2] or self.names
+        print(f"Detector pool ready: {self.workers} worker(s) on {self.address}")
+
+        threading.Thread(target=self._route_results, name="detector-router", daemon=True).start()
+        with Listener(self.address, authkey=self.authkey) as listener:
+            try:
+                while True:
+                    conn = listener.accept()
+                    threading.Thread(target=self._serve_client, args=(conn,), daemon=True).start()
+            finally:
+                self.shutdown()
+
+    def shutdown(self):
+        self._closing = True
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+
+    def _serve_client(self, conn):
+        try:
+            conn.send(("hello", self.names))
+            while True:
+                _, name, offset, shape, conf = conn.recv()
+                with self._pending_lock:
+                    self._next_id += 1
+                    req_id = self._next_id
+                    self._pending[req_id] = conn
+                self._tasks.put((req_id, name, offset, shape, conf))
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def _route_results(self):
+        next_check = time.monotonic()
+        while True:
+            if time.monotonic() >= next_check:
+                self._replace_dead_detectors()
+                next_check = time.monotonic() + 1.0
+            try:
+                message = self._results.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            if message[0] == "ready":
+                continue
+            if message[0] == "batch":
+                self._running[message[1]] = message[2]
+                continue
+            self._reply(message)
+
+    def _reply(self, message):
+        with self._pending_lock:
+            conn = self._pending.pop(message[1], None)
+        if conn is None:
+            return
+        try:
+            conn.send(message)
+        except (EOFError, OSError):
+            pass
+
+    def _replace_dead_detectors(self):
+        """Fail the requests a crashed detector held (freeing their slots) and start a new one."""
+        for process in list(self._processes):
+            if self._closing or process.is_alive():
+                continue
+            self._processes.remove(process)
+            for req_id in self._running.pop(process.pid, ()):
+                self._reply(("error", req_id, "Detector process exited"))
+            print(f"Detector {process.pid} exited ({process.exitcode}); starting a new one")
+            self._start_detector()
+
+
+# ---------------------------------------------------------------------------
+# Web worker side
+# ---------------------------------------------------------------------------
+
+class DetectorClient:
+    """
+    Client half used by web workers.
+
+    Each process owns one shared-memory ring of ``slots`` frames of up to
+    ``slot_bytes`` each; a frame larger than a slot is downscaled to fit.
+    Each thread keeps its own connection so concurrent requests do not
+    serialize on a socket.
+
+    A request that times out may still be queued or running in the pool, so
+    its slot is quarantined, together with its connection, until the late
+    reply arrives or the connection is lost; only then is the slot written
+    again.
+    """
+
+    def __init__(self, address, authkey=b"", slots=4, slot_bytes=1280 * 720 * 3, timeout=10.0):
+        self.address = parse_address(address) if isinstance(address, str) else address
+        self.authkey = authkey
+        self.slots = max(1, int(slots))
+        self.slot_bytes = int(slot_bytes)
+        self.timeout = timeout
+        self.names = {}
+        self._lock = threading.Lock()
+        self._reaping = threading.Lock()
+        self._local = threading.local()
+        self._pid = None
+        self._shm = None
+        self._free = None
+        self._quarantined = {}
+
+    def detect(self, frame, conf=0.25):
+        """Detect objects in a BGR ``uint8`` frame of shape ``(H, W, 3)``."""
+        import numpy as np
+
+        frame = self._fit(frame)
+        shm, free = self._ring()
+        slot = self._acquire(free)
+        try:
+            offset = slot * self.slot_bytes
+            view = np.ndarray(frame.shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+            view[...] = frame
+            del view
+            conn = self._connection()
+            # Reconnect on the next call whatever happens to this request
+            self._local.conn = None
+            try:
+                conn.send(("detect", shm.name, offset, frame.shape, conf))
+                if not conn.poll(self.timeout):
+                    with self._lock:
+                        self._quarantined[slot] = conn
+                    slot = None
+                    raise TimeoutError("Detector pool did not answer in time")
+                message = conn.recv()
+            except TimeoutError:
+                raise
+            except Exception:
+                conn.close()
+                raise
+            self._local.conn = conn
+        finally:
+            if slot is not None:
+                free.put(slot)
+        if message[0] != "ok":
+            raise RuntimeError(f"Detector pool error: {message[2]}")
+        _, _, class_ids, confidences, boxes = message
+        return Detections(class_ids, confidences, boxes, self.names)
+
+    def _acquire(self, free):
+        """A free slot, waiting up to ``timeout`` for quarantined slots to be released."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            self._release_quarantined(free)
+            try:
+                return free.get(timeout=min(0.05, max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError("No free detector slot")
+
+    def _release_quarantined(self, free):
+        """Return slots whose timed-out request has been answered (or lost) to ``free``."""
+        # One thread at a time reads the quarantined connections
+        if not self._quarantined or not self._reaping.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                quarantined = list(self._quarantined.items())
+            for slot, conn in quarantined:
+                try:
+                    if not conn.poll(0):
+                        continue
+                    conn.recv()  # the late reply, no longer wanted
+                except (EOFError, OSError):
+                    pass  # connection lost: the pool no longer holds the request
+                conn.close()
+                with self._lock:
+                    del self._quarantined[slot]
+                free.put(slot)
+        finally:
+            self._reaping.release()
+
+    def _fit(self, frame):
+        import numpy as np
+
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        if frame.nbytes <= self.slot_bytes:
+            return frame
+        import cv2
+
+        scale = (self.slot_bytes / frame.nbytes) ** 0.5
+        h, w = frame.shape[:2]
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        return np.ascontiguousarray(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+
+    def _ring(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+                    free = queue.Queue()
+                    for slot in range(self.slots):
+                        free.put(slot)
+                    atexit.register(_release_segment, shm)
+                    self._shm, self._free = shm, free
+                    self._quarantined = {}
+                    self._local = threading.local()
+                    self._pid = pid
+        return self._shm, self._free
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, authkey=self.authkey)
+            _, names = conn.recv()
+            # Every connection sends its own copy; keep one dict per client
+            if names and names != self.names:
+                self.names = names
+            self._local.conn = conn
+        return conn
+
+
+def _release_segment(shm):
+    try:
+        shm.close()
+        shm.unlink()
+    except Exception:
+        pass
+
+
+def get_detector_client():
+    """Return a :class:`DetectorClient` if ``DETECTOR_POOL_ADDRESS`` is configured, else ``None``."""
+    from django.conf import settings
+
+    address = getattr(settings, "DETECTOR_POOL_ADDRESS", None)
+    if not address:
+        return None
+    return DetectorClient(
+        address,
+        authkey=pool_authkey(),
+        slots=getattr(settings, "DETECTOR_POOL_SLOTS", 4),
+    )
@@ -0,0 +1,87 @@
+"""
+Loading and running the YOLO object detector.
+
+Plain functions with no import-time side effects, shared by the web views
+(through the model registry), the detector pool processes and the
+benchmark/quantize commands.
+"""
+from django.conf import settings
+
+from .inference import Detections
+
+
+def load_yolo():
+    """Load the ultralytics YOLO model; returns it or raises."""
+    # ultralytics (and torch) are imported when the model is first loaded,
+    # not when this module is
+    try:
+        from ultralytics import YOLO
+    except ImportError:
+        print("Warning: ultralytics not installed. Object detection will not work.")
+        raise
+    try:
+        # First try to load the user's custom model
+        # We assume it might be a .pt file renamed to .pkl or a pickle
+        model_path = 'yolov8n/data.pkl'
+        print(f"Attempting to load custom model: {model_path}")
+        
+        try:
+            # Try loading as standard YOLO model
+            model = YOLO(model_path)
+            # Test if it's valid by checking names
+            if not hasattr(model, 'names') or not model.names:
+                 raise ValueError("Model loaded but has no class names")
+            print("Custom YOLOv8 Model loaded successfully")
+        except Exception as e:
+            print(f"YOLO(path) failed ({e}). Trying pickle...")
+            import pickle
+            with open(model_path, 'rb') as f:
+                # Logic: If it's a pickled model object
+                model = pickle.load(f)
+            
+            print("Custom Model loaded via pickle")
+        return model
+
+    except Exception as e:
+        print(f"Error loading custom model: {e}")
+        print("FALLBACK: Loading standard 'yolov8n.pt' model...")
+        # Fallback to standard yolov8n which detects COCO classes
+        # (person, bicycle, car, ..., backpack, umbrella, ..., handbag, tie, suitcase, frisbee, skis, snowboard, sports ball, kite, baseball bat, baseball glove, skateboard, surfboard, tennis racket, bottle, wine glass, cup, fork, knife, spoon, bowl, banana, apple, sandwich, orange, broccoli, carrot, hot dog, pizza, donut, cake, chair, couch, potted plant, bed, dining table, toilet, tv, laptop, mouse, remote, keyboard, cell phone, microwave, oven, toaster, sink, refrigerator, book, clock, vase, scissors, teddy bear, hair drier, toothbrush)
+        model = YOLO('yolov8n.pt') 
+        print("Standard yolov8n.pt loaded successfully")
+        return model
+
+
+def load_detector(backend=None):
+    """
+    Load the object detector for ``backend`` (defaults to YOLO_BACKEND):
+    'ultralytics' runs the PyTorch model, 'onnx' an ONNX export of it with
+    ONNX Runtime (exported to YOLO_ONNX_PATH on first use).
+    """
+    if (backend or getattr(settings, 'YOLO_BACKEND', 'ultralytics')) == 'onnx':
+        from .onnx_backend import load_onnx_detector
+
+        return load_onnx_detector(
+            getattr(settings, 'YOLO_ONNX_PATH', 'yolov8n/yolov8n.onnx'),
+            export_from=load_yolo,
+            threads=getattr(settings, 'YOLO_ONNX_THREADS', None),
+            providers=getattr(settings, 'YOLO_ONNX_PROVIDERS', None),
+        )
+    return load_yolo()
+
+
+def predict_with(model, images, conf):
+    """One batched forward pass of ``model`` over ``images``, as Detections."""
+    from .onnx_backend import OnnxDetector
+
+    if isinstance(model, OnnxDetector):
+        return model.predict(images, conf)
+    results = model(images, verbose=False, conf=conf)
+    return [Detections.from_result(result) for result in results]
+
+
+def warm_up(model):
+    """One inference on a blank frame so the first real request is not the slow one."""
+    import numpy as np
+
+    predict_with(model, [np.zeros((480, 640, 3), dtype=np.uint8)], 0.25)
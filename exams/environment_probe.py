@@ -0,0 +1,163 @@
+"""
+Background prober for the host environment checks (``vp_detector``).
+
+The checks spawn system tools, read ``/proc`` and walk the process table, so
+they are not run inside web requests. A prober refreshes a snapshot of their
+results every ``interval`` seconds and publishes it as a JSON file, written
+atomically; every web worker reads the same file and keeps the parsed copy
+until the file changes, so a status request costs one ``stat`` call.
+
+The prober runs either as its own process
+(``python manage.py run_environment_probe``, with ``in_process=False`` set
+for the web workers) or as a daemon thread of a web worker that finds no
+fresh snapshot. Only one prober runs per snapshot path: a prober first takes
+an exclusive lock on ``<path>.lock``, held until its process exits. A web
+worker that cannot get the lock leaves probing to its holder and tries again
+only if the snapshot goes stale for another ``interval``.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def snapshot_path():
+    """ENVIRONMENT_SNAPSHOT_PATH, or a file in the system temp directory."""
+    from django.conf import settings
+
+    return getattr(settings, "ENVIRONMENT_SNAPSHOT_PATH", None) or os.path.join(
+        tempfile.gettempdir(), "quizapp-environment.json"
+    )
+
+
+class EnvironmentProbe:
+    """Publishes and reads the environment-check snapshot at ``path``."""
+
+    def __init__(self, path, interval=60.0, in_process=True):
+        self.path = str(path)
+        self.interval = max(1.0, float(interval))
+        # A snapshot older than this is not trusted (the prober has stopped)
+        self.max_age = 3 * self.interval
+        self.in_process = in_process
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._next_attempt = 0.0
+        self._lock_fd = None
+        self._stamp = None
+        self._snapshot = None
+
+    def refresh(self):
+        """Run the checks once, publish the result and return it."""
+        from .vp_detector import Detector
+
+        detector = Detector()
+        snapshot = {
+            "checked_at": time.time(),
+            "is_safe": detector.is_safe,
+            "checks": detector.get_all_checks,
+            "errors": detector.errors,
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".environment-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as tmp:
+                json.dump(snapshot, tmp)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return snapshot
+
+    def snapshot(self):
+        """
+        The latest published snapshot, or None while none is fresh. Starts the
+        in-process prober when needed; never runs the checks itself.
+        """
+        snapshot = self._read()
+        if snapshot is None or time.time() - snapshot.get("checked_at", 0) > self.max_age:
+            if self.in_process:
+                self._ensure_worker()
+            return None
+        return snapshot
+
+    def serve_forever(self, wait=True):
+        """
+        Refresh the snapshot every ``interval`` seconds once this process
+        holds the prober lock. Without ``wait``, returns straight away if
+        another process holds it.
+        """
+        while not self._acquire_lock():
+            if not wait:
+                return
+            time.sleep(self.interval)
+        while True:
+            started = time.monotonic()
+            self._refresh_logged()
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def _acquire_lock(self):
+        """Take the prober lock for the life of this process; False if another process holds it."""
+        if self._lock_fd is not None:
+            return True
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    def _read(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp != self._stamp:
+            try:
+                with open(self.path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                return self._snapshot
+            self._stamp, self._snapshot = stamp, snapshot
+        return self._snapshot
+
+    def _refresh_logged(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Environment probe failed: {e}")
+
+    def _ensure_worker(self):
+        # Threads do not survive a fork: each child of a preloading master
+        # process checks for itself, and probes only once the lock is free.
+        pid = os.getpid()
+        if self._pid == pid and (time.monotonic() < self._next_attempt or self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._pid == pid and (time.monotonic() < self._next_attempt or self._thread.is_alive()):
+                return
+            if self._pid != pid and self._lock_fd is not None:
+                # A lock inherited from the parent is the parent's
+                os.close(self._lock_fd)
+                self._lock_fd = None
+            self._pid = pid
+            # Another worker may hold the lock and be about to publish
+            self._next_attempt = time.monotonic() + self.interval
+            self._thread = threading.Thread(
+                target=self.serve_forever, kwargs={"wait": False}, name="environment-probe", daemon=True
+            )
+            self._thread.start()
@@ -0,0 +1,259 @@
+"""
+Micro-batching inference engine for the proctoring object detector.
+
+Frames posted by many concurrent requests are queued and collected into a
+single batch (up to ``max_batch_size`` images, or whatever arrived within
+``max_wait_ms`` of the first frame) which is run through the detector in one
+forward pass. Each caller blocks on its own future until its slice of the
+batch is ready, so throughput scales with batch size instead of with the
+number of requests.
+
+:class:`DetectorMetadata` holds what proctoring decisions need to know about
+a detector's classes (names, the restricted and person class IDs), built once
+per model so frames are judged with array masks on their class IDs.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Objects a student may not have in view.
+# Removed 'table' as it causes false positives for students sitting at desks
+RESTRICTED_CLASSES = ['cell phone', 'mobile phone', 'laptop', 'book', 'tv']
+PERSON_CLASS = 'person'
+
+
+class Detections:
+    """Detector output for a single frame, independent of the backend."""
+
+    __slots__ = ("class_ids", "confidences", "boxes", "names")
+
+    def __init__(self, class_ids, confidences, boxes, names):
+        import numpy as np
+
+        self.class_ids = np.asarray(class_ids, dtype=np.int64).reshape(-1)
+        self.confidences = np.asarray(confidences, dtype=np.float32).reshape(-1)
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.names = names or {}
+
+    @classmethod
+    def empty(cls, names=None):
+        return cls([], [], [], names)
+
+    @classmethod
+    def from_result(cls, result):
+        """Build from an ultralytics ``Results`` object."""
+        names = getattr(result, "names", None) or {}
+        boxes = getattr(result, "boxes", None)
+        if boxes is None or len(boxes) == 0:
+            return cls.empty(names)
+        return cls(
+            _to_numpy(boxes.cls),
+            _to_numpy(boxes.conf),
+            _to_numpy(boxes.xyxy),
+            names,
+        )
+
+    def __len__(self):
+        return len(self.class_ids)
+
+    def filter(self, min_conf):
+        """Return only the detections at or above ``min_conf``."""
+        keep = self.confidences >= min_conf
+        if keep.all():
+            return self
+        return Detections(self.class_ids[keep], self.confidences[keep], self.boxes[keep], self.names)
+
+    def class_name(self, cls_id):
+        return self.names[cls_id] if cls_id in self.names else str(cls_id)
+
+    def class_names(self):
+        """Class name of every detection, in detector order."""
+        return [self.class_name(int(cls_id)) for cls_id in self.class_ids]
+
+    @property
+    def metadata(self):
+        """:class:`DetectorMetadata` of the detector that produced these detections."""
+        return DetectorMetadata.for_names(self.names)
+
+
+class DetectorMetadata:
+    """
+    Class names of one detector and the class-ID sets used to judge its
+    frames: ``restricted_ids`` (from ``RESTRICTED_CLASSES``) and ``person_id``.
+    Names a detector does not know (e.g. 'mobile phone' for COCO) are ignored.
+    """
+
+    # Content key -> metadata, and id(names) -> (names, metadata) for the dicts seen
+    _cache = {}
+    _by_id = {}
+    _cache_lock = threading.Lock()
+
+    def __init__(self, names, restricted_classes=RESTRICTED_CLASSES, person_class=PERSON_CLASS):
+        import numpy as np
+
+        self.names = dict(names or {})
+        # Equal for detectors with the same classes, however their names were loaded
+        self.key = tuple(sorted(self.names.items()))
+        self.num_classes = max(self.names, default=-1) + 1
+        self.ids_by_name = {}
+        for cls_id, name in sorted(self.names.items()):
+            self.ids_by_name.setdefault(name, []).append(cls_id)
+        self._masks = {}
+        self.restricted_mask = self.class_mask(restricted_classes)
+        self.restricted_ids = frozenset(np.flatnonzero(self.restricted_mask).tolist())
+        self.person_mask = self.class_mask((person_class,))
+        person_ids = self.ids_by_name.get(person_class)
+        self.person_id = person_ids[0] if person_ids else None
+
+    @classmethod
+    def for_names(cls, names):
+        """Metadata for a detector's ``names`` mapping; one instance per distinct mapping."""
+        entry = cls._by_id.get(id(names))
+        if entry is None or entry[0] is not names:
+            key = tuple(sorted((names or {}).items()))
+            with cls._cache_lock:
+                metadata = cls._cache.get(key)
+                if metadata is None:
+                    if len(cls._cache) >= 64:
+                        cls._cache.clear()
+                    metadata = cls._cache[key] = cls(names)
+                if len(cls._by_id) >= 64:
+                    cls._by_id.clear()
+                # Keeping ``names`` alive keeps its id from being reused
+                entry = cls._by_id[id(names)] = (names, metadata)
+        return entry[1]
+
+    def class_mask(self, class_names):
+        """Boolean array over class IDs, True for the IDs named in ``class_names``; cached."""
+        key = tuple(class_names)
+        mask = self._masks.get(key)
+        if mask is None:
+            import numpy as np
+
+            mask = np.zeros(self.num_classes, dtype=bool)
+            for name in key:
+                mask[self.ids_by_name.get(name, [])] = True
+            mask.flags.writeable = False
+            self._masks[key] = mask
+        return mask
+
+    def counts(self, class_ids):
+        """Detections per class ID (length ``num_classes``); unknown IDs are dropped."""
+        import numpy as np
+
+        return np.bincount(class_ids, minlength=self.num_classes)[:self.num_classes]
+
+    def count(self, class_ids, class_names):
+        """Number of detections whose class is one of ``class_names``."""
+        return int(self.counts(class_ids)[self.class_mask(class_names)].sum())
+
+    def person_count(self, class_ids):
+        return int(self.counts(class_ids)[self.person_mask].sum())
+
+    def is_restricted(self, class_ids):
+        """Boolean mask over detections, True for restricted objects."""
+        import numpy as np
+
+        class_ids = np.asarray(class_ids)
+        known = class_ids < self.num_classes
+        return known & self.restricted_mask[np.where(known, class_ids, 0)] if self.num_classes else known
+
+    def unique_names(self, class_ids):
+        """Sorted names of the classes present."""
+        return sorted({self.names.get(int(cls_id), str(cls_id)) for cls_id in set(class_ids.tolist())})
+
+
+def _to_numpy(value):
+    import numpy as np
+
+    if hasattr(value, "cpu"):
+        value = value.cpu()
+    if hasattr(value, "numpy"):
+        value = value.numpy()
+    return np.asarray(value)
+
+
+class _Request:
+    __slots__ = ("image", "conf", "future")
+
+    def __init__(self, image, conf):
+        self.image = image
+        self.conf = conf
+        self.future = Future()
+
+
+class BatchInferenceEngine:
+    """
+    Collects frames from concurrent callers and runs them in batches.
+
+    ``predict`` is called from a single background thread as
+    ``predict(images, conf)`` and must return one :class:`Detections` per
+    image, in order. Requests in a batch may ask for different confidence
+    thresholds; the batch runs at the lowest one and each caller's result is
+    filtered back up to its own threshold.
+    """
+
+    def __init__(self, predict, max_batch_size=8, max_wait_ms=5):
+        self._predict = predict
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def submit(self, image, conf=0.25):
+        """Queue ``image`` for detection and return a ``Future`` of its :class:`Detections`."""
+        request = _Request(image, conf)
+        self._ensure_worker()
+        self._queue.put(request)
+        return request.future
+
+    def detect(self, image, conf=0.25, timeout=None):
+        """Blocking helper around :meth:`submit`."""
+        return self.submit(image, conf).result(timeout)
+
+    def _ensure_worker(self):
+        # Threads do not survive a fork, so a worker started in a preloading
+        # master process must be restarted in each child.
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            if self._pid != pid:
+                self._queue = queue.Queue()
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name="yolo-batcher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        conf = min(request.conf for request in batch)
+        try:
+            outputs = list(self._predict([request.image for request in batch], conf))
+            if len(outputs) != len(batch):
+                raise RuntimeError(f"Detector returned {len(outputs)} results for {len(batch)} frames")
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        for request, detections in zip(batch, outputs):
+            request.future.set_result(detections.filter(request.conf))
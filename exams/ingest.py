@@ -0,0 +1,127 @@
+"""
+Accept-and-queue ingestion for proctoring frames.
+
+In this mode ``video_feed_view`` only validates a frame and hands it to a
+:class:`FrameIngestQueue`; background consumer threads run detection and the
+scoring rules, and the request returns straight away with the last verdict
+known for that exam session. At most one frame per session waits in the
+queue: a newer frame replaces an older one that has not been picked up yet,
+so bursts at exam start collapse instead of piling up. A session's last
+verdict is dropped when its exam ends (``forget``) or after ``idle_seconds``
+without frames.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from django.db import close_old_connections
+
+
+class FrameIngestQueue:
+    """
+    Per-process queue of frames keyed by exam session.
+
+    ``process(*args)`` is called on a consumer thread for each accepted
+    frame and must return the verdict payload for that session.
+    """
+
+    def __init__(self, process, workers=2, max_pending=1000, idle_seconds=900):
+        self._process = process
+        self.workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self.idle_seconds = float(idle_seconds)
+        self._cond = threading.Condition()
+        self._order = deque()
+        self._pending = {}
+        self._active = set()
+        self._latest = {}
+        self._seen = {}
+        self._last_sweep = time.monotonic()
+        self._pid = None
+
+    def submit(self, key, *args):
+        """Queue a frame for ``key``; returns ``False`` if the queue is full."""
+        self._ensure_workers()
+        now = time.monotonic()
+        with self._cond:
+            self._sweep(now)
+            self._seen[key] = now
+            if key not in self._pending:
+                if len(self._pending) >= self.max_pending:
+                    return False
+                # A session being scored right now is re-queued when it finishes.
+                if key not in self._active:
+                    self._order.append(key)
+            self._pending[key] = args
+            self._cond.notify()
+        return True
+
+    def take_latest(self, key):
+        """
+        Return the last verdict for ``key`` (or ``None``).
+
+        Alerts are delivered once: they are cleared from the stored verdict
+        after being read so the client is not warned twice for one frame.
+        """
+        with self._cond:
+            verdict = self._latest.get(key)
+            if verdict is None:
+                return None
+            if verdict.get('alert'):
+                self._latest[key] = dict(verdict, alert=None)
+            return dict(verdict)
+
+    def forget(self, key):
+        with self._cond:
+            self._latest.pop(key, None)
+            self._seen.pop(key, None)
+
+    def _sweep(self, now):
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        stale = [
+            key for key, seen_at in self._seen.items()
+            if now - seen_at > self.idle_seconds and key not in self._pending and key not in self._active
+        ]
+        for key in stale:
+            del self._seen[key]
+            self._latest.pop(key, None)
+
+    def _ensure_workers(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._cond:
+            if self._pid == pid:
+                return
+            self._pid = pid
+            self._order.clear()
+            self._pending.clear()
+            self._active.clear()
+            for i in range(self.workers):
+                threading.Thread(target=self._consume, name=f"frame-ingest-{i}", daemon=True).start()
+
+    def _consume(self):
+        while True:
+            with self._cond:
+                while not self._order:
+                    self._cond.wait()
+                key = self._order.popleft()
+                args = self._pending.pop(key)
+                self._active.add(key)
+            try:
+                verdict = self._process(*args)
+            except Exception as e:
+                print(f"Frame ingest error for {key}: {e}")
+                verdict = None
+            finally:
+                close_old_connections()
+            with self._cond:
+                self._active.discard(key)
+                if verdict is not None:
+                    self._latest[key] = verdict
+                if key in self._pending:
+                    self._order.append(key)
+                    self._cond.notify()
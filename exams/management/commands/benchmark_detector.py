@@ -0,0 +1,97 @@
+"""
+Django management command to compare object detector backends.
+Usage: python manage.py benchmark_detector [--backend ultralytics --backend onnx]
+                                           [--frames DIR] [--iterations N] [--batch N]
+"""
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from exams.detectors import load_detector, predict_with, warm_up
+
+BACKENDS = ("ultralytics", "onnx")
+
+
+def read_frames(folder):
+    """BGR frames from the .jpg/.png files in ``folder``, or random 640x480 frames if it is empty."""
+    if not folder:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 256, (480, 640, 3), dtype=np.uint8) for _ in range(8)]
+    paths = sorted(
+        path for pattern in ("*.jpg", "*.jpeg", "*.png")
+        for path in glob.glob(os.path.join(folder, pattern))
+    )
+    frames = [frame for frame in (cv2.imread(path) for path in paths) if frame is not None]
+    if not frames:
+        raise CommandError(f"No readable frames in {folder}")
+    return frames
+
+
+class Command(BaseCommand):
+    help = "Measure frames/sec of each detector backend and check their class-name output agrees."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--backend",
+            action="append",
+            choices=BACKENDS,
+            help="Backend to benchmark (repeatable). Benchmarks every backend if not provided.",
+        )
+        parser.add_argument(
+            "--frames",
+            type=str,
+            default=None,
+            help="Folder of .jpg/.png frames to run. Uses random 640x480 frames if not provided.",
+        )
+        parser.add_argument("--iterations", type=int, default=50, help="Batches to time per backend.")
+        parser.add_argument("--batch", type=int, default=1, help="Frames per forward pass.")
+        parser.add_argument("--conf", type=float, default=0.4, help="Confidence threshold.")
+
+    def handle(self, *args, **options):
+        frames = read_frames(options["frames"])
+        batch_size = max(1, options["batch"])
+        conf = options["conf"]
+
+        reference = None
+        for backend in options["backend"] or BACKENDS:
+            self.stdout.write(f"[{backend}]")
+            try:
+                started = time.perf_counter()
+                model = load_detector(backend)
+                load_seconds = time.perf_counter() - started
+                warm_up(model)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"  unavailable: {e}"))
+                continue
+
+            # Class names per frame, for the agreement check
+            names = [
+                sorted(detections.class_names())
+                for frame in frames
+                for detections in predict_with(model, [frame], conf)
+            ]
+
+            timings = []
+            for i in range(options["iterations"]):
+                batch = [frames[(i * batch_size + j) % len(frames)] for j in range(batch_size)]
+                started = time.perf_counter()
+                predict_with(model, batch, conf)
+                timings.append(time.perf_counter() - started)
+            timings = np.asarray(timings)
+
+            self.stdout.write(
+                f"  load {load_seconds:.2f}s, {batch_size * len(timings) / timings.sum():.1f} frames/s, "
+                f"p50 {np.percentile(timings, 50) * 1000:.1f} ms, p95 {np.percentile(timings, 95) * 1000:.1f} ms per batch"
+            )
+            if reference is None:
+                reference = (backend, names)
+            else:
+                same = sum(a == b for a, b in zip(reference[1], names))
+                self.stdout.write(f"  class names match {reference[0]} on {same}/{len(names)} frames")
+
+        if reference is None:
+            raise CommandError("No backend could be loaded.")
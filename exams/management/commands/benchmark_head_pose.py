@@ -0,0 +1,144 @@
+"""
+Django management command to compare the vectorized head-pose estimation with
+the per-face implementation it replaced.
+Usage: python manage.py benchmark_head_pose [--faces N] [--iterations N]
+"""
+import math
+import time
+
+import cv2
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from vision import head_pose
+
+FRAME_SIZE = (480, 640, 3)
+
+
+def synthetic_marks(count, size=FRAME_SIZE, seed=0, degenerate=0):
+    """
+    68-point landmark arrays for ``count`` randomly turned faces (only the pose
+    points are filled), the last ``degenerate`` (up to 2) of them collapsed.
+    """
+    rng = np.random.default_rng(seed)
+    matrix = head_pose.camera_matrix(size)
+    faces = []
+    for _ in range(count):
+        angles = np.radians(rng.uniform([-40, -70, -15], [40, 70, 15]))
+        translation = np.array([rng.uniform(-300, 300), rng.uniform(-200, 200), rng.uniform(2500, 5000)])
+        points, _ = cv2.projectPoints(
+            head_pose.MODEL_POINTS, angles, translation, matrix, head_pose._DIST_COEFFS)
+        marks = np.zeros((68, 2))
+        marks[head_pose.LANDMARK_IDS] = points.reshape(-1, 2) + rng.normal(0, 1.5, (6, 2))
+        faces.append(marks)
+    # Degenerate faces: every landmark on one point, and all zeros
+    if degenerate > 0:
+        faces[-1][head_pose.LANDMARK_IDS] = faces[-1][head_pose.LANDMARK_IDS[0]]
+    if degenerate > 1:
+        faces[-2][:] = 0
+    return faces
+
+
+def legacy_estimate(marks, size):
+    """The per-face estimate from camera.py, before intrinsics caching and vectorisation."""
+    focal_length = size[1]
+    center = (size[1] / 2, size[0] / 2)
+    matrix = np.array(
+        [[focal_length, 0, center[0]],
+         [0, focal_length, center[1]],
+         [0, 0, 1]], dtype="double"
+    )
+    dist_coeffs = np.zeros((4, 1))
+    image_points = np.asarray(marks, dtype="double")[head_pose.LANDMARK_IDS]
+    _, rotation_vector, translation_vector = cv2.solvePnP(
+        head_pose.MODEL_POINTS, image_points, matrix, dist_coeffs, flags=head_pose._PNP_FLAGS)
+
+    nose_end, _ = cv2.projectPoints(
+        np.array([(0.0, 0.0, 1000.0)]), rotation_vector, translation_vector, matrix, dist_coeffs)
+    rear_size, rear_depth = 1, 0
+    front_size, front_depth = size[1], size[1] * 2
+    box_points = np.array([
+        (-rear_size, -rear_size, rear_depth),
+        (-rear_size, rear_size, rear_depth),
+        (rear_size, rear_size, rear_depth),
+        (rear_size, -rear_size, rear_depth),
+        (-rear_size, -rear_size, rear_depth),
+        (-front_size, -front_size, front_depth),
+        (-front_size, front_size, front_depth),
+        (front_size, front_size, front_depth),
+        (front_size, -front_size, front_depth),
+        (-front_size, -front_size, front_depth),
+    ], dtype=float)
+    box, _ = cv2.projectPoints(box_points, rotation_vector, translation_vector, matrix, dist_coeffs)
+    box = np.int32(box.reshape(-1, 2))
+
+    p1 = (int(image_points[0][0]), int(image_points[0][1]))
+    p2 = (int(nose_end[0][0][0]), int(nose_end[0][0][1]))
+    x1, x2 = box[2], (box[5] + box[8]) // 2
+    try:
+        m = (p2[1] - p1[1]) / (p2[0] - p1[0])
+        pitch = int(math.degrees(math.atan(m)))
+    except (ZeroDivisionError, ValueError):
+        pitch = 90
+    try:
+        m = (x2[1] - x1[1]) / (x2[0] - x1[0])
+        yaw = int(math.degrees(math.atan(-1 / m)))
+    except (ZeroDivisionError, ValueError):
+        yaw = 90
+    return pitch, yaw
+
+
+def _legacy_many(faces, size):
+    results = []
+    for marks in faces:
+        try:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                results.append(legacy_estimate(marks, size))
+        except cv2.error:
+            results.append(None)
+    return results
+
+
+class Command(BaseCommand):
+    help = "Time head-pose estimation for N faces per frame: per-face (old) vs vectorized, and check they agree."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--faces",
+            type=int,
+            action="append",
+            help="Faces per frame (repeatable). Defaults to 1, 4 and 16.",
+        )
+        parser.add_argument("--iterations", type=int, default=200, help="Frames to time per face count.")
+
+    def handle(self, *args, **options):
+        for count in options["faces"] or (1, 4, 16):
+            count = max(1, count)
+            degenerate = 2 if count >= 4 else 0
+            faces = synthetic_marks(count, degenerate=degenerate)
+            self.stdout.write(f"[{count} face(s), {degenerate} degenerate]")
+
+            legacy = _legacy_many(faces, FRAME_SIZE)
+            current = head_pose.estimate_many(faces, FRAME_SIZE)
+            regular = [i for i, old in enumerate(legacy) if old is not None and not np.isnan(current[i]).any()]
+            same = sum(tuple(current[i]) == legacy[i] for i in regular)
+            within = sum(np.abs(np.subtract(current[i], legacy[i])).max() <= 1 for i in regular)
+            self.stdout.write(
+                f"  angles equal on {same}/{len(regular)} solved faces, within 1 degree on {within}; "
+                f"{int(np.isnan(current).any(axis=1).sum())} face(s) reported as NaN"
+            )
+
+            for name, run in (
+                ("per-face", lambda: _legacy_many(faces, FRAME_SIZE)),
+                ("vectorized", lambda: head_pose.estimate_many(faces, FRAME_SIZE)),
+            ):
+                timings = []
+                for _ in range(options["iterations"]):
+                    started = time.perf_counter()
+                    run()
+                    timings.append(time.perf_counter() - started)
+                timings = np.asarray(timings) * 1000
+                self.stdout.write(
+                    f"  {name:<10} p50 {np.percentile(timings, 50):.3f} ms, "
+                    f"p95 {np.percentile(timings, 95):.3f} ms per frame"
+                )
@@ -0,0 +1,200 @@
+"""
+Django management command to build an INT8 version of the object detector.
+Usage: python manage.py quantize_detector --calibration DIR [--eval DIR] [--output PATH]
+                                          [--source PATH] [--report PATH]
+
+The FP32 ONNX export (YOLO_ONNX_PATH, exported first if needed) is statically
+quantized with ONNX Runtime using the frames in the calibration folder, then
+both models are run over the evaluation frames. The report gives, per
+proctored class, how many of the FP32 detections the INT8 model reproduces
+(same class, IoU >= 0.5) and the latency of each model.
+"""
+import json
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from exams.detectors import load_yolo
+from exams.management.commands.benchmark_detector import read_frames
+from exams.onnx_backend import OnnxDetector, load_onnx_detector, preprocess, to_tensor
+
+REPORT_CLASSES = ["person", "cell phone", "book", "laptop"]
+
+
+class _CalibrationReader:
+    """ONNX Runtime calibration data reader over a list of BGR frames."""
+
+    def __init__(self, frames, input_name, imgsz):
+        self._frames = iter(frames)
+        self._input_name = input_name
+        self._imgsz = imgsz
+
+    def get_next(self):
+        frame = next(self._frames, None)
+        if frame is None:
+            return None
+        return {self._input_name: to_tensor([preprocess(frame, self._imgsz)[0]])}
+
+
+def _iou(box, boxes):
+    w = np.clip(np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0]), 0, None)
+    h = np.clip(np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1]), 0, None)
+    inter = w * h
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / (area + areas - inter + 1e-9)
+
+
+def _matches(reference, candidate, class_id, iou_threshold=0.5):
+    """``(reference_count, matched_count)`` for one class, matching boxes greedily."""
+    ref_boxes = reference.boxes[reference.class_ids == class_id]
+    cand_boxes = candidate.boxes[candidate.class_ids == class_id]
+    used = np.zeros(len(cand_boxes), dtype=bool)
+    matched = 0
+    for box in ref_boxes:
+        if not len(cand_boxes):
+            break
+        ious = np.where(used, -1.0, _iou(box, cand_boxes))
+        best = int(ious.argmax())
+        if ious[best] >= iou_threshold:
+            used[best] = True
+            matched += 1
+    return len(ref_boxes), matched
+
+
+def _timed(model, frames, conf):
+    detections, timings = [], []
+    for frame in frames:
+        started = time.perf_counter()
+        detections.append(model.predict([frame], conf)[0])
+        timings.append(time.perf_counter() - started)
+    timings = np.asarray(timings)
+    return detections, {
+        "frames_per_second": round(len(timings) / timings.sum(), 2),
+        "p50_ms": round(float(np.percentile(timings, 50)) * 1000, 2),
+        "p95_ms": round(float(np.percentile(timings, 95)) * 1000, 2),
+    }
+
+
+class Command(BaseCommand):
+    help = "Quantize the object detector to INT8 and report recall and latency against FP32."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--calibration",
+            type=str,
+            required=True,
+            help="Folder of representative exam frames (.jpg/.png) used to calibrate activations.",
+        )
+        parser.add_argument(
+            "--eval",
+            type=str,
+            default=None,
+            help="Folder of frames for the accuracy report. Uses the calibration frames if not provided.",
+        )
+        parser.add_argument(
+            "--source",
+            type=str,
+            default=None,
+            help="FP32 ONNX model (defaults to YOLO_ONNX_PATH, exported from the YOLO model if missing).",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default=None,
+            help="Where to write the INT8 model (defaults to the source path with an .int8.onnx suffix).",
+        )
+        parser.add_argument(
+            "--report",
+            type=str,
+            default=None,
+            help="Where to write the JSON report (defaults to the output path with a .json suffix).",
+        )
+        parser.add_argument(
+            "--exclude",
+            action="append",
+            default=None,
+            help="Node name prefix to keep in FP32 (repeatable). Defaults to the YOLOv8 detection head, '/model.22/'.",
+        )
+        parser.add_argument("--conf", type=float, default=0.4, help="Confidence threshold for the report.")
+
+    def handle(self, *args, **options):
+        try:
+            import onnx
+            from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+        except ImportError as e:
+            raise CommandError(f"onnx and onnxruntime are required (pip install -r requirements_onnx.txt): {e}")
+
+        source = options["source"] or getattr(settings, "YOLO_ONNX_PATH", "yolov8n/yolov8n.onnx")
+        output = options["output"] or source[:-len(".onnx")] + ".int8.onnx"
+        report_path = options["report"] or output[:-len(".onnx")] + ".json"
+
+        # Make sure the FP32 export exists (exports it on first run)
+        fp32 = load_onnx_detector(source, export_from=load_yolo)
+        calibration = read_frames(options["calibration"])
+        evaluation = read_frames(options["eval"]) if options["eval"] else calibration
+
+        fp32_model = onnx.load(source)
+        prefixes = tuple(options["exclude"] or ["/model.22/"])
+        excluded = [node.name for node in fp32_model.graph.node if node.name.startswith(prefixes)]
+
+        self.stdout.write(
+            f"Calibrating on {len(calibration)} frame(s), keeping {len(excluded)} head node(s) in FP32..."
+        )
+        quantize_static(
+            source,
+            output,
+            _CalibrationReader(calibration, fp32.input_name, fp32.imgsz),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+            nodes_to_exclude=excluded,
+        )
+        # Carry the class names and input size over to the quantized model
+        int8_model = onnx.load(output)
+        del int8_model.metadata_props[:]
+        int8_model.metadata_props.extend(fp32_model.metadata_props)
+        onnx.save(int8_model, output)
+
+        int8 = OnnxDetector(output)
+        conf = options["conf"]
+        reference, fp32_latency = _timed(fp32, evaluation, conf)
+        candidate, int8_latency = _timed(int8, evaluation, conf)
+
+        ids = {name: cls_id for cls_id, name in fp32.names.items()}
+        recall = {}
+        for name in REPORT_CLASSES:
+            if name not in ids:
+                continue
+            counts = [_matches(ref, cand, ids[name]) for ref, cand in zip(reference, candidate)]
+            total = sum(count for count, _ in counts)
+            matched = sum(found for _, found in counts)
+            recall[name] = {
+                "fp32_detections": total,
+                "matched": matched,
+                "recall": round(matched / total, 4) if total else None,
+            }
+
+        report = {
+            "source": source,
+            "output": output,
+            "frames": len(evaluation),
+            "conf": conf,
+            "recall_vs_fp32": recall,
+            "fp32": fp32_latency,
+            "int8": int8_latency,
+        }
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+        for name, row in recall.items():
+            value = "n/a" if row["recall"] is None else f"{row['recall']:.1%}"
+            self.stdout.write(f"  {name:<12} recall {value} ({row['matched']}/{row['fp32_detections']})")
+        self.stdout.write(
+            f"  FP32 {fp32_latency['frames_per_second']} frames/s (p50 {fp32_latency['p50_ms']} ms), "
+            f"INT8 {int8_latency['frames_per_second']} frames/s (p50 {int8_latency['p50_ms']} ms)"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Wrote {output} and {report_path}"))
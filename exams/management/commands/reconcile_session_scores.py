@@ -0,0 +1,61 @@
+"""
+Django management command to rebuild session summaries from ViolationLog.
+Usage: python manage.py reconcile_session_scores [--test-id TEST_ID]
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from exams.models import TestSessionSummary, ViolationLog
+from exams.scoring import summary_defaults
+
+
+class Command(BaseCommand):
+    help = "Recompute TestSessionSummary scores and violation counts from the ViolationLog table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--test-id",
+            type=str,
+            default=None,
+            help="Only reconcile sessions of this test. Reconciles every session if not provided.",
+        )
+
+    def handle(self, *args, **options):
+        test_id = options.get("test_id")
+
+        logs = ViolationLog.objects.all()
+        summaries = TestSessionSummary.objects.all()
+        if test_id:
+            logs = logs.filter(test_id=test_id)
+            summaries = summaries.filter(test_id=test_id)
+
+        sessions = set(logs.order_by().values_list("student_id", "test_id").distinct())
+        fixed = 0
+        with transaction.atomic():
+            for summary in summaries.select_for_update():
+                sessions.discard((summary.student_id, summary.test_id))
+                expected = summary_defaults(logs.filter(student_id=summary.student_id, test_id=summary.test_id))
+                changed = [field for field, value in expected.items() if getattr(summary, field) != value]
+                if changed:
+                    self.stdout.write(
+                        f"  {summary.student_id}/{summary.test_id}: "
+                        + ", ".join(f"{field} {getattr(summary, field)} -> {expected[field]}" for field in changed)
+                    )
+                    for field in changed:
+                        setattr(summary, field, expected[field])
+                    summary.save(update_fields=changed + ["updated"])
+                    fixed += 1
+
+            # Sessions with violations but no summary yet
+            TestSessionSummary.objects.bulk_create([
+                TestSessionSummary(
+                    student_id=student_id,
+                    test_id=tid,
+                    **summary_defaults(logs.filter(student_id=student_id, test_id=tid))
+                )
+                for student_id, tid in sessions
+            ])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Corrected {fixed} session summary(ies), created {len(sessions)}.")
+        )
@@ -0,0 +1,41 @@
+"""
+Django management command to run the shared object detector pool.
+Usage: python manage.py run_detector_pool [--workers N] [--address HOST:PORT]
+"""
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from exams.detector_pool import DetectorPool, pool_authkey
+
+
+class Command(BaseCommand):
+    help = "Run a pool of detector processes that web workers send frames to via shared memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=getattr(settings, "DETECTOR_POOL_WORKERS", None) or os.cpu_count() or 1,
+            help="Number of detector processes (defaults to DETECTOR_POOL_WORKERS or the CPU count).",
+        )
+        parser.add_argument(
+            "--address",
+            type=str,
+            default=getattr(settings, "DETECTOR_POOL_ADDRESS", None) or "127.0.0.1:7011",
+            help="HOST:PORT or Unix socket path to listen on (defaults to DETECTOR_POOL_ADDRESS).",
+        )
+
+    def handle(self, *args, **options):
+        pool = DetectorPool(
+            options["address"],
+            workers=options["workers"],
+            authkey=pool_authkey(),
+            max_batch_size=getattr(settings, "YOLO_BATCH_SIZE", 8),
+        )
+        self.stdout.write(f"Starting {options['workers']} detector process(es)...")
+        try:
+            pool.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Detector pool stopped."))
@@ -0,0 +1,40 @@
+"""
+Django management command to run the environment-check prober.
+Usage: python manage.py run_environment_probe [--interval SECONDS] [--once]
+
+Set ENVIRONMENT_PROBE_IN_PROCESS = False for the web workers when this runs.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from exams.environment_probe import EnvironmentProbe, snapshot_path
+
+
+class Command(BaseCommand):
+    help = "Refresh the environment-check snapshot read by /exams/check-environment/."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=getattr(settings, "ENVIRONMENT_PROBE_INTERVAL", 60),
+            help="Seconds between refreshes (defaults to ENVIRONMENT_PROBE_INTERVAL).",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Refresh the snapshot once and exit.",
+        )
+
+    def handle(self, *args, **options):
+        path = snapshot_path()
+        probe = EnvironmentProbe(path, interval=options["interval"], in_process=False)
+        if options["once"]:
+            snapshot = probe.refresh()
+            self.stdout.write(f"is_safe={snapshot['is_safe']} -> {path}")
+            return
+        self.stdout.write(f"Writing environment snapshots to {path} every {probe.interval:g}s...")
+        try:
+            probe.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping environment probe.")
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("exams", "0003_violationlog_score"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SessionScore",
+            fields=[
+                ("ssid", models.BigAutoField(primary_key=True, serialize=False)),
+                ("test_id", models.CharField(max_length=100)),
+                ("total_score", models.IntegerField(default=0)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="session_scores",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "session_scores",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="sessionscore",
+            constraint=models.UniqueConstraint(
+                fields=("student", "test_id"), name="session_scores_student_test_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exams", "0004_sessionscore"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="violationlog",
+            name="last_seen",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="violationlog",
+            name="occurrences",
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exams", "0005_violationlog_occurrences"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="violationlog",
+            name="category",
+            field=models.PositiveSmallIntegerField(
+                choices=[
+                    (0, "Other"),
+                    (1, "Tab switch"),
+                    (2, "Mobile phone"),
+                    (3, "Person / face"),
+                    (4, "Audio"),
+                    (5, "Restricted object"),
+                    (6, "Head pose / gaze"),
+                    (7, "360 scan"),
+                    (8, "Environment"),
+                ],
+                default=0,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="violationlog",
+            index=models.Index(
+                fields=["test_id", "student", "category"],
+                name="violation_l_test_id_869b7c_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+from django.db.models import Q
+
+# Category of rows written before ViolationLog.category existed, from their
+# details text; earlier entries win (a scan finding a phone is a scan row).
+BACKFILL = [
+    (7, Q(details__startswith="Scan Violation")),
+    (8, Q(details__startswith="Environment Violation")),
+    (1, Q(details__icontains="Tab Switch")),
+    (2, Q(details__icontains="Mobile Phone") | Q(details__icontains="Cell Phone")),
+    (3, Q(details__icontains="Person") | Q(details__icontains="Face")),
+    (4, Q(details__icontains="High Volume")),
+    (5, Q(details__icontains="Book Detected") | Q(details__icontains="Laptop Detected")),
+]
+
+
+def backfill_categories(apps, schema_editor):
+    ViolationLog = apps.get_model("exams", "ViolationLog")
+    for category, condition in BACKFILL:
+        ViolationLog.objects.filter(condition, category=0).update(category=category)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exams", "0006_violationlog_category"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_categories, migrations.RunPython.noop),
+    ]
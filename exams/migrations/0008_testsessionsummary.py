@@ -0,0 +1,147 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:06
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+# ViolationLog.category -> TestSessionSummary counter column
+COUNT_FIELDS = {
+    0: "other_count",
+    1: "tab_switch_count",
+    2: "mobile_count",
+    3: "person_count",
+    4: "audio_count",
+    5: "object_count",
+    6: "behaviour_count",
+    7: "scan_count",
+    8: "environment_count",
+}
+
+
+def backfill_summaries(apps, schema_editor):
+    TestSessionSummary = apps.get_model("exams", "TestSessionSummary")
+    ViolationLog = apps.get_model("exams", "ViolationLog")
+    StudentTestInfo = apps.get_model("exams", "StudentTestInfo")
+
+    summaries = {}
+    rows = (
+        ViolationLog.objects.order_by()
+        .values("student_id", "test_id", "category")
+        .annotate(score=Sum("score"), count=Count("vid"), last=Max(Coalesce("last_seen", "timestamp")))
+    )
+    for row in rows:
+        values = summaries.setdefault(
+            (row["student_id"], row["test_id"]),
+            dict(dict.fromkeys(COUNT_FIELDS.values(), 0), total_score=0, violation_count=0, last_event_at=None),
+        )
+        values[COUNT_FIELDS.get(row["category"], "other_count")] += row["count"]
+        values["total_score"] += row["score"] or 0
+        values["violation_count"] += row["count"]
+        if values["last_event_at"] is None or row["last"] > values["last_event_at"]:
+            values["last_event_at"] = row["last"]
+    for info in StudentTestInfo.objects.order_by("stiid"):
+        values = summaries.setdefault((info.uid_id, info.test_id), {})
+        values.update(time_left=info.time_left, completed=info.completed)
+
+    for (student_id, test_id), values in summaries.items():
+        TestSessionSummary.objects.update_or_create(student_id=student_id, test_id=test_id, defaults=values)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("exams", "0007_backfill_violationlog_category"),
+    ]
+
+    operations = [
+        migrations.RenameModel(
+            old_name="SessionScore",
+            new_name="TestSessionSummary",
+        ),
+        migrations.AlterModelTable(
+            name="testsessionsummary",
+            table="test_session_summaries",
+        ),
+        migrations.AlterField(
+            model_name="testsessionsummary",
+            name="student",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="session_summaries",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="testsessionsummary",
+            name="violation_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="testsessionsummary",
+            name="other_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="testsessionsummary",
+            name="tab_switch_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="testsessionsummary",
+            name="mobile_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="testsessionsummary",
+            name="person_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="testsessionsummary",
+            name="audio_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="testsessionsummary",
+            name="object_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="testsessionsummary",
+            name="behaviour_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="testsessionsummary",
+            name="scan_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="testsessionsummary",
+            name="environment_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="testsessionsummary",
+            name="last_event_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="testsessionsummary",
+            name="completed",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="testsessionsummary",
+            name="time_left",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="testsessionsummary",
+            index=models.Index(fields=["test_id", "student"], name="test_sessio_test_id_7805d7_idx"),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,148 @@
+"""
+Process-wide registry of inference models.
+
+Each model is registered with a loader (and optionally a warm-up function run
+once on a dummy input) and is loaded at most once per process. Load time,
+warm-up time and the resident-memory growth caused by the load are recorded
+for ``/health/models``. A failed load is not retried on every request: the
+next attempt waits ``retry_seconds``, doubling per consecutive failure up to
+``max_retry_seconds``.
+
+Server entry points (``quizapp/wsgi.py`` and ``quizapp/asgi.py``) call
+:func:`preload_models` so a worker only starts serving once its models are
+loaded and warm (see ``MODEL_PRELOAD``).
+"""
+import os
+import threading
+import time
+
+COLD, LOADING, READY, FAILED = 'cold', 'loading', 'ready', 'failed'
+
+
+class _Entry:
+    def __init__(self, name, loader, warmup, preload):
+        self.name = name
+        self.loader = loader
+        self.warmup = warmup
+        self.preload = preload
+        self.lock = threading.Lock()
+        self.state = COLD
+        self.model = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.memory_bytes = None
+        self.error = None
+        self.failures = 0
+        self.retry_at = 0.0
+        self.pid = os.getpid()
+
+
+class ModelRegistry:
+
+    def __init__(self, retry_seconds=30, max_retry_seconds=600):
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self._entries = {}
+
+    def register(self, name, loader, warmup=None, preload=True):
+        """
+        Register ``loader()`` (returns the model or raises) under ``name``.
+        ``warmup(model)`` runs once after a successful load. Models with
+        ``preload=False`` are only loaded on first use and do not count
+        towards readiness.
+        """
+        self._entries[name] = _Entry(name, loader, warmup, preload)
+
+    def get(self, name):
+        """The loaded model, loading it now if needed; ``None`` if unavailable."""
+        entry = self._entries[name]
+        if entry.state == READY and entry.pid == os.getpid():
+            return entry.model
+        with entry.lock:
+            if entry.pid != os.getpid():
+                # Forked worker: the parent's bookkeeping does not apply here,
+                # but a model loaded before the fork is still usable.
+                entry.pid = os.getpid()
+                entry.failures, entry.retry_at = 0, 0.0
+            if entry.state == READY:
+                return entry.model
+            if entry.state == FAILED and time.monotonic() < entry.retry_at:
+                return None
+            self._load(entry)
+            return entry.model
+
+    def _load(self, entry):
+        import psutil
+
+        process = psutil.Process()
+        entry.state = LOADING
+        rss_before = process.memory_info().rss
+        started = time.perf_counter()
+        try:
+            model = entry.loader()
+            if model is None:
+                raise RuntimeError("loader returned no model")
+            entry.load_seconds = time.perf_counter() - started
+            if entry.warmup is not None:
+                started = time.perf_counter()
+                entry.warmup(model)
+                entry.warmup_seconds = time.perf_counter() - started
+        except Exception as e:
+            entry.failures += 1
+            delay = min(self.max_retry_seconds, self.retry_seconds * 2 ** (entry.failures - 1))
+            entry.retry_at = time.monotonic() + delay
+            entry.state, entry.model, entry.error = FAILED, None, str(e)
+            print(f"Model '{entry.name}' failed to load ({e}); retrying in {delay:.0f}s")
+            return
+        entry.memory_bytes = process.memory_info().rss - rss_before
+        entry.state, entry.model, entry.error, entry.failures = READY, model, None, 0
+        print(f"Model '{entry.name}' ready: loaded in {entry.load_seconds:.2f}s, "
+              f"warm-up {entry.warmup_seconds or 0:.2f}s, +{entry.memory_bytes / 2**20:.0f} MiB")
+
+    def preload(self):
+        """Load and warm up every model registered with ``preload=True``."""
+        for name, entry in self._entries.items():
+            if entry.preload:
+                self.get(name)
+
+    @property
+    def ready(self):
+        return all(entry.state == READY for entry in self._entries.values() if entry.preload)
+
+    def status(self):
+        now = time.monotonic()
+        return {
+            name: {
+                'state': entry.state,
+                'preload': entry.preload,
+                'load_seconds': entry.load_seconds,
+                'warmup_seconds': entry.warmup_seconds,
+                'memory_bytes': entry.memory_bytes,
+                'error': entry.error,
+                'failures': entry.failures,
+                'retry_in_seconds': max(0.0, entry.retry_at - now) if entry.state == FAILED else None,
+            }
+            for name, entry in self._entries.items()
+        }
+
+
+MODELS = ModelRegistry()
+
+
+def preload_models():
+    """
+    Preload hook for server entry points. Runs in the foreground unless
+    ``MODEL_PRELOAD = 'background'``; does nothing when it is ``False``.
+    """
+    from django.conf import settings
+
+    mode = getattr(settings, 'MODEL_PRELOAD', True)
+    if not mode:
+        return
+    # Importing the views registers their models
+    from . import views  # noqa: F401
+
+    if mode == 'background':
+        threading.Thread(target=MODELS.preload, name='model-preload', daemon=True).start()
+    else:
+        MODELS.preload()
@@ -187,6 +187,19 @@ class PracticalTest(models.Model):
 
 class ViolationLog(models.Model):
     """Log for proctoring violations"""
+
+    class Category(models.IntegerChoices):
+        """What kind of violation a row records; set from the rule that fired"""
+        OTHER = 0, 'Other'
+        TAB_SWITCH = 1, 'Tab switch'
+        MOBILE = 2, 'Mobile phone'
+        PERSON = 3, 'Person / face'
+        AUDIO = 4, 'Audio'
+        OBJECT = 5, 'Restricted object'
+        BEHAVIOUR = 6, 'Head pose / gaze'
+        SCAN = 7, '360 scan'
+        ENVIRONMENT = 8, 'Environment'
+
     vid = models.BigAutoField(primary_key=True)
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='violations')
     test_id = models.CharField(max_length=100)
@@ -194,10 +207,69 @@ class ViolationLog(models.Model):
     details = models.TextField()
     evidence = models.TextField(null=True, blank=True)  # Base64 image or path
     score = models.IntegerField(default=0)
+    # Hits of the same rule merged into this event by its suppression window
+    occurrences = models.PositiveIntegerField(default=1)
+    last_seen = models.DateTimeField(null=True, blank=True)
+    category = models.PositiveSmallIntegerField(choices=Category.choices, default=Category.OTHER)
 
     class Meta:
         db_table = 'violation_logs'
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['test_id', 'student', 'category']),
+        ]
 
     def __str__(self):
         return f"{self.student.email} - {self.test_id} - {self.timestamp}"
+
+
+class TestSessionSummary(models.Model):
+    """
+    Per student per test: running violation score and counts, last event and
+    exam progress. Kept in step with ViolationLog and StudentTestInfo on every
+    write (see scoring) so dashboards read one row per student.
+    """
+    # ViolationLog.Category -> counter column
+    COUNT_FIELDS = {
+        ViolationLog.Category.OTHER: 'other_count',
+        ViolationLog.Category.TAB_SWITCH: 'tab_switch_count',
+        ViolationLog.Category.MOBILE: 'mobile_count',
+        ViolationLog.Category.PERSON: 'person_count',
+        ViolationLog.Category.AUDIO: 'audio_count',
+        ViolationLog.Category.OBJECT: 'object_count',
+        ViolationLog.Category.BEHAVIOUR: 'behaviour_count',
+        ViolationLog.Category.SCAN: 'scan_count',
+        ViolationLog.Category.ENVIRONMENT: 'environment_count',
+    }
+
+    ssid = models.BigAutoField(primary_key=True)
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='session_summaries')
+    test_id = models.CharField(max_length=100)
+    total_score = models.IntegerField(default=0)
+    violation_count = models.PositiveIntegerField(default=0)
+    other_count = models.PositiveIntegerField(default=0)
+    tab_switch_count = models.PositiveIntegerField(default=0)
+    mobile_count = models.PositiveIntegerField(default=0)
+    person_count = models.PositiveIntegerField(default=0)
+    audio_count = models.PositiveIntegerField(default=0)
+    object_count = models.PositiveIntegerField(default=0)
+    behaviour_count = models.PositiveIntegerField(default=0)
+    scan_count = models.PositiveIntegerField(default=0)
+    environment_count = models.PositiveIntegerField(default=0)
+    last_event_at = models.DateTimeField(null=True, blank=True)
+    # From StudentTestInfo; time_left is None until the student starts the exam
+    completed = models.IntegerField(default=0)
+    time_left = models.IntegerField(null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'test_session_summaries'
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'test_id'], name='session_scores_student_test_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['test_id', 'student']),
+        ]
+
+    def __str__(self):
+        return f"{self.student.email} - {self.test_id} - {self.total_score}"
@@ -0,0 +1,108 @@
+"""
+Per-student violation counters for the professor's live monitoring page.
+
+The counters are read from the ``TestSessionSummary`` rows kept up to date on
+write, so a read costs one indexed lookup however many violations have been
+logged. With the WebSocket router served (``PROCTORING_WEBSOCKET``) the page
+subscribes to ``/ws/monitoring/`` and :class:`MonitoringFeed` pushes changed
+counters to it: each process reads a test's summaries once every
+``PROCTORING_MONITORING_FEED_SECONDS`` while at least one dashboard watches
+the test, and not at all otherwise. Summaries are shared through the database,
+so violations written by any worker reach every dashboard. Without the socket
+the page polls ``ajaxstudentmonitoringstats``.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .models import TestSessionSummary, ViolationLog
+
+# Dashboard counter -> ViolationLog.Category it counts ('tot' counts all)
+STAT_CATEGORIES = {
+    'win': ViolationLog.Category.TAB_SWITCH,
+    'mob': ViolationLog.Category.MOBILE,
+    'per': ViolationLog.Category.PERSON,
+    'aud': ViolationLog.Category.AUDIO,
+}
+STAT_KEYS = tuple(STAT_CATEGORIES) + ('tot',)
+
+
+def monitoring_stats(test_id, email=None):
+    """``{email: {counter: count}}`` for a test (or one student of it), from its session summaries."""
+    summaries = TestSessionSummary.objects.filter(test_id=test_id)
+    if email is not None:
+        summaries = summaries.filter(student__email=email)
+    columns = [TestSessionSummary.COUNT_FIELDS[category] for category in STAT_CATEGORIES.values()]
+    rows = summaries.values_list('student__email', *columns, 'violation_count')
+    return {row[0]: dict(zip(STAT_KEYS, row[1:])) for row in rows}
+
+
+class _Subscriber:
+    """One dashboard: the counters changed since its last message, coalesced per student."""
+
+    def __init__(self, email=None):
+        self.email = email
+        self.changed = {}
+        self.wakeup = asyncio.Event()
+
+    def offer(self, stats):
+        if self.email is not None:
+            stats = {email: counters for email, counters in stats.items() if email == self.email}
+        if stats:
+            self.changed.update(stats)
+            self.wakeup.set()
+
+    async def next(self):
+        """The counters changed since the last call, waiting until there are some."""
+        await self.wakeup.wait()
+        self.wakeup.clear()
+        changed, self.changed = self.changed, {}
+        return changed
+
+
+class MonitoringFeed:
+    """Per-process fan-out of each watched test's counters to its dashboards (one event loop)."""
+
+    def __init__(self, interval):
+        self.interval = max(0.1, float(interval))
+        self._subscribers = {}
+        self._latest = {}
+        self._tasks = {}
+
+    def subscribe(self, test_id, email=None):
+        """Start watching ``test_id`` (or one of its students); call from the event loop."""
+        subscriber = _Subscriber(email)
+        self._subscribers.setdefault(test_id, set()).add(subscriber)
+        if test_id in self._latest:
+            subscriber.offer(self._latest[test_id])
+        if test_id not in self._tasks:
+            self._tasks[test_id] = asyncio.ensure_future(self._watch(test_id))
+        return subscriber
+
+    def unsubscribe(self, test_id, subscriber):
+        subscribers = self._subscribers.get(test_id, set())
+        subscribers.discard(subscriber)
+        if not subscribers:
+            self._subscribers.pop(test_id, None)
+
+    async def _watch(self, test_id):
+        try:
+            while self._subscribers.get(test_id):
+                try:
+                    stats = await sync_to_async(monitoring_stats)(test_id)
+                except Exception as e:
+                    print(f"Monitoring feed error: {e}")
+                else:
+                    latest = self._latest.get(test_id, {})
+                    changed = {email: counters for email, counters in stats.items() if latest.get(email) != counters}
+                    self._latest[test_id] = stats
+                    for subscriber in list(self._subscribers.get(test_id, ())):
+                        subscriber.offer(changed)
+                await asyncio.sleep(self.interval)
+        finally:
+            self._tasks.pop(test_id, None)
+            self._latest.pop(test_id, None)
+
+
+MONITORING_FEED = MonitoringFeed(getattr(settings, 'PROCTORING_MONITORING_FEED_SECONDS', 2))
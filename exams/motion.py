@@ -0,0 +1,110 @@
+"""
+Motion-gated inference for proctoring frames.
+
+Each exam session keeps a tiny grayscale thumbnail of the last frame that was
+run through the detector. A new frame whose thumbnail differs from it by less
+than ``threshold`` grey levels (mean absolute difference) reuses the previous
+detections instead of running the model again. Inference is still forced
+every ``max_skip_seconds`` so a static scene is re-checked periodically.
+
+The gate also suggests a capture interval to the client: it backs off while
+the scene is static and snaps back to the fastest rate as soon as it changes.
+"""
+import threading
+import time
+
+
+class GateDecision:
+    """Whether to run the detector for a frame, and the next capture interval."""
+
+    __slots__ = ("run_inference", "detections", "interval_ms")
+
+    def __init__(self, run_inference, detections, interval_ms):
+        self.run_inference = run_inference
+        self.detections = detections
+        self.interval_ms = interval_ms
+
+
+class _SessionState:
+    __slots__ = ("thumb", "detections", "inferred_at", "seen_at", "interval_ms")
+
+    def __init__(self):
+        self.thumb = None
+        self.detections = None
+        self.inferred_at = 0.0
+        self.seen_at = 0.0
+        self.interval_ms = 0
+
+
+def thumbnail(frame, size=32):
+    """Downscaled grayscale ``float32`` copy of a PIL image or BGR array."""
+    import cv2
+    import numpy as np
+
+    if isinstance(frame, np.ndarray):
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
+    else:
+        small = np.asarray(frame.convert("L").resize((size, size)))
+    return small.astype(np.float32)
+
+
+class MotionGate:
+    """Per-session change detector keyed by ``(user_id, test_id)``."""
+
+    def __init__(self, threshold=6.0, max_skip_seconds=5.0, min_interval_ms=1000,
+                 max_interval_ms=4000, backoff=1.5, thumb_size=32, idle_seconds=900):
+        self.threshold = float(threshold)
+        self.max_skip_seconds = float(max_skip_seconds)
+        self.min_interval_ms = int(min_interval_ms)
+        self.max_interval_ms = max(int(max_interval_ms), self.min_interval_ms)
+        self.backoff = float(backoff)
+        self.thumb_size = int(thumb_size)
+        self.idle_seconds = float(idle_seconds)
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def observe(self, key, frame):
+        """Compare ``frame`` with the session's last inferred frame."""
+        thumb = thumbnail(frame, self.thumb_size)
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            state = self._sessions.get(key)
+            if state is None:
+                state = self._sessions[key] = _SessionState()
+            state.seen_at = now
+
+            unchanged = (
+                state.thumb is not None
+                and now - state.inferred_at < self.max_skip_seconds
+                and float(abs(thumb - state.thumb).mean()) < self.threshold
+            )
+            if unchanged:
+                state.interval_ms = min(self.max_interval_ms, int(state.interval_ms * self.backoff))
+                return GateDecision(False, state.detections, state.interval_ms)
+
+            state.thumb = thumb
+            state.inferred_at = now
+            state.interval_ms = self.min_interval_ms
+            return GateDecision(True, None, state.interval_ms)
+
+    def remember(self, key, detections):
+        """Store the detections computed for the frame last let through."""
+        with self._lock:
+            state = self._sessions.get(key)
+            if state is not None:
+                state.detections = detections
+
+    def forget(self, key):
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def _sweep(self, now):
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        stale = [key for key, state in self._sessions.items() if now - state.seen_at > self.idle_seconds]
+        for key in stale:
+            del self._sessions[key]
@@ -0,0 +1,178 @@
+"""
+ONNX Runtime backend for the YOLO object detector.
+
+The ultralytics model is exported to ONNX once (``export_onnx``) and then run
+with ONNX Runtime on the CPU, with the thread pools sized for the host. Pre-
+and post-processing (letterbox, confidence filter, per-class NMS, box
+rescaling) are plain NumPy and follow ultralytics' own ``predict`` defaults,
+so the class names reported for a frame match the PyTorch backend.
+"""
+import ast
+import os
+
+import cv2
+import numpy as np
+import psutil
+
+from .inference import Detections
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+# ultralytics predict() defaults
+IOU_THRESHOLD = 0.7
+MAX_DETECTIONS = 300
+MAX_NMS_CANDIDATES = 30000
+_CLASS_OFFSET = 7680  # separates classes for batched NMS, as in ultralytics
+
+
+def export_onnx(model, path, imgsz=640):
+    """Export an ultralytics model to ``path`` (dynamic batch) and return the path."""
+    exported = model.export(format="onnx", imgsz=imgsz, dynamic=True, verbose=False)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if os.path.abspath(exported) != os.path.abspath(path):
+        os.replace(exported, path)
+    return path
+
+
+def letterbox(image, size):
+    """
+    Resize a BGR/RGB array to fit ``size`` x ``size`` keeping its aspect ratio,
+    padding with grey. Returns ``(padded, scale, (pad_x, pad_y))``.
+    """
+    h, w = image.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    dw, dh = (size - new_w) / 2, (size - new_h) / 2
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    padded = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return padded, scale, (left, top)
+
+
+def preprocess(image, size):
+    """
+    Letterbox a PIL image (RGB) or array (BGR, as from OpenCV) for the model.
+    Returns ``(padded_rgb, scale, pad, original_hw)``.
+    """
+    if isinstance(image, np.ndarray):
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB) if image.ndim == 3 else cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+    else:
+        rgb = np.asarray(image.convert("RGB"))
+    padded, scale, pad = letterbox(rgb, size)
+    return padded, scale, pad, rgb.shape[:2]
+
+
+def to_tensor(padded_images):
+    """Stack letterboxed RGB images into the model's NCHW float input."""
+    return np.stack(padded_images).transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+
+
+def nms(boxes, scores, iou_threshold):
+    """Indexes of the boxes kept by greedy non-maximum suppression, best first."""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def _default_threads():
+    return psutil.cpu_count(logical=False) or os.cpu_count() or 1
+
+
+class OnnxDetector:
+    """YOLOv8 ONNX model behind the same ``predict(images, conf)`` interface as the views use."""
+
+    def __init__(self, path, threads=None, providers=None, iou=IOU_THRESHOLD):
+        if ort is None:
+            raise ImportError("onnxruntime not installed (pip install -r requirements_onnx.txt)")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = int(threads or _default_threads())
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            path,
+            sess_options=options,
+            providers=providers or ["CPUExecutionProvider"],
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        size = model_input.shape[2]
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.imgsz = size if isinstance(size, int) else ast.literal_eval(meta.get("imgsz", "[640, 640]"))[0]
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        self.names = {int(k): v for k, v in ast.literal_eval(meta["names"]).items()} if "names" in meta else {}
+        self.iou = iou
+        self.path = path
+
+    def predict(self, images, conf):
+        """Detections for each image (PIL image or BGR array) at ``conf`` and above."""
+        prepared = [preprocess(image, self.imgsz) for image in images]
+        batch = to_tensor([p[0] for p in prepared])
+        if self.dynamic_batch:
+            outputs = self.session.run(None, {self.input_name: batch})[0]
+        else:
+            outputs = np.concatenate([
+                self.session.run(None, {self.input_name: batch[i:i + 1]})[0] for i in range(len(batch))
+            ])
+        return [
+            self._postprocess(output, conf, scale, pad, shape)
+            for output, (_, scale, pad, shape) in zip(outputs, prepared)
+        ]
+
+    def _postprocess(self, output, conf, scale, pad, shape):
+        # output: (4 + num_classes, anchors) -> (anchors, 4 + num_classes)
+        preds = output.T
+        class_scores = preds[:, 4:]
+        class_ids = class_scores.argmax(1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+        keep = scores > conf
+        if not keep.any():
+            return Detections.empty(self.names)
+        preds, class_ids, scores = preds[keep], class_ids[keep], scores[keep]
+        if len(scores) > MAX_NMS_CANDIDATES:
+            top = scores.argsort()[::-1][:MAX_NMS_CANDIDATES]
+            preds, class_ids, scores = preds[top], class_ids[top], scores[top]
+
+        xy, wh = preds[:, :2], preds[:, 2:4] / 2
+        boxes = np.concatenate([xy - wh, xy + wh], axis=1)
+        kept = nms(boxes + (class_ids * _CLASS_OFFSET)[:, None], scores, self.iou)[:MAX_DETECTIONS]
+        boxes, class_ids, scores = boxes[kept], class_ids[kept], scores[kept]
+
+        # Undo the letterbox
+        boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad[0]) / scale
+        boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad[1]) / scale
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, shape[1])
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])
+        return Detections(class_ids, scores, boxes, self.names)
+
+
+def load_onnx_detector(path, export_from=None, threads=None, providers=None):
+    """
+    Open the ONNX detector at ``path``, exporting it first with
+    ``export_from()`` (which returns the ultralytics model) if it does not
+    exist yet.
+    """
+    if not os.path.exists(path):
+        if export_from is None:
+            raise FileNotFoundError(path)
+        print(f"Exporting detector to ONNX: {path}")
+        export_onnx(export_from(), path)
+    return OnnxDetector(path, threads=threads, providers=providers)
@@ -0,0 +1,204 @@
+"""
+Declarative proctoring rules.
+
+A rule is a dict describing what fires it and what it scores::
+
+    {'key': 'mobile_phone', 'when': 'present', 'classes': ['cell phone', 'mobile phone'],
+     'score': 2, 'alert': 'Mobile Phone Detected'}
+
+``when`` is one of
+
+* ``absent`` - none of ``classes`` detected (e.g. no person in frame)
+* ``more_than`` - more than ``count`` detections of ``classes``
+* ``present`` - at least one of ``classes`` detected
+* ``audio`` - the client's audio level is above ``threshold``
+* ``signal`` - the vision pipeline raised any of ``signals`` (e.g.
+  ``head_left``; see ``vision.signals``)
+
+``alert`` and ``details`` (defaults to ``alert``) may use ``{count}`` and
+``{voice_db}``. ``category`` names the ``ViolationLog.Category`` its rows
+are stored under (default ``BEHAVIOUR`` for signal rules, else ``OTHER``);
+each profile's rules carry their own. Rules are compiled once into a :class:`RuleSet`. For each
+detector (see ``inference.DetectorMetadata``) it builds a class-ID x rule
+matrix, so a frame's object rules are counted with one ``bincount`` over its
+class IDs and a matrix product, whatever the number of rules.
+
+``PROCTORING_RULES`` replaces the default rule list and
+``PROCTORING_RULE_OVERRIDES`` adjusts it per ``Teacher.proctoring_type``::
+
+    PROCTORING_RULE_OVERRIDES = {
+        1: {'terminate_score': 20, 'rules': {'laptop': None, 'book': {'score': 2}}},
+    }
+
+where ``None`` disables a rule, a dict updates its fields and unknown keys add
+new rules.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+
+DEFAULT_RULES = [
+    {'key': 'no_face', 'when': 'absent', 'classes': ['person'], 'score': 2,
+     'alert': 'No Face Detected', 'category': 'PERSON'},
+    {'key': 'multiple_persons', 'when': 'more_than', 'classes': ['person'], 'count': 1, 'score': 2,
+     'alert': 'Multiple Persons Detected ({count})', 'details': 'Multiple Persons ({count})',
+     'category': 'PERSON'},
+    {'key': 'mobile_phone', 'when': 'present', 'classes': ['cell phone', 'mobile phone'], 'score': 2,
+     'alert': 'Mobile Phone Detected', 'category': 'MOBILE'},
+    {'key': 'book', 'when': 'present', 'classes': ['book'], 'score': 1,
+     'alert': 'Book Detected', 'category': 'OBJECT'},
+    # Laptop - if distinct from current device
+    {'key': 'laptop', 'when': 'present', 'classes': ['laptop'], 'score': 1,
+     'alert': 'Laptop Detected', 'category': 'OBJECT'},
+    # app.js sends 'average' as voice_db. Adjust threshold based on testing.
+    {'key': 'high_audio', 'when': 'audio', 'threshold': 50, 'score': 1,
+     'alert': 'High Audio Level', 'details': 'High Volume ({voice_db})', 'category': 'AUDIO'},
+]
+
+# Exams are terminated once a student's total violation score exceeds this.
+DEFAULT_TERMINATE_SCORE = 10
+
+_CONDITIONS = ('absent', 'more_than', 'present', 'audio', 'signal')
+
+
+class _Rule:
+    __slots__ = ('key', 'when', 'classes', 'count', 'threshold', 'signals', 'score', 'alert', 'details',
+                 'category')
+
+    def __init__(self, spec):
+        from .models import ViolationLog
+
+        if spec.get('when') not in _CONDITIONS:
+            raise ValueError(f"Rule {spec.get('key')!r}: unknown condition {spec.get('when')!r}")
+        category = spec.get('category') or ('BEHAVIOUR' if spec['when'] == 'signal' else 'OTHER')
+        if category not in ViolationLog.Category.names:
+            raise ValueError(f"Rule {spec.get('key')!r}: unknown category {category!r}")
+        self.key = spec['key']
+        self.when = spec['when']
+        self.classes = tuple(spec.get('classes', ()))
+        self.count = int(spec.get('count', 0))
+        self.threshold = float(spec.get('threshold', 0))
+        self.signals = frozenset(spec.get('signals', ()))
+        self.score = int(spec.get('score', 0))
+        self.alert = spec['alert']
+        self.details = spec.get('details', spec['alert'])
+        self.category = ViolationLog.Category[category]
+
+
+class RuleSet:
+    """Compiled rules for one proctoring profile."""
+
+    def __init__(self, specs, terminate_score=DEFAULT_TERMINATE_SCORE):
+        self.terminate_score = terminate_score
+        self.rules = [_Rule(spec) for spec in specs]
+        self._object_rules = [i for i, rule in enumerate(self.rules) if rule.when in ('absent', 'more_than', 'present')]
+        self._audio_rules = [i for i, rule in enumerate(self.rules) if rule.when == 'audio']
+        self._signal_rules = [i for i, rule in enumerate(self.rules) if rule.when == 'signal']
+        # DetectorMetadata.key -> class ID x object rule count matrix
+        self._matrices = {}
+
+    def _matrix(self, metadata):
+        matrix = self._matrices.get(metadata.key)
+        if matrix is None:
+            import numpy as np
+
+            matrix = np.zeros((metadata.num_classes, len(self._object_rules)), dtype=np.int64)
+            for column, i in enumerate(self._object_rules):
+                matrix[:, column] = metadata.class_mask(self.rules[i].classes)
+            matrix = self._matrices.setdefault(metadata.key, matrix)
+        return matrix
+
+    def _object_counts(self, detected_objects):
+        """Detections counted by each object rule, in ``_object_rules`` order."""
+        if hasattr(detected_objects, 'class_ids'):
+            metadata = detected_objects.metadata
+            return (metadata.counts(detected_objects.class_ids) @ self._matrix(metadata)).tolist()
+        # Plain list of class names
+        detected = {}
+        for name in detected_objects:
+            detected[name] = detected.get(name, 0) + 1
+        return [
+            sum(detected.get(name, 0) for name in self.rules[i].classes)
+            for i in self._object_rules
+        ]
+
+    def evaluate(self, detected_objects, voice_db=None, signals=()):
+        """
+        Score one frame. Returns ``(alerts, events)`` where ``events`` is a list
+        of ``(rule_key, details, score, category)`` ready for ``record_violations``.
+
+        ``detected_objects`` is the frame's ``Detections`` (or a list of class
+        names), or ``None`` when no detector is available (only audio rules
+        apply then). ``signals`` are the behaviour flags raised by the vision
+        pipeline.
+        """
+        fired = []
+        if detected_objects is not None:
+            counts = self._object_counts(detected_objects)
+            for i, count in zip(self._object_rules, counts):
+                rule = self.rules[i]
+                if ((rule.when == 'absent' and count == 0)
+                        or (rule.when == 'more_than' and count > rule.count)
+                        or (rule.when == 'present' and count > 0)):
+                    fired.append((i, count))
+
+        if self._audio_rules and voice_db:
+            try:
+                level = float(voice_db)
+            except (ValueError, TypeError):
+                level = None
+            if level is not None:
+                fired.extend((i, 0) for i in self._audio_rules if level > self.rules[i].threshold)
+
+        if self._signal_rules and signals:
+            fired.extend((i, 0) for i in self._signal_rules if not self.rules[i].signals.isdisjoint(signals))
+
+        alerts = []
+        events = []
+        for i, count in sorted(fired):
+            rule = self.rules[i]
+            alerts.append(rule.alert.format(count=count, voice_db=voice_db))
+            events.append((rule.key, rule.details.format(count=count, voice_db=voice_db), rule.score, rule.category))
+        return alerts, events
+
+
+def _merge_rules(base, overrides):
+    specs = [dict(spec) for spec in base]
+    index = {spec['key']: spec for spec in specs}
+    for key, change in (overrides or {}).items():
+        if change is None:
+            specs = [spec for spec in specs if spec['key'] != key]
+            index.pop(key, None)
+        elif key in index:
+            index[key].update(change)
+        else:
+            spec = dict(change, key=key)
+            specs.append(spec)
+            index[key] = spec
+    return specs
+
+
+@lru_cache(maxsize=None)
+def rule_set(proctoring_type=None):
+    """Compiled rules for a ``Teacher.proctoring_type`` (``None`` for the defaults)."""
+    base = getattr(settings, 'PROCTORING_RULES', None) or DEFAULT_RULES
+    terminate_score = getattr(settings, 'PROCTORING_TERMINATE_SCORE', DEFAULT_TERMINATE_SCORE)
+    override = getattr(settings, 'PROCTORING_RULE_OVERRIDES', {}).get(proctoring_type) or {}
+    return RuleSet(
+        _merge_rules(base, override.get('rules')),
+        terminate_score=override.get('terminate_score', terminate_score),
+    )
+
+
+@lru_cache(maxsize=1024)
+def proctoring_type(test_id):
+    """An exam's ``Teacher.proctoring_type``, looked up once per process."""
+    from .models import Teacher
+    return Teacher.objects.filter(test_id=test_id).values_list('proctoring_type', flat=True).first()
+
+
+def rule_set_for_test(test_id):
+    """Rules for an exam, resolved from its ``proctoring_type`` once per process."""
+    if not test_id or not getattr(settings, 'PROCTORING_RULE_OVERRIDES', None):
+        return rule_set()
+    return rule_set(proctoring_type(test_id))
@@ -0,0 +1,215 @@
+"""
+Cheating-score rules applied to each proctoring frame, and the single write
+path for violations.
+
+Every ``ViolationLog`` insert goes through :func:`record_violations`, which
+bumps the session's ``TestSessionSummary`` (score, per-category counts, last
+event) with ``F()`` expressions in the same transaction. Reading a session's
+total is then a single-row lookup rather than a ``Sum`` over its whole log;
+:func:`record_progress` keeps the summary's exam progress in step with
+``StudentTestInfo``. Unless ``VIOLATION_BUFFER_SIZE`` is
+0, rows are buffered per process and written in bulk (see
+``violation_buffer``). Repeated hits of a rule inside its suppression window
+are merged into the open event instead of being written again (see
+``suppression``).
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import TestSessionSummary, ViolationLog
+from .rules import rule_set_for_test
+from .suppression import SuppressionWindows
+from .violation_buffer import ViolationBuffer
+
+
+def apply_frame_rules(user, test_id, detected_objects, voice_db, signals=()):
+    """
+    Log the violations found in one frame and return ``(alerts, total_score)``.
+
+    ``detected_objects`` is the object detector's ``Detections`` for the frame
+    (or a list of class names), or ``None`` when no detector is available
+    (only the audio rule applies).
+    ``signals`` are the vision pipeline's behaviour flags (head pose, gaze).
+    The rules come from the exam's proctoring profile (see ``rules``).
+    """
+    test_id = test_id or 'unknown'
+    alerts, events = rule_set_for_test(test_id).evaluate(detected_objects, voice_db, signals)
+
+    # --- CALCULATE TOTAL SCORE ---
+    if events:
+        total_score = record_violations(user, test_id, events)
+    else:
+        total_score = session_total(user, test_id)
+
+    return alerts, total_score
+
+
+def summary_defaults(logs):
+    """``TestSessionSummary`` counter values for a session's ViolationLog queryset."""
+    defaults = dict.fromkeys(TestSessionSummary.COUNT_FIELDS.values(), 0)
+    defaults.update(total_score=0, violation_count=0, last_event_at=None)
+    rows = logs.order_by().values('category').annotate(
+        score=Sum('score'), count=Count('vid'), last=Max(Coalesce('last_seen', 'timestamp'))
+    )
+    for row in rows:
+        defaults[TestSessionSummary.COUNT_FIELDS[row['category']]] += row['count']
+        defaults['total_score'] += row['score'] or 0
+        defaults['violation_count'] += row['count']
+        if defaults['last_event_at'] is None or row['last'] > defaults['last_event_at']:
+            defaults['last_event_at'] = row['last']
+    return defaults
+
+
+def _session_summary(user, test_id):
+    """
+    Summary row for a session, created on first use and seeded from any
+    ViolationLog rows written before it existed.
+    """
+    row = TestSessionSummary.objects.filter(student=user, test_id=test_id).first()
+    if row is not None:
+        return row
+    row, _ = TestSessionSummary.objects.get_or_create(
+        student=user,
+        test_id=test_id,
+        defaults=summary_defaults(ViolationLog.objects.filter(student=user, test_id=test_id))
+    )
+    return row
+
+
+def record_progress(user, test_id, **progress):
+    """Copy exam progress (``time_left``, ``completed``) written to StudentTestInfo into the summary."""
+    if not TestSessionSummary.objects.filter(student=user, test_id=test_id).update(**progress):
+        TestSessionSummary.objects.filter(pk=_session_summary(user, test_id).pk).update(**progress)
+
+
+def session_total(user, test_id):
+    """Current violation score for a student's exam session, including buffered rows."""
+    test_id = test_id or 'unknown'
+    if VIOLATION_BUFFER is None:
+        return _session_summary(user, test_id).total_score
+    return VIOLATION_BUFFER.total_score(
+        user.pk, test_id, lambda: _session_summary(user, test_id).total_score
+    )
+
+
+def _write_violations(rows, merged=()):
+    """
+    Insert ViolationLog rows and add them to the session summaries in one
+    transaction. ``merged`` rows were saved earlier and only had hits folded
+    into them; their counters are updated in place.
+    """
+    sessions = {}
+    for row in rows:
+        key = (row.student_id, row.test_id)
+        student, increments = sessions.get(key, (row.student, {}))
+        sessions[key] = (student, increments)
+        for field, amount in (('total_score', row.score), ('violation_count', 1),
+                              (TestSessionSummary.COUNT_FIELDS[row.category], 1)):
+            increments[field] = increments.get(field, 0) + amount
+    with transaction.atomic():
+        # Create (and seed) missing summary rows before inserting, so the
+        # seed does not count the new rows a second time.
+        summary_ids = {key: _session_summary(student, key[1]).pk for key, (student, _) in sessions.items()}
+        ViolationLog.objects.bulk_create(rows)
+        last_event = {}
+        for row in rows:
+            key = (row.student_id, row.test_id)
+            # Buffered rows may already have had hits merged into them
+            seen = max(row.timestamp, row.last_seen or row.timestamp)
+            last_event[key] = max(last_event.get(key, seen), seen)
+        for key, (_, increments) in sessions.items():
+            TestSessionSummary.objects.filter(pk=summary_ids[key]).update(
+                last_event_at=last_event[key],
+                **{field: F(field) + amount for field, amount in increments.items() if amount}
+            )
+        for row in merged:
+            # Rows without a pk are still buffered and carry their counters
+            if row.pk is not None:
+                ViolationLog.objects.filter(pk=row.pk).update(
+                    occurrences=row.occurrences,
+                    last_seen=row.last_seen
+                )
+                TestSessionSummary.objects.filter(
+                    Q(last_event_at__isnull=True) | Q(last_event_at__lt=row.last_seen),
+                    student_id=row.student_id,
+                    test_id=row.test_id
+                ).update(last_event_at=row.last_seen)
+
+
+_buffer_size = getattr(settings, 'VIOLATION_BUFFER_SIZE', 50)
+VIOLATION_BUFFER = ViolationBuffer(
+    _write_violations,
+    max_events=_buffer_size,
+    flush_ms=getattr(settings, 'VIOLATION_FLUSH_MS', 500),
+) if _buffer_size else None
+
+
+SUPPRESSION = SuppressionWindows(getattr(settings, 'VIOLATION_SUPPRESSION_SECONDS', {}))
+
+# Logged when the exam window loses focus (HTTP, async and WebSocket paths)
+TAB_SWITCH_EVENT = ("tab_switch", "Tab Switch / Window Focus Lost", 1, ViolationLog.Category.TAB_SWITCH)
+
+
+def record_violations(user, test_id, events, evidence=None):
+    """
+    Record one ViolationLog row per ``(rule, details, score, category)`` event
+    and add their scores to the session total. An event whose rule already has an open
+    event in this session's suppression window is merged into it and scores
+    nothing. Returns the new total, including rows still waiting in the write
+    buffer.
+    """
+    test_id = test_id or 'unknown'
+    now = timezone.now()
+    rows = []
+    merged = []
+    for rule, details, score, category in events:
+        open_row = SUPPRESSION.merge(user.pk, test_id, rule, now)
+        if open_row is not None:
+            merged.append(open_row)
+            continue
+        row = ViolationLog(
+            student=user, test_id=test_id, details=details, score=score, evidence=evidence,
+            category=category,
+        )
+        SUPPRESSION.opened(rule, row)
+        rows.append(row)
+    if VIOLATION_BUFFER is None:
+        if rows or merged:
+            _write_violations(rows, merged)
+    else:
+        if rows:
+            VIOLATION_BUFFER.add(rows)
+        for row in merged:
+            VIOLATION_BUFFER.merge(row)
+    return session_total(user, test_id)
+
+
+def flush_violations():
+    """Write any buffered violations now."""
+    if VIOLATION_BUFFER is not None:
+        VIOLATION_BUFFER.flush()
+
+
+def frame_verdict(user, alerts, total_score, test_id=None):
+    """JSON payload returned to the exam page for a scored frame."""
+    # --- RULE 5: AUTO SUBMIT (>PROCTORING_TERMINATE_SCORE unless the exam's rules say otherwise) ---
+    terminate_score = rule_set_for_test(test_id).terminate_score
+    if total_score > terminate_score:
+        # Make sure the evidence behind a termination is on disk
+        flush_violations()
+        print(f"Terminating exam for {user}. Score: {total_score}")
+        return {
+            'status': 'terminate',
+            'message': 'Cheating score exceeded limit. Exam terminated.',
+            'score': total_score
+        }
+
+    return {
+        'status': 'processed',
+        'alert': ", ".join(alerts) if alerts else None,
+        'score': total_score
+    }
@@ -0,0 +1,58 @@
+"""
+Per-rule suppression windows for violations.
+
+The first hit of a rule in an exam session opens an event; further hits of
+the same rule within ``windows[rule]`` seconds of that are merged into it
+(``occurrences`` and ``last_seen``) instead of becoming new ViolationLog rows
+and adding to the score again. State is kept in memory per process and is
+checked before anything is written.
+"""
+import threading
+import time
+
+
+class SuppressionWindows:
+    """Tracks the open event of each ``(student_id, test_id, rule)``."""
+
+    def __init__(self, windows):
+        self.windows = {rule: float(seconds) for rule, seconds in (windows or {}).items() if seconds}
+        self._open = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def merge(self, student_id, test_id, rule, seen_at):
+        """
+        Fold a hit into the session's open event for ``rule``.
+
+        Returns the open ``ViolationLog`` row that absorbed the hit, or
+        ``None`` if there is no open event and a new one must be recorded.
+        """
+        window = self.windows.get(rule)
+        if not window:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            entry = self._open.get((student_id, test_id, rule))
+            if entry is None or now - entry[0] >= window:
+                return None
+            row = entry[1]
+            row.occurrences += 1
+            row.last_seen = seen_at
+            return row
+
+    def opened(self, rule, row):
+        """Remember ``row`` as the open event for its session and ``rule``."""
+        if not self.windows.get(rule):
+            return
+        with self._lock:
+            self._open[(row.student_id, row.test_id, rule)] = (time.monotonic(), row)
+
+    def _sweep(self, now):
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        longest = max(self.windows.values(), default=0)
+        stale = [key for key, (opened_at, _) in self._open.items() if now - opened_at >= longest]
+        for key in stale:
+            del self._open[key]
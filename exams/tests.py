@@ -1,3 +1,1139 @@
-from django.test import TestCase
+import asyncio
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils.asyncio import async_unsafe
+
+from vision import Frame, VisionPipeline, resolve_stages
+
+from .inference import BatchInferenceEngine, Detections
+from .ingest import FrameIngestQueue
+from .models import TestSessionSummary, ViolationLog
+from .rules import DEFAULT_RULES, RuleSet, _merge_rules
+from .suppression import SuppressionWindows
+from .violation_buffer import ViolationBuffer
+
+# Machine-learning libraries that must only be imported when a model is used
+HEAVY_MODULES = {
+    'cv2', 'numpy', 'PIL', 'torch', 'ultralytics', 'tensorflow', 'keras',
+    'deepface', 'onnxruntime', 'onnx',
+}
+
+# Generous: with the heavy libraries imported this takes several seconds
+URLCONF_IMPORT_BUDGET_SECONDS = 1.5
+
+
+def import_times(statement):
+    """
+    Run ``statement`` in a fresh interpreter under ``python -X importtime``;
+    returns ``{module: cumulative seconds}`` for every module it imported.
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'quizapp.settings'))
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, timeout=120,
+    )
+    if completed.returncode != 0:
+        raise AssertionError(f'{statement!r} failed:\n{completed.stderr[-2000:]}')
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+class StartupImportTest(SimpleTestCase):
+    """Loading the URLconf (every ``manage.py`` command, every worker) stays free of ML imports."""
+
+    def test_urlconf_does_not_import_ml_libraries(self):
+        times = import_times('import django; django.setup(); import quizapp.urls')
+        self.assertFalse(
+            HEAVY_MODULES & set(times),
+            f'imported at startup: {sorted(HEAVY_MODULES & set(times))}',
+        )
+        self.assertLess(times['quizapp.urls'], URLCONF_IMPORT_BUDGET_SECONDS)
+
+    def test_camera_does_not_import_tensorflow(self):
+        times = import_times('import camera')
+        self.assertNotIn('tensorflow', times)
+        self.assertNotIn('keras', times)
+
+
+class BatchInferenceEngineTest(SimpleTestCase):
+
+    def setUp(self):
+        self.batches = []
+
+    def predict(self, images, conf):
+        self.batches.append((list(images), conf))
+        # One detection per image, with the image as its confidence
+        return [Detections([0], [image], [[0, 0, 1, 1]], {0: 'person'}) for image in images]
+
+    def test_full_batch_runs_at_once_at_the_lowest_threshold(self):
+        engine = BatchInferenceEngine(self.predict, max_batch_size=3, max_wait_ms=5000)
+        futures = [engine.submit(0.3, conf=0.5), engine.submit(0.6, conf=0.5), engine.submit(0.3, conf=0.2)]
+        results = [future.result(2) for future in futures]
+        self.assertEqual(self.batches, [([0.3, 0.6, 0.3], 0.2)])
+        # Each caller still gets its own threshold
+        self.assertEqual([len(detections) for detections in results], [0, 1, 1])
+
+    def test_partial_batch_runs_after_the_wait(self):
+        engine = BatchInferenceEngine(self.predict, max_batch_size=8, max_wait_ms=20)
+        started = time.monotonic()
+        self.assertEqual(len(engine.detect(0.9, timeout=2)), 1)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(self.batches, [([0.9], 0.25)])
+
+    def test_failure_reaches_every_caller(self):
+        engine = BatchInferenceEngine(lambda images, conf: [], max_batch_size=2, max_wait_ms=5000)
+        futures = [engine.submit(0.5), engine.submit(0.5)]
+        for future in futures:
+            with self.assertRaisesMessage(RuntimeError, 'Detector returned 0 results for 2 frames'):
+                future.result(2)
+
+
+class _FakePool:
+    """Detector pool stand-in: records each request's slot offset; ``hold[n]`` delays the n-th reply."""
+
+    def __init__(self):
+        from multiprocessing.connection import Listener
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.address = os.path.join(self.directory.name, 'pool.sock')
+        self.listener = Listener(self.address, authkey=b'key')
+        self.requests = []
+        self.hold = {}
+        threading.Thread(target=self.accept, daemon=True).start()
+
+    def accept(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self.serve, args=(conn,), daemon=True).start()
+
+    def serve(self, conn):
+        conn.send(('hello', {0: 'person'}))
+        try:
+            while True:
+                _, _, offset, _, _ = conn.recv()
+                hold = self.hold.get(len(self.requests))
+                self.requests.append(offset)
+                if hold is not None:
+                    hold.wait(10)
+                conn.send(('ok', 0, [0], [0.9], [[0, 0, 1, 1]]))
+        except (EOFError, OSError):
+            pass
+
+    def close(self):
+        self.listener.close()
+        self.directory.cleanup()
+
+
+class DetectorClientTest(SimpleTestCase):
+
+    def setUp(self):
+        import numpy as np
+
+        from .detector_pool import DetectorClient
+
+        self.pool = _FakePool()
+        self.addCleanup(self.pool.close)
+        self.client = DetectorClient(self.pool.address, authkey=b'key', slots=1, slot_bytes=16 * 16 * 3, timeout=0.5)
+        self.frame = np.zeros((16, 16, 3), dtype=np.uint8)
+
+    def test_slot_is_reused_after_each_reply(self):
+        for _ in range(3):
+            self.assertEqual(self.client.detect(self.frame).class_names(), ['person'])
+        self.assertEqual(self.pool.requests, [0, 0, 0])
+
+    def test_timed_out_slot_is_quarantined_until_the_late_reply(self):
+        late = self.pool.hold[0] = threading.Event()
+        with self.assertRaisesMessage(TimeoutError, 'did not answer'):
+            self.client.detect(self.frame)
+
+        results = []
+        second = threading.Thread(target=lambda: results.append(self.client.detect(self.frame)))
+        second.start()
+        time.sleep(0.2)
+        # The pool may still read the first frame from the only slot
+        self.assertEqual(len(self.pool.requests), 1)
+        late.set()
+        second.join(5)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(self.pool.requests, [0, 0])
+
+    def test_no_free_slot_while_the_pool_holds_it(self):
+        self.pool.hold[0] = threading.Event()
+        with self.assertRaisesMessage(TimeoutError, 'did not answer'):
+            self.client.detect(self.frame)
+        with self.assertRaisesMessage(TimeoutError, 'No free detector slot'):
+            self.client.detect(self.frame)
+        self.assertEqual(len(self.pool.requests), 1)
+        self.pool.hold[0].set()
+
+
+class MotionGateTest(SimpleTestCase):
+
+    def setUp(self):
+        import numpy as np
+
+        from .motion import MotionGate
+
+        self.clock = 1000.0
+        patcher = mock.patch('exams.motion.time.monotonic', side_effect=lambda: self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.gate = MotionGate(threshold=6, max_skip_seconds=5, min_interval_ms=1000, max_interval_ms=4000, backoff=2)
+        self.still = np.full((120, 160, 3), 100, dtype=np.uint8)
+        self.moved = self.still.copy()
+        self.moved[:, :80] = 200
+
+    def test_unchanged_frames_reuse_detections_and_back_off(self):
+        decision = self.gate.observe('s', self.still)
+        self.assertEqual((decision.run_inference, decision.interval_ms), (True, 1000))
+        self.gate.remember('s', 'detections')
+
+        intervals = []
+        for _ in range(3):
+            self.clock += 1
+            decision = self.gate.observe('s', self.still + 3)  # noise under the threshold
+            self.assertFalse(decision.run_inference)
+            self.assertEqual(decision.detections, 'detections')
+            intervals.append(decision.interval_ms)
+        self.assertEqual(intervals, [2000, 4000, 4000])
+
+        decision = self.gate.observe('s', self.moved)
+        self.assertEqual((decision.run_inference, decision.interval_ms), (True, 1000))
+
+    def test_static_scene_is_rechecked(self):
+        self.gate.observe('s', self.still)
+        self.clock += 4.9
+        self.assertFalse(self.gate.observe('s', self.still).run_inference)
+        self.clock += 0.1
+        self.assertTrue(self.gate.observe('s', self.still).run_inference)
+
+    def test_sessions_are_separate_and_forgotten(self):
+        self.gate.observe('a', self.still)
+        self.assertTrue(self.gate.observe('b', self.still).run_inference)
+        self.gate.forget('a')
+        self.assertTrue(self.gate.observe('a', self.still).run_inference)
+
+
+def _jpeg(width=64, height=48, value=100):
+    import cv2
+    import numpy as np
+
+    _, encoded = cv2.imencode('.jpg', np.full((height, width, 3), value, dtype=np.uint8))
+    return encoded.tobytes()
+
+
+class FrameUploadTest(SimpleTestCase):
+    """``/exams/frame/``: raw-body and multipart frames, size limit and decode errors."""
+
+    def setUp(self):
+        from . import views
+
+        self.view = views.frame_upload_view
+        self.scored = []
+
+        def score_frame(user, test_id, frame, voice_db):
+            self.scored.append((test_id, voice_db, frame.bgr.shape, frame.roi))
+            return {'status': 'processed', 'alert': None, 'score': 0}
+
+        for patcher in (mock.patch.object(views, '_score_frame', score_frame),
+                        mock.patch.object(views, 'FRAME_QUEUE', None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def post(self, path, data, **kwargs):
+        request = RequestFactory().post(path, data, **kwargs)
+        request.user = SimpleNamespace(pk=1, is_authenticated=True)
+        response = self.view(request)
+        return response.status_code, json.loads(response.content)
+
+    def raw(self, body):
+        return self.post('/exams/frame/?testid=T1&voice_db=70', body, content_type='application/octet-stream')
+
+    def test_raw_body_frame(self):
+        self.assertEqual(self.raw(_jpeg()), (200, {'status': 'processed', 'alert': None, 'score': 0}))
+        self.assertEqual(self.scored, [('T1', '70', (48, 64, 3), None)])
+
+    def test_multipart_frame_with_a_bad_roi(self):
+        status, _ = self.post('/exams/frame/', {
+            'frame': SimpleUploadedFile('frame', _jpeg()), 'roi': SimpleUploadedFile('roi', b'not a jpeg'),
+            'roi_box': '0.2,0.1,0.8,0.9', 'testid': 'T2', 'voice_db': '0',
+        })
+        self.assertEqual(status, 200)
+        # The unreadable crop is dropped, the frame is still scored
+        self.assertEqual(self.scored, [('T2', '0', (48, 64, 3), None)])
+
+    def test_undecodable_and_empty_frames(self):
+        self.assertEqual(self.raw(b'not a jpeg'), (400, {'status': 'error', 'message': 'Could not decode frame'}))
+        self.assertEqual(self.raw(b''), (200, {'status': 'no_image'}))
+        self.assertEqual(self.scored, [])
+
+    @override_settings(PROCTORING_MAX_FRAME_BYTES=256)
+    def test_size_limit(self):
+        self.assertEqual(self.raw(_jpeg(value=0) + bytes(256)), (413, {'status': 'error', 'message': 'Frame too large'}))
+        self.assertEqual(self.scored, [])
+
+
+class ModelRegistryTest(SimpleTestCase):
+
+    def setUp(self):
+        from .model_registry import ModelRegistry
+
+        self.clock = 1000.0
+        patcher = mock.patch('exams.model_registry.time.monotonic', side_effect=lambda: self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        printer = mock.patch('builtins.print')
+        printer.start()
+        self.addCleanup(printer.stop)
+        self.registry = ModelRegistry(retry_seconds=30, max_retry_seconds=60)
+        self.loads = []
+        self.warmed = []
+
+    def loader(self, name, fail=False):
+        def load():
+            self.loads.append(name)
+            if fail:
+                raise OSError(f'{name} weights missing')
+            return name.upper()
+        return load
+
+    def test_preload_loads_and_warms_up_once(self):
+        self.registry.register('detector', self.loader('detector'), warmup=self.warmed.append)
+        self.registry.register('optional', self.loader('optional'), preload=False)
+        self.assertFalse(self.registry.ready)
+        self.assertEqual(self.registry.status()['detector']['state'], 'cold')
+
+        self.registry.preload()
+        self.assertTrue(self.registry.ready)
+        self.assertEqual(self.registry.get('detector'), 'DETECTOR')
+        self.assertEqual((self.loads, self.warmed), (['detector'], ['DETECTOR']))
+        self.assertEqual(self.registry.status()['optional']['state'], 'cold')
+
+    def test_failed_load_is_retried_with_backoff(self):
+        self.registry.register('detector', self.loader('detector', fail=True))
+        self.registry.preload()
+        status = self.registry.status()['detector']
+        self.assertEqual((status['state'], status['error'], status['retry_in_seconds']),
+                         ('failed', 'detector weights missing', 30))
+        self.assertFalse(self.registry.ready)
+
+        self.clock += 29
+        self.assertIsNone(self.registry.get('detector'))
+        self.assertEqual(len(self.loads), 1)
+        self.clock += 1
+        self.assertIsNone(self.registry.get('detector'))
+        self.assertEqual(len(self.loads), 2)
+        self.assertEqual(self.registry.status()['detector']['retry_in_seconds'], 60)
+
+    def test_health_details_are_for_staff(self):
+        from . import views
+
+        self.registry.register('detector', self.loader('detector', fail=True))
+        self.registry.preload()
+
+        def health(user):
+            request = RequestFactory().get('/health/models')
+            request.user = user
+            with mock.patch.object(views, 'MODELS', self.registry):
+                response = views.model_health_view(request)
+            return response.status_code, json.loads(response.content)
+
+        status, payload = health(SimpleNamespace(is_authenticated=False, is_staff=False))
+        self.assertEqual((status, payload), (503, {'ready': False, 'models': {'detector': {'state': 'failed'}}}))
+        status, payload = health(SimpleNamespace(is_authenticated=True, is_staff=True))
+        self.assertEqual(payload['pid'], os.getpid())
+        self.assertEqual(payload['models']['detector']['error'], 'detector weights missing')
+
+
+class VisionPipelineTest(SimpleTestCase):
+
+    def test_stages_run_in_pipeline_order_with_dependencies(self):
+        self.assertEqual(resolve_stages(['gaze', 'head_pose']), ('faces', 'landmarks', 'head_pose', 'gaze'))
+        self.assertEqual(resolve_stages(['objects', 'decode']), ('decode', 'objects'))
+        with self.assertRaisesMessage(ValueError, "Unknown vision stage 'pose'"):
+            resolve_stages(['pose'])
+
+        pipeline = VisionPipeline()
+        ran = []
+        for stage in ('decode', 'objects', 'faces', 'landmarks', 'head_pose', 'gaze'):
+            setattr(pipeline, f'_{stage}', lambda frame, stage=stage, **options: ran.append(stage))
+        pipeline.run(Frame.from_bytes(_jpeg()), stages=('head_pose', 'objects'))
+        self.assertEqual(ran, ['objects', 'faces', 'landmarks', 'head_pose'])
+
+    def test_models_are_only_loaded_by_stages_that_use_them(self):
+        loaded = []
+        detector_calls = []
+        pipeline = VisionPipeline(
+            object_detector=lambda frame, conf: detector_calls.append(conf) or 'detections',
+            face_model=lambda: loaded.append('faces'),
+            landmark_model=lambda: loaded.append('landmarks'),
+            conf=0.4,
+        )
+        frame = pipeline.run(Frame.from_bytes(_jpeg()), stages=('objects',))
+        self.assertEqual((frame.objects, detector_calls, loaded), ('detections', [0.4], []))
+
+        # Without a face model there are no faces, so no landmarks either
+        frame = pipeline.run(Frame.from_bytes(_jpeg()), stages=('landmarks',))
+        self.assertEqual((frame.faces, frame.landmarks, loaded), ([], [], ['faces', 'landmarks']))
+
+
+class FaceTrackerTest(SimpleTestCase):
+
+    def setUp(self):
+        import cv2
+        import numpy as np
+
+        from vision import FaceTracker
+
+        self.np = np
+        self.tracker = FaceTracker(detect_every=3, track_width=320)
+        noise = np.random.RandomState(0).randint(0, 256, (240, 320)).astype(np.uint8)
+        self.texture = cv2.cvtColor(cv2.GaussianBlur(noise, (5, 5), 0), cv2.COLOR_GRAY2BGR)
+        self.detects = []
+
+    def frame(self, shift=0, image=None):
+        image = self.texture if image is None else image
+        return Frame.from_image(self.np.ascontiguousarray(self.np.roll(image, shift, axis=1)))
+
+    def detect(self, boxes):
+        def run():
+            self.detects.append(len(self.detects))
+            return boxes
+        return run
+
+    def test_detector_runs_every_few_frames_and_boxes_follow_the_face(self):
+        found = [self.tracker.faces('s', self.frame(shift * 2), self.detect([[100, 60, 180, 160]]))
+                 for shift in range(7)]
+        # Frames 0, 3 and 6 are detected, the others tracked
+        self.assertEqual(len(self.detects), 3)
+        self.assertEqual((self.tracker.detections, self.tracker.tracked), (3, 4))
+        # Two frames after detection the face has moved 4 px to the right
+        for tracked, expected in zip(found[2][0], [104, 60, 184, 160]):
+            self.assertAlmostEqual(tracked, expected, delta=2)
+
+    def test_detector_runs_on_every_frame_without_faces(self):
+        for _ in range(4):
+            self.assertEqual(self.tracker.faces('s', self.frame(), self.detect([])), [])
+        self.assertEqual(len(self.detects), 4)
+
+    def test_new_frame_size_and_forget_redetect(self):
+        box = [[100, 60, 180, 160]]
+        self.tracker.faces('s', self.frame(), self.detect(box))
+        small = self.np.ascontiguousarray(self.texture[:200, :300])
+        self.tracker.faces('s', Frame.from_image(small), self.detect(box))
+        self.tracker.forget('s')
+        self.tracker.faces('s', Frame.from_image(small), self.detect(box))
+        self.assertEqual(len(self.detects), 3)
+
+
+class RegionOfInterestTest(SimpleTestCase):
+    """Capture size negotiation, ROI hints and reading faces from the ROI crop."""
+
+    def setUp(self):
+        import numpy as np
+
+        from . import views
+
+        self.np = np
+        self.views = views
+        # 320x240 frame; the crop of its middle half is sent at twice the resolution
+        self.frame = Frame.from_image(np.zeros((240, 320, 3), dtype=np.uint8))
+        self.roi = Frame.from_image(np.zeros((240, 320, 3), dtype=np.uint8))
+
+    def test_capture_size_follows_the_detector_and_face_stages(self):
+        views = self.views
+        with mock.patch.object(views, '_detector_input_size', lambda test_id=None: 256):
+            with mock.patch.object(views, '_vision_stages', lambda test_id: ('objects',)):
+                self.assertEqual(views._capture_size('T1'), (256, 192))
+            with mock.patch.object(views, '_vision_stages', lambda test_id: ('objects', 'head_pose')):
+                self.assertEqual(views._capture_size('T1'), (300, 225))
+            with override_settings(PROCTORING_CAPTURE_SIZE=(800, 600)):
+                self.assertEqual(views._capture_size('T1'), (800, 600))
+
+    def test_hint_is_the_face_area_with_a_margin(self):
+        self.frame.faces = [[100, 80, 180, 160]]
+        with mock.patch.object(self.views, 'ROI_MARGIN', 0.25):
+            self.assertEqual(self.views._roi_hint(self.frame), [0.25, 0.25, 0.625, 0.75])
+        self.frame.faces = [[0, 0, 320, 240]]
+        self.assertEqual(self.views._roi_hint(self.frame), [0.0, 0.0, 1.0, 1.0])
+        self.frame.faces = []
+        self.assertIsNone(self.views._roi_hint(self.frame))
+
+    def test_faces_inside_the_crop_are_read_from_it(self):
+        self.frame.attach_roi(self.roi, ('0.25', '0.25', '0.75', '0.75'))
+        image, box, scale, offset = self.frame.face_source([100, 80, 180, 160])
+        self.assertIs(image, self.roi.bgr)
+        self.assertEqual((box, scale, offset), ([40, 40, 200, 200], (2.0, 2.0), (80.0, 60.0)))
+        # Crop pixels map back to the frame as the landmark stage does
+        self.assertEqual((self.np.array(box).reshape(2, 2) / scale + offset).ravel().tolist(), [100, 80, 180, 160])
+
+        image, box, scale, _ = self.frame.face_source([10, 10, 60, 60])
+        self.assertIs(image, self.frame.bgr)
+        self.assertEqual((box, scale), ([10, 10, 60, 60], (1.0, 1.0)))
+
+    def test_roi_box_is_clamped_and_must_not_be_empty(self):
+        self.frame.attach_roi(self.roi, (-0.5, 0.1, 1.5, 0.9))
+        self.assertEqual(self.frame.roi_box, (0.0, 0.1, 1.0, 0.9))
+        with self.assertRaisesMessage(ValueError, 'Empty region of interest'):
+            self.frame.attach_roi(self.roi, (0.5, 0.5, 0.5, 0.9))
+
+
+class EnvironmentProbeTest(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'environment.json')
+        self.checks = {'vm_hardware': False}
+        detector = SimpleNamespace(is_safe=True, get_all_checks=self.checks, errors={})
+        patcher = mock.patch('exams.vp_detector.Detector', lambda: detector)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def probe(self):
+        from .environment_probe import EnvironmentProbe
+
+        probe = EnvironmentProbe(self.path, interval=60, in_process=False)
+        self.addCleanup(lambda: probe._lock_fd is not None and os.close(probe._lock_fd))
+        return probe
+
+    def test_one_prober_per_snapshot_path(self):
+        elected, other = self.probe(), self.probe()
+        self.assertTrue(elected._acquire_lock())
+        self.assertFalse(other._acquire_lock())
+        # Without waiting, the loser returns at once and does not probe
+        with mock.patch.object(other, 'refresh') as refresh:
+            other.serve_forever(wait=False)
+        refresh.assert_not_called()
+
+        os.close(elected._lock_fd)
+        elected._lock_fd = None
+        self.assertTrue(other._acquire_lock())
+
+    def test_snapshot_file_is_shared_and_expires(self):
+        prober, reader = self.probe(), self.probe()
+        self.assertIsNone(reader.snapshot())
+        prober.refresh()
+        snapshot = reader.snapshot()
+        self.assertEqual((snapshot['is_safe'], snapshot['checks']), (True, {'vm_hardware': False}))
+
+        # Re-read only when the file changes
+        with mock.patch('builtins.open') as opened:
+            self.assertIs(reader.snapshot(), snapshot)
+        opened.assert_not_called()
+        self.checks['vm_hardware'] = True
+        prober.refresh()
+        self.assertEqual(reader.snapshot()['checks'], {'vm_hardware': True})
+
+        with mock.patch('exams.environment_probe.time.time', return_value=time.time() + 3 * 60 + 1):
+            self.assertIsNone(reader.snapshot())
+
+
+class FrameIngestQueueTest(SimpleTestCase):
+
+    def test_frames_of_a_busy_session_are_coalesced(self):
+        started = threading.Event()
+        release = threading.Event()
+        processed = []
+
+        def process(frame):
+            started.set()
+            release.wait(5)
+            processed.append(frame)
+            return {'alert': f'frame {frame}', 'score': frame}
+
+        frames = FrameIngestQueue(process, workers=1)
+        frames.submit('session', 1)
+        started.wait(5)
+        for frame in (2, 3, 4):
+            frames.submit('session', frame)
+        release.set()
+        for _ in range(100):
+            if len(processed) == 2:
+                break
+            time.sleep(0.01)
+        # Only the newest waiting frame is scored after the busy one
+        self.assertEqual(processed, [1, 4])
+        self.assertEqual(frames.take_latest('session'), {'alert': 'frame 4', 'score': 4})
+        self.assertEqual(frames.take_latest('session'), {'alert': None, 'score': 4})
+        frames.forget('session')
+        self.assertIsNone(frames.take_latest('session'))
+
+
+def _row(score=1, student_id=1, test_id='T1'):
+    """Stand-in for an unsaved ViolationLog row."""
+    return SimpleNamespace(student_id=student_id, test_id=test_id, score=score, occurrences=1, last_seen=None)
+
+
+class ViolationBufferTest(SimpleTestCase):
+
+    def setUp(self):
+        self.written = []
+        # Flushed by hand only
+        self.buffer = ViolationBuffer(self.write, max_events=100, flush_ms=60000)
+
+    def write(self, rows, merged):
+        self.written.append((list(rows), list(merged)))
+
+    def test_flush_writes_rows_and_clears_pending_scores(self):
+        rows = [_row(2), _row(3), _row(5, test_id='T2')]
+        self.buffer.add(rows)
+        self.assertEqual(self.buffer.pending_score(1, 'T1'), 5)
+        self.assertEqual(self.buffer.pending_score(1, 'T2'), 5)
+        self.buffer.flush()
+        self.assertEqual(self.written, [(rows, [])])
+        self.assertEqual(self.buffer.pending_score(1, 'T1'), 0)
+        self.buffer.flush()
+        self.assertEqual(len(self.written), 1)
+
+    def test_full_buffer_flushes(self):
+        self.buffer.max_events = 2
+        self.buffer.add([_row()])
+        self.assertEqual(self.written, [])
+        self.buffer.add([_row()])
+        self.assertEqual(len(self.written), 1)
+
+    def test_merged_rows_are_rewritten(self):
+        row = _row()
+        self.buffer.merge(row)
+        self.buffer.flush()
+        self.assertEqual(self.written, [([], [row])])
+
+    def test_failed_write_keeps_rows_and_pending_scores(self):
+        self.buffer._write = mock.Mock(side_effect=RuntimeError('database is locked'))
+        self.buffer.add([_row(4)])
+        with mock.patch('builtins.print'):
+            self.buffer.flush()
+        self.assertEqual(self.buffer.pending_score(1, 'T1'), 4)
+        self.buffer._write = self.write
+        self.buffer.flush()
+        self.assertEqual(self.buffer.pending_score(1, 'T1'), 0)
+        self.assertEqual(len(self.written[0][0]), 1)
+
+    def test_total_is_not_counted_twice_during_a_flush(self):
+        database = []
+        committed = threading.Event()
+        release = threading.Event()
+
+        def write(rows, merged):
+            database.extend(row.score for row in rows)
+            committed.set()
+            # Rows are visible in the database, pending scores not yet dropped
+            release.wait(5)
+
+        self.buffer._write = write
+        self.buffer.add([_row(3), _row(4)])
+        flusher = threading.Thread(target=self.buffer.flush)
+        flusher.start()
+        committed.wait(5)
+        totals = []
+        reader = threading.Thread(target=lambda: totals.append(self.buffer.total_score(1, 'T1', lambda: sum(database))))
+        reader.start()
+        time.sleep(0.05)
+        release.set()
+        flusher.join(5)
+        reader.join(5)
+        self.assertEqual(totals, [7])
+
+    def test_flush_between_the_two_reads_is_not_counted_twice(self):
+        database = []
+        self.buffer._write = lambda rows, merged: database.extend(row.score for row in rows)
+        self.buffer.add([_row(3), _row(4)])
+
+        def written_score():
+            if not database:
+                # The flush commits after the pending score was read
+                flusher = threading.Thread(target=self.buffer.flush)
+                flusher.start()
+                flusher.join(5)
+            return sum(database)
+
+        self.assertEqual(self.buffer.total_score(1, 'T1', written_score), 7)
+
+    def test_reads_do_not_wait_for_other_reads_or_sessions(self):
+        release = threading.Event()
+        self.buffer._write = lambda rows, merged: release.wait(5)
+        self.buffer.add([_row(3, test_id='T2')])
+        flusher = threading.Thread(target=self.buffer.flush)
+        flusher.start()
+        slow = threading.Thread(target=self.buffer.total_score, args=(2, 'T1', lambda: release.wait(5) and 0))
+        slow.start()
+        try:
+            self.buffer.add([_row(2)])
+            started = time.monotonic()
+            self.assertEqual(self.buffer.total_score(1, 'T1', lambda: 5), 7)
+            self.assertLess(time.monotonic() - started, 1)
+        finally:
+            release.set()
+            flusher.join(5)
+            slow.join(5)
+
+
+class SuppressionWindowsTest(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = 1000.0
+        patcher = mock.patch('exams.suppression.time.monotonic', side_effect=lambda: self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.windows = SuppressionWindows({'mobile_phone': 10, 'high_audio': 0})
+
+    def test_hits_inside_the_window_merge_into_the_open_event(self):
+        row = _row()
+        self.assertIsNone(self.windows.merge(1, 'T1', 'mobile_phone', 'seen-1'))
+        self.windows.opened('mobile_phone', row)
+        self.clock += 9
+        self.assertIs(self.windows.merge(1, 'T1', 'mobile_phone', 'seen-2'), row)
+        self.assertEqual((row.occurrences, row.last_seen), (2, 'seen-2'))
+
+    def test_window_expires(self):
+        self.windows.opened('mobile_phone', _row())
+        self.clock += 10
+        self.assertIsNone(self.windows.merge(1, 'T1', 'mobile_phone', 'seen'))
+
+    def test_sessions_and_rules_without_window_are_separate(self):
+        self.windows.opened('mobile_phone', _row())
+        self.windows.opened('high_audio', _row())
+        self.assertIsNone(self.windows.merge(2, 'T1', 'mobile_phone', 'seen'))
+        self.assertIsNone(self.windows.merge(1, 'T2', 'mobile_phone', 'seen'))
+        self.assertIsNone(self.windows.merge(1, 'T1', 'high_audio', 'seen'))
+
+
+class NmsTest(SimpleTestCase):
+
+    def test_overlapping_boxes_keep_the_best(self):
+        import numpy as np
+
+        from .onnx_backend import nms
+
+        boxes = np.array([[0, 0, 10, 10], [1, 1, 10, 10], [20, 20, 30, 30], [0, 0, 10, 9]], dtype=np.float32)
+        scores = np.array([0.8, 0.9, 0.5, 0.3], dtype=np.float32)
+        self.assertEqual(nms(boxes, scores, 0.7).tolist(), [1, 2])
+        self.assertEqual(nms(boxes, scores, 0.95).tolist(), [1, 0, 2, 3])
+@skipUnless(importlib.util.find_spec('tensorflow'), 'face_landmarks needs tensorflow')
+class SquareBoxesTest(SimpleTestCase):
+
+    def test_matches_the_per_box_code(self):
+        from face_landmarks import get_square_box, move_box, square_boxes
+
+        def per_box(face, shape=None):
+            # detect_marks before the boxes were vectorized
+            offset_y = int(abs((face[3] - face[1]) * 0.1))
+            facebox = get_square_box(move_box(face, [0, offset_y]))
+            if shape is None:
+                return list(facebox)
+            h, w = shape[:2]
+            if facebox[0] < 0:
+                facebox[0] = 0
+            if facebox[1] < 0:
+                facebox[1] = 0
+            if facebox[2] > w:
+                facebox[2] = w
+            if facebox[3] > h:
+                facebox[3] = h
+            return list(facebox)
+
+        shape = (480, 640, 3)
+        faces = [
+            [100, 100, 200, 200],  # square
+            [100, 100, 181, 250],  # slim, odd difference
+            [100, 100, 260, 191],  # short, odd difference
+            [-30, -40, 60, 90],    # past the top-left corner
+            [590, 400, 700, 520],  # past the bottom-right corner
+            [5, 300, 40, 479],     # slim box widened past the left edge
+        ]
+        self.assertEqual(square_boxes(faces, shape).tolist(), [per_box(face, shape) for face in faces])
+        self.assertEqual(square_boxes(faces).tolist(), [per_box(face) for face in faces])
+
+
+class RuleMatrixTest(SimpleTestCase):
+    """Rules judge detector class IDs through the precompiled masks."""
+
+    def test_class_ids_match_class_names(self):
+        names = {0: 'person', 1: 'book', 2: 'cell phone'}
+        detections = Detections([0, 0, 2], [0.9, 0.8, 0.7], [[0, 0, 1, 1]] * 3, names)
+        rules = RuleSet(DEFAULT_RULES)
+        self.assertEqual(rules.evaluate(detections), rules.evaluate(['person', 'person', 'cell phone']))
+        alerts, _ = rules.evaluate(detections, voice_db='80')
+        self.assertEqual(alerts, ['Multiple Persons Detected (2)', 'Mobile Phone Detected', 'High Audio Level'])
+
+    def test_copies_of_a_names_mapping_share_metadata(self):
+        from .inference import DetectorMetadata
+
+        rules = RuleSet(DEFAULT_RULES)
+        # As after each detector-pool reconnect: equal names, new dict
+        for _ in range(100):
+            names = {0: 'person', 1: 'book', 2: 'cell phone'}
+            rules.evaluate(Detections([0, 2], [0.9, 0.7], [[0, 0, 1, 1]] * 2, names))
+        self.assertIs(DetectorMetadata.for_names(dict(names)), DetectorMetadata.for_names(names))
+        self.assertEqual(len(rules._matrices), 1)
+
+
+class FrameVerdictTest(SimpleTestCase):
+
+    def setUp(self):
+        from .rules import rule_set
+
+        rule_set.cache_clear()
+        self.addCleanup(rule_set.cache_clear)
+
+    @override_settings(PROCTORING_TERMINATE_SCORE=3, PROCTORING_RULE_OVERRIDES={})
+    def test_terminate_score_setting_applies_with_and_without_test(self):
+        from .scoring import frame_verdict
+
+        with mock.patch('exams.scoring.flush_violations'), mock.patch('builtins.print'):
+            for test_id in (None, 'T1'):
+                self.assertEqual(frame_verdict('student', [], 3, test_id)['status'], 'processed')
+                self.assertEqual(frame_verdict('student', [], 4, test_id)['status'], 'terminate')
+
+
+class RuleCategoryTest(SimpleTestCase):
+    """Each profile's rules carry their own ViolationLog.Category."""
+
+    def test_profiles_keep_their_own_categories(self):
+        default = RuleSet(DEFAULT_RULES)
+        relabelled = RuleSet(_merge_rules(DEFAULT_RULES, {'book': {'category': 'OTHER'}}))
+        # Compiling the second profile must not change the first
+        _, default_events = default.evaluate(['person', 'book'])
+        _, relabelled_events = relabelled.evaluate(['person', 'book'])
+        self.assertEqual(default_events, [('book', 'Book Detected', 1, ViolationLog.Category.OBJECT)])
+        self.assertEqual(relabelled_events, [('book', 'Book Detected', 1, ViolationLog.Category.OTHER)])
+
+    def test_default_categories(self):
+        rules = RuleSet(DEFAULT_RULES + [
+            {'key': 'looking_away', 'when': 'signal', 'signals': ['head_left'], 'score': 1, 'alert': 'Looking Away'},
+            {'key': 'custom', 'when': 'present', 'classes': ['cup'], 'score': 1, 'alert': 'Cup'},
+        ])
+        categories = {rule.key: rule.category for rule in rules.rules}
+        self.assertEqual(categories['looking_away'], ViolationLog.Category.BEHAVIOUR)
+        self.assertEqual(categories['custom'], ViolationLog.Category.OTHER)
+        self.assertEqual(categories['mobile_phone'], ViolationLog.Category.MOBILE)
+
+    def test_unknown_category_fails_at_compile_time(self):
+        with self.assertRaisesMessage(ValueError, "unknown category 'PHONE'"):
+            RuleSet(_merge_rules(DEFAULT_RULES, {'mobile_phone': {'category': 'PHONE'}}))
+
+
+class AsyncVideoFeedTest(SimpleTestCase):
+    """``async_views.video_feed_view`` keeps sync work off the event loop."""
+
+    def setUp(self):
+        from . import async_views, views
+
+        self.views = views
+        self.view = async_views.video_feed_view
+        # Like the ORM: fails when called from the event loop's thread
+        total = mock.patch.object(views, 'session_total', async_unsafe(lambda user, test_id: 3))
+        total.start()
+        self.addCleanup(total.stop)
+
+    def post(self):
+        request = RequestFactory().post('/video_feed', {
+            'data[imgData]': 'aW1hZ2U=', 'data[testid]': 'T1', 'data[voice_db]': '0',
+        })
+        request.user = SimpleNamespace(pk=1, is_authenticated=True)
+        return self.view(request)
+
+    async def test_queued_frame(self):
+        frames = FrameIngestQueue(lambda *args: {'alert': None, 'score': 3}, workers=1)
+        with mock.patch.object(self.views, 'FRAME_QUEUE', frames):
+            response = await self.post()
+        self.assertEqual(json.loads(response.content)['status'], 'queued')
+        self.assertEqual(json.loads(response.content)['score'], 3)
+
+    async def test_scored_frame(self):
+        def score_frame(user, test_id, frame, voice_db):
+            return {'status': 'processed', 'alert': None, 'score': self.views.session_total(user, test_id)}
+
+        with mock.patch.object(self.views, 'FRAME_QUEUE', None), \
+                mock.patch.object(self.views, '_score_frame', score_frame):
+            response = await self.post()
+        self.assertEqual(json.loads(response.content), {'status': 'processed', 'alert': None, 'score': 3})
+
+
+class ProctoringSocketTest(SimpleTestCase):
+    """``/ws/proctoring/``: authentication, origin check and frame dropping."""
+
+    def setUp(self):
+        from . import views, websocket
+
+        self.websocket = websocket
+        self.user = SimpleNamespace(pk=1)
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.scored = []
+
+        def score_frame(user, test_id, frame, voice_db):
+            self.started.set()
+            self.release.wait(5)
+            self.scored.append(frame)
+            return {'status': 'terminate' if frame == b'end' else 'processed', 'alert': None, 'score': 0}
+
+        patches = [
+            mock.patch.object(views, '_score_frame', score_frame),
+            mock.patch.object(views.Frame, 'from_bytes', staticmethod(lambda data: data)),
+            mock.patch.object(views, '_forget_session'),
+            mock.patch.object(websocket, '_session_user', lambda cookies: self.user),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.release.set)
+
+    async def connect(self, headers=()):
+        self.events = asyncio.Queue()
+        self.sent = []
+
+        async def send(message):
+            self.sent.append(message)
+
+        await self.events.put({'type': 'websocket.connect'})
+        scope = {'type': 'websocket', 'path': self.websocket.PATH, 'query_string': b'testid=T1',
+                 'headers': [(b'host', b'exam.local')] + list(headers)}
+        return asyncio.ensure_future(self.websocket.proctoring_socket(scope, self.events.get, send))
+
+    async def until(self, condition):
+        for _ in range(200):
+            if condition():
+                return
+            await asyncio.sleep(0.01)
+        self.fail(f'timed out; sent {self.sent}')
+
+    def verdicts(self):
+        return [json.loads(message['text']) for message in self.sent if message.get('text')]
+
+    async def test_other_sites_and_anonymous_users_are_refused(self):
+        socket = await self.connect([(b'origin', b'https://elsewhere.example')])
+        await asyncio.wait_for(socket, 1)
+        self.assertEqual(self.sent, [{'type': 'websocket.close', 'code': self.websocket.CLOSE_FORBIDDEN}])
+
+        self.user = None
+        socket = await self.connect([(b'origin', b'http://exam.local')])
+        await asyncio.wait_for(socket, 1)
+        self.assertEqual(self.sent, [{'type': 'websocket.close', 'code': self.websocket.CLOSE_UNAUTHORIZED}])
+
+    async def test_waiting_frame_is_replaced_by_a_newer_one(self):
+        socket = await self.connect([(b'origin', b'http://exam.local')])
+        await self.events.put({'type': 'websocket.receive', 'bytes': b'first'})
+        await self.until(self.started.is_set)
+        for frame in (b'second', b'third'):
+            await self.events.put({'type': 'websocket.receive', 'bytes': frame})
+        await asyncio.sleep(0.05)
+        self.release.set()
+        await self.until(lambda: len(self.verdicts()) == 2)
+
+        self.assertEqual(self.sent[0], {'type': 'websocket.accept'})
+        self.assertEqual(self.scored, [b'first', b'third'])
+        self.assertEqual([verdict['dropped'] for verdict in self.verdicts()], [0, 1])
+
+        await self.events.put({'type': 'websocket.receive', 'bytes': b'end'})
+        await self.until(lambda: self.sent[-1]['type'] == 'websocket.close')
+        self.assertEqual(self.sent[-1], {'type': 'websocket.close', 'code': self.websocket.CLOSE_TERMINATED})
+        await self.events.put({'type': 'websocket.disconnect'})
+        await asyncio.wait_for(socket, 1)
+
+    @override_settings(PROCTORING_MAX_FRAME_BYTES=4)
+    async def test_oversized_frame_is_refused(self):
+        self.release.set()
+        socket = await self.connect()
+        await self.events.put({'type': 'websocket.receive', 'bytes': b'too large'})
+        await self.until(lambda: self.verdicts())
+        self.assertEqual(self.verdicts(), [{'type': 'error', 'message': 'Frame too large'}])
+        self.assertEqual(self.scored, [])
+        await self.events.put({'type': 'websocket.disconnect'})
+        await asyncio.wait_for(socket, 1)
+
+
+class MonitoringFeedTest(SimpleTestCase):
+    """The monitoring socket pushes changed counters from one read per test."""
+
+    def setUp(self):
+        from . import monitoring
+
+        self.reads = []
+        self.stats = {'a@x.com': {'win': 0, 'tot': 0}, 'b@x.com': {'win': 1, 'tot': 1}}
+
+        def monitoring_stats(test_id):
+            self.reads.append(test_id)
+            return {email: dict(counters) for email, counters in self.stats.items()}
+
+        patches = [
+            mock.patch.object(monitoring, 'monitoring_stats', monitoring_stats),
+            mock.patch.object(monitoring, 'MONITORING_FEED', monitoring.MonitoringFeed(0.1)),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.feed = monitoring.MONITORING_FEED
+
+    async def test_dashboards_share_one_read_and_get_changes_only(self):
+        whole_test = self.feed.subscribe('T1')
+        one_student = self.feed.subscribe('T1', 'a@x.com')
+        self.assertEqual(await whole_test.next(), self.stats)
+        self.assertEqual(await one_student.next(), {'a@x.com': {'win': 0, 'tot': 0}})
+
+        self.stats['a@x.com'] = {'win': 1, 'tot': 1}
+        self.assertEqual(await asyncio.wait_for(whole_test.next(), 1), {'a@x.com': {'win': 1, 'tot': 1}})
+        self.assertEqual(await asyncio.wait_for(one_student.next(), 1), {'a@x.com': {'win': 1, 'tot': 1}})
+        self.assertLessEqual(len(self.reads), 3)
+
+        # A late dashboard starts from the last counters
+        late = self.feed.subscribe('T1')
+        self.assertEqual(await asyncio.wait_for(late.next(), 1), self.stats)
+
+        watch = self.feed._tasks['T1']
+        for subscriber in (whole_test, one_student, late):
+            self.feed.unsubscribe('T1', subscriber)
+        await asyncio.wait_for(watch, 1)
+
+    async def test_unwatched_test_is_not_read(self):
+        subscriber = self.feed.subscribe('T1')
+        await subscriber.next()
+        self.feed.unsubscribe('T1', subscriber)
+        await asyncio.sleep(0.3)
+        reads = len(self.reads)
+        await asyncio.sleep(0.3)
+        self.assertEqual(len(self.reads), reads)
+        self.assertEqual(self.feed._tasks, {})
+
+    async def test_socket_is_for_the_tests_owner(self):
+        from . import websocket
+
+        async def connect(owner):
+            events = asyncio.Queue()
+            sent = []
+
+            async def send(message):
+                sent.append(message)
+
+            await events.put({'type': 'websocket.connect'})
+            scope = {'type': 'websocket', 'path': websocket.MONITORING_PATH,
+                     'query_string': b'testid=T1&email=b%40x.com', 'headers': []}
+            with mock.patch.object(websocket, '_session_user', lambda cookies: SimpleNamespace()), \
+                    mock.patch.object(websocket, '_owns_test', lambda user, test_id: owner):
+                task = asyncio.ensure_future(websocket.monitoring_socket(scope, events.get, send))
+                for _ in range(50):
+                    if len(sent) >= 2 or task.done():
+                        break
+                    await asyncio.sleep(0.02)
+                await events.put({'type': 'websocket.disconnect'})
+                await asyncio.wait_for(task, 1)
+            return sent
+
+        self.assertEqual(await connect(False), [{'type': 'websocket.close', 'code': websocket.CLOSE_FORBIDDEN}])
+        accepted, pushed = await connect(True)
+        self.assertEqual(accepted, {'type': 'websocket.accept'})
+        self.assertEqual(json.loads(pushed['text']), {'type': 'stats', 'students': {'b@x.com': {'win': 1, 'tot': 1}}})
+        self.assertEqual(self.feed._subscribers, {})
+
+
+class SessionSummaryTestCase(TestCase):
+
+    def setUp(self):
+        from accounts.models import User
+
+        self.student = User.objects.create_user(email='s@x.com', password='pw', name='S', user_type='student')
+
+    def logs(self, test_id='T1'):
+        return ViolationLog.objects.filter(student=self.student, test_id=test_id)
+
+    def assertSummaryMatchesLogs(self, test_id='T1'):
+        from .scoring import summary_defaults
+
+        expected = summary_defaults(self.logs(test_id))
+        summary = TestSessionSummary.objects.get(student=self.student, test_id=test_id)
+        self.assertEqual({field: getattr(summary, field) for field in expected}, expected)
+
+
+class ReconcileSessionScoresTest(SessionSummaryTestCase):
+
+    def test_drift_is_corrected(self):
+        for score, category in ((3, ViolationLog.Category.MOBILE), (1, ViolationLog.Category.TAB_SWITCH)):
+            ViolationLog.objects.create(student=self.student, test_id='T1', details='x', score=score, category=category)
+        # No summary row yet for T2
+        ViolationLog.objects.create(student=self.student, test_id='T2', details='x', score=2)
+        TestSessionSummary.objects.create(student=self.student, test_id='T1', total_score=99, mobile_count=5)
+
+        out = StringIO()
+        call_command('reconcile_session_scores', stdout=out)
+        self.assertIn('Corrected 1 session summary(ies), created 1.', out.getvalue())
+        self.assertSummaryMatchesLogs('T1')
+        self.assertSummaryMatchesLogs('T2')
+        self.assertEqual(TestSessionSummary.objects.get(test_id='T1').total_score, 4)
+
+        out = StringIO()
+        call_command('reconcile_session_scores', '--test-id', 'T1', stdout=out)
+        self.assertIn('Corrected 0 session summary(ies), created 0.', out.getvalue())
+
+
+class SessionSummaryUpkeepTest(SessionSummaryTestCase):
+    """Summary counters follow ViolationLog through the buffer and suppression windows."""
+
+    MOBILE = ('mobile_phone', 'Mobile Phone Detected', 3, ViolationLog.Category.MOBILE)
+    PERSON = ('no_person', 'No Person Detected', 1, ViolationLog.Category.PERSON)
+
+    def setUp(self):
+        from . import scoring
+
+        super().setUp()
+        self.scoring = scoring
+        patches = [
+            mock.patch.object(scoring, 'SUPPRESSION', SuppressionWindows({'mobile_phone': 60})),
+            mock.patch.object(scoring, 'VIOLATION_BUFFER', ViolationBuffer(
+                scoring._write_violations, max_events=100, flush_ms=60000)),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def record(self, *events):
+        return self.scoring.record_violations(self.student, 'T1', list(events))
+
+    def test_buffered_and_merged_hits(self):
+        self.assertEqual(self.record(self.MOBILE, self.PERSON), 4)
+        # Merged into the buffered mobile event: no new row, no score
+        self.assertEqual(self.record(self.MOBILE), 4)
+        self.assertEqual(self.record(self.scoring.TAB_SWITCH_EVENT), 5)
+        self.assertFalse(self.logs().exists())
+
+        self.scoring.flush_violations()
+        self.assertSummaryMatchesLogs()
+        summary = TestSessionSummary.objects.get(student=self.student, test_id='T1')
+        self.assertEqual((summary.total_score, summary.violation_count), (5, 3))
+        self.assertEqual((summary.mobile_count, summary.person_count, summary.tab_switch_count), (1, 1, 1))
+
+        # Merged into the written mobile event
+        self.assertEqual(self.record(self.MOBILE), 5)
+        self.scoring.flush_violations()
+        self.assertSummaryMatchesLogs()
+        self.assertEqual(self.logs().get(category=ViolationLog.Category.MOBILE).occurrences, 3)
+        self.assertEqual(self.scoring.session_total(self.student, 'T1'), 5)
+
+    def test_unbuffered_writes(self):
+        with mock.patch.object(self.scoring, 'VIOLATION_BUFFER', None):
+            self.assertEqual(self.record(self.MOBILE, self.MOBILE, self.PERSON), 4)
+            self.assertEqual(self.record(self.PERSON), 5)
+        self.assertSummaryMatchesLogs()
+        self.assertEqual(self.logs().count(), 3)
@@ -5,72 +5,127 @@ from django.views.decorators.http import require_http_methods, require_GET
 from datetime import timedelta
 from django.views.decorators.csrf import csrf_exempt, csrf_protect, ensure_csrf_cookie
 from django.http import JsonResponse
+from django.conf import settings
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_protect
 import json
+import os
+from functools import partial
 
 from .models import Teacher, Question, StudentTestInfo, Student, LongQA, PracticalQA
 from proctoring.models import ProctoringLog, WindowEstimationLog
-from .models import Teacher, Question, StudentTestInfo, Student, LongQA, PracticalQA, ViolationLog
+from vision import FaceTracker, Frame, VisionPipeline, resolve_stages, signals
+from vision.pipeline import FACE_INPUT_SIZE
+from .models import Teacher, Question, StudentTestInfo, Student, LongQA, PracticalQA, ViolationLog, TestSessionSummary
 from .forms import GiveTestForm
+from .inference import BatchInferenceEngine
+from .detector_pool import get_detector_client
+from .detectors import load_detector, predict_with, warm_up
+from .environment_probe import EnvironmentProbe, snapshot_path
+from .ingest import FrameIngestQueue
+from .model_registry import MODELS
+from .monitoring import STAT_KEYS, monitoring_stats
+from .motion import MotionGate
+from .rules import proctoring_type
+from .scoring import (
+    TAB_SWITCH_EVENT, apply_frame_rules, frame_verdict, record_progress, record_violations, session_total,
+)
 import random
-import cv2
-import numpy as np
-import base64
-from PIL import Image
-from io import BytesIO
-
-# Try to import YOLO
-try:
-    from ultralytics import YOLO
-    import torch
-except ImportError:
-    YOLO = None
-    print("Warning: ultralytics not installed. Object detection will not work.")
 
 # Load model globally to avoid reloading
 YOLO_MODEL = None
-# Removed 'table' as it causes false positives for students sitting at desks
-RESTRICTED_CLASSES = ['cell phone', 'mobile phone', 'laptop', 'book', 'tv'] 
+
+# When DETECTOR_POOL_ADDRESS is set, frames go to the shared detector pool
+# (manage.py run_detector_pool) and this process never loads the model.
+DETECTOR_POOL = get_detector_client()
+
+MODELS.register('yolo', load_detector, warmup=warm_up, preload=DETECTOR_POOL is None)
+
 
 def load_yolo_model():
+    """Load (once per process) and return the YOLO model, or None if unavailable."""
     global YOLO_MODEL
-    if YOLO_MODEL is None and YOLO is not None:
-        try:
-            # First try to load the user's custom model
-            # We assume it might be a .pt file renamed to .pkl or a pickle
-            model_path = 'yolov8n/data.pkl'
-            print(f"Attempting to load custom model: {model_path}")
-            
-            try:
-                # Try loading as standard YOLO model
-                YOLO_MODEL = YOLO(model_path)
-                # Test if it's valid by checking names
-                if not hasattr(YOLO_MODEL, 'names') or not YOLO_MODEL.names:
-                     raise ValueError("Model loaded but has no class names")
-                print("Custom YOLOv8 Model loaded successfully")
-            except Exception as e:
-                print(f"YOLO(path) failed ({e}). Trying pickle...")
-                import pickle
-                with open(model_path, 'rb') as f:
-                    # Logic: If it's a pickled model object
-                    YOLO_MODEL = pickle.load(f)
-                
-                print("Custom Model loaded via pickle")
+    YOLO_MODEL = MODELS.get('yolo')
+    return YOLO_MODEL
 
-        except Exception as e:
-            print(f"Error loading custom model: {e}")
-            print("FALLBACK: Loading standard 'yolov8n.pt' model...")
-            try:
-                # Fallback to standard yolov8n which detects COCO classes
-                # (person, bicycle, car, ..., backpack, umbrella, ..., handbag, tie, suitcase, frisbee, skis, snowboard, sports ball, kite, baseball bat, baseball glove, skateboard, surfboard, tennis racket, bottle, wine glass, cup, fork, knife, spoon, bowl, banana, apple, sandwich, orange, broccoli, carrot, hot dog, pizza, donut, cake, chair, couch, potted plant, bed, dining table, toilet, tv, laptop, mouse, remote, keyboard, cell phone, microwave, oven, toaster, sink, refrigerator, book, clock, vase, scissors, teddy bear, hair drier, toothbrush)
-                YOLO_MODEL = YOLO('yolov8n.pt') 
-                print("Standard yolov8n.pt loaded successfully")
-            except Exception as e2:
-                print(f"CRITICAL: Could not load fallback model: {e2}")
-                YOLO_MODEL = None
+
+def _yolo_predict(images, conf):
+    """Run one batched forward pass of YOLO_MODEL over ``images``."""
+    return predict_with(YOLO_MODEL, images, conf)
+
+
+# Shared by every request in this process so concurrent frames are batched
+# into a single forward pass.
+INFERENCE_ENGINE = BatchInferenceEngine(
+    _yolo_predict,
+    max_batch_size=getattr(settings, 'YOLO_BATCH_SIZE', 8),
+    max_wait_ms=getattr(settings, 'YOLO_BATCH_TIMEOUT_MS', 5),
+)
 
 
+# Alternative detector builds (ONNX files) that exams can opt into by
+# proctoring type, e.g. the INT8 model from ``manage.py quantize_detector``.
+YOLO_VARIANTS = getattr(settings, 'YOLO_VARIANTS', {})
+DETECTOR_VARIANTS = getattr(settings, 'PROCTORING_DETECTOR_VARIANTS', {})
+
+
+def _load_variant(path):
+    from .onnx_backend import load_onnx_detector
+
+    return load_onnx_detector(
+        path,
+        threads=getattr(settings, 'YOLO_ONNX_THREADS', None),
+        providers=getattr(settings, 'YOLO_ONNX_PROVIDERS', None),
+    )
+
+
+for _variant, _path in YOLO_VARIANTS.items():
+    MODELS.register(
+        f'yolo:{_variant}',
+        partial(_load_variant, _path),
+        warmup=warm_up,
+        preload=DETECTOR_POOL is None and _variant in DETECTOR_VARIANTS.values(),
+    )
+
+_VARIANT_ENGINES = {}
+
+
+def _variant_engine(test_id):
+    """Batching engine of the detector variant chosen for this exam, or None for the default."""
+    if not test_id or not DETECTOR_VARIANTS:
+        return None
+    variant = DETECTOR_VARIANTS.get(proctoring_type(test_id))
+    if variant not in YOLO_VARIANTS:
+        return None
+    engine = _VARIANT_ENGINES.get(variant)
+    if engine is None:
+        model = MODELS.get(f'yolo:{variant}')
+        if model is None:
+            return None
+        engine = _VARIANT_ENGINES.setdefault(variant, BatchInferenceEngine(
+            partial(predict_with, model),
+            max_batch_size=getattr(settings, 'YOLO_BATCH_SIZE', 8),
+            max_wait_ms=getattr(settings, 'YOLO_BATCH_TIMEOUT_MS', 5),
+        ))
+    return engine
+
+
+def _detect_objects(image, conf, test_id=None):
+    """
+    Detect objects in a PIL image or BGR array; returns Detections, or None
+    if no detector is available. ``test_id`` selects the exam's detector
+    variant, if it has one (the detector pool always runs the default).
+    """
+    if DETECTOR_POOL is not None:
+        return DETECTOR_POOL.detect(Frame.from_image(image).bgr, conf=conf)
+    engine = _variant_engine(test_id)
+    if engine is not None:
+        return engine.detect(image, conf=conf)
+    load_yolo_model()
+    if not YOLO_MODEL:
+        return None
+    return INFERENCE_ENGINE.detect(image, conf=conf)
+
 
 def _professor_required(view_func):
     """Redirect to student_index if not professor."""
@@ -117,11 +172,13 @@ def give_test_view(request):
                 return render(request, "give_test.html", {"form": form})
 
             # Ensure StudentTestInfo exists for this student/test
-            StudentTestInfo.objects.get_or_create(
+            info, created = StudentTestInfo.objects.get_or_create(
                 email=request.user.email,
                 test_id=test_id,
                 defaults={"uid": request.user, "time_left": teacher.duration * 60, "completed": 0},
             )
+            if created:
+                record_progress(request.user, test_id, time_left=info.time_left, completed=info.completed)
             # Redirect to 360 Scan instead of exam directly
             return redirect("scan_360", test_id=test_id)
     else:
@@ -200,6 +257,7 @@ def give_test_exam_view(request, test_id):
                 email=request.user.email,
                 test_id=test_id
             ).update(time_left=time_left)
+            record_progress(request.user, test_id, time_left=time_left)
             return JsonResponse({'status': 'Time updated'})
             
         elif flag == 'completed':
@@ -209,6 +267,8 @@ def give_test_exam_view(request, test_id):
                 email=request.user.email,
                 test_id=test_id
             ).update(completed=1)
+            record_progress(request.user, test_id, completed=1)
+            _forget_session(request.user, test_id)
             return JsonResponse({'status': 'Test completed'})
             
         return JsonResponse({'error': 'Invalid flag'}, status=400)
@@ -268,17 +328,158 @@ def window_event_view(request):
         test_id = request.POST.get('testid')
         
         # Log the violation
-        ViolationLog.objects.create(
-            student=request.user,
-            test_id=test_id or 'unknown',
-            details="Tab Switch / Window Focus Lost",
-            score=1
-        )
+        record_violations(request.user, test_id, [TAB_SWITCH_EVENT])
         
         return JsonResponse({'status': 'logged'})
     return JsonResponse({'status': 'ignored'})
 
 
+# Skips inference on frames that have not changed since the last detected one
+# and tells the client how fast to capture (PROCTORING_MOTION_GATE).
+MOTION_GATE = MotionGate(
+    threshold=getattr(settings, 'MOTION_GATE_THRESHOLD', 6.0),
+    max_skip_seconds=getattr(settings, 'MOTION_GATE_MAX_SKIP_SECONDS', 5.0),
+    min_interval_ms=getattr(settings, 'CAPTURE_INTERVAL_MIN_MS', 1000),
+    max_interval_ms=getattr(settings, 'CAPTURE_INTERVAL_MAX_MS', 4000),
+) if getattr(settings, 'PROCTORING_MOTION_GATE', True) else None
+
+
+# Vision stages run per exam, by Teacher.proctoring_type (None = default).
+# The object detector is always the one chosen above for the exam.
+VISION_STAGES = getattr(settings, 'PROCTORING_VISION_STAGES', {})
+
+
+def _load_face_detector():
+    from face_detector import get_face_detector
+    return get_face_detector()
+
+
+def _load_landmark_model():
+    from face_landmarks import get_landmark_model
+    return get_landmark_model()
+
+
+_face_stages_used = any(
+    stage in resolve_stages(stages)
+    for stages in VISION_STAGES.values()
+    for stage in ('faces', 'landmarks')
+)
+MODELS.register('face_detector', _load_face_detector, preload=_face_stages_used)
+MODELS.register('landmarks', _load_landmark_model, preload=_face_stages_used)
+
+# Detect-then-track faces per exam session (PROCTORING_FACE_TRACKING): the SSD
+# runs every FACE_DETECT_EVERY_FRAMES frames or when a track is lost.
+FACE_TRACKER = FaceTracker(
+    detect_every=getattr(settings, 'FACE_DETECT_EVERY_FRAMES', 10),
+) if getattr(settings, 'PROCTORING_FACE_TRACKING', True) else None
+
+VISION = VisionPipeline(
+    face_model=partial(MODELS.get, 'face_detector'),
+    landmark_model=partial(MODELS.get, 'landmarks'),
+    conf=0.4,
+    face_tracker=FACE_TRACKER,
+)
+
+
+def _vision_stages(test_id):
+    if not VISION_STAGES:
+        return ('objects',)
+    stages = VISION_STAGES.get(proctoring_type(test_id)) if test_id else None
+    return stages or VISION_STAGES.get(None) or ('objects',)
+
+
+def _detect_frame(frame, conf, test_id=None):
+    """Object stage of the vision pipeline."""
+    return _detect_objects(frame.bgr, conf, test_id=test_id)
+
+
+def _score_frame(user, test_id, image, voice_db):
+    """Run the vision pipeline and the scoring rules on one frame; returns the verdict payload."""
+    frame = image if isinstance(image, Frame) else Frame.from_image(image)
+    session = (user.pk, test_id or 'unknown')
+    decision = None
+    if MOTION_GATE is not None:
+        decision = MOTION_GATE.observe(session, frame.gray)
+
+    if decision is None or decision.run_inference:
+        # Run inference (batched with frames from other requests)
+        VISION.run(frame, _vision_stages(test_id), object_detector=partial(_detect_frame, test_id=test_id),
+                   session=session)
+        if decision is not None:
+            MOTION_GATE.remember(session, frame.results())
+    else:
+        # Scene unchanged: reuse the previous frame's results
+        frame.apply(decision.detections)
+
+    alerts, total_score = apply_frame_rules(user, test_id, frame.objects, voice_db, signals(frame))
+    verdict = frame_verdict(user, alerts, total_score, test_id)
+    if decision is not None:
+        verdict['next_interval_ms'] = decision.interval_ms
+    if ROI_HINTS and frame.faces is not None:
+        verdict['roi'] = _roi_hint(frame)
+    return verdict
+
+
+# Region-of-interest hints (PROCTORING_ROI_HINTS): when an exam runs face
+# stages, the verdict names the face area so the client can upload a sharp
+# crop of it plus a smaller full frame (see frame_upload_view).
+ROI_HINTS = getattr(settings, 'PROCTORING_ROI_HINTS', True)
+ROI_MARGIN = getattr(settings, 'PROCTORING_ROI_MARGIN', 0.25)
+
+
+def _roi_hint(frame):
+    """The frame's face area plus a margin, as ``[x1, y1, x2, y2]`` fractions; None without faces."""
+    if not frame.faces:
+        return None
+    height, width = frame.shape[:2]
+    x1 = min(face[0] for face in frame.faces)
+    y1 = min(face[1] for face in frame.faces)
+    x2 = max(face[2] for face in frame.faces)
+    y2 = max(face[3] for face in frame.faces)
+    pad_x, pad_y = (x2 - x1) * ROI_MARGIN, (y2 - y1) * ROI_MARGIN
+    return [
+        round(max(0.0, (x1 - pad_x) / width), 3),
+        round(max(0.0, (y1 - pad_y) / height), 3),
+        round(min(1.0, (x2 + pad_x) / width), 3),
+        round(min(1.0, (y2 + pad_y) / height), 3),
+    ]
+
+
+# With PROCTORING_ASYNC_INGEST, frames are scored by background consumers and
+# /video_feed answers immediately with the last known verdict.
+FRAME_QUEUE = FrameIngestQueue(
+    _score_frame,
+    workers=getattr(settings, 'PROCTORING_INGEST_WORKERS', 2),
+    max_pending=getattr(settings, 'PROCTORING_INGEST_MAX_PENDING', 1000),
+) if getattr(settings, 'PROCTORING_ASYNC_INGEST', False) else None
+
+
+def _queue_frame(user, test_id, image, voice_db):
+    """Enqueue a frame and answer with the session's last verdict."""
+    key = (user.pk, test_id or 'unknown')
+    accepted = FRAME_QUEUE.submit(key, user, test_id, image, voice_db)
+    # Before this process has scored a frame of the session, the score so far
+    verdict = FRAME_QUEUE.take_latest(key) or {'alert': None, 'score': session_total(user, test_id)}
+    if verdict.get('status') == 'terminate':
+        _forget_session(user, test_id)
+        return JsonResponse(verdict)
+    return JsonResponse({
+        'status': 'queued' if accepted else 'busy',
+        'alert': verdict.get('alert'),
+        'score': verdict.get('score', 0),
+        'next_interval_ms': verdict.get('next_interval_ms'),
+        'roi': verdict.get('roi'),
+    })
+
+
+def _forget_session(user, test_id):
+    """Drop this process's per-session frame state once the exam has ended."""
+    key = (user.pk, test_id or 'unknown')
+    for state in (FRAME_QUEUE, MOTION_GATE, FACE_TRACKER):
+        if state is not None:
+            state.forget(key)
+
+
 @login_required
 @csrf_exempt
 def video_feed_view(request):
@@ -293,121 +494,13 @@ def video_feed_view(request):
             if not image_data:
                 return JsonResponse({'status': 'no_image'})
 
-            # Decode image
-            image_bytes = base64.b64decode(image_data)
-            image = Image.open(BytesIO(image_bytes))
-            
-            alerts = []
-            score_increment = 0
-            
-            # Load model if needed
-            load_yolo_model()
-            
-            if YOLO_MODEL:
-                # Run inference
-                results = YOLO_MODEL(image, verbose=False, conf=0.4)
-                detected_objects = []
-                
-                for result in results:
-                    for box in result.boxes:
-                        cls_id = int(box.cls[0])
-                        class_name = result.names[cls_id] if hasattr(result, 'names') else str(cls_id)
-                        detected_objects.append(class_name)
-                
-                # --- RULE 1: NO FACE DETECTED (+2) ---
-                person_count = detected_objects.count('person')
-                if person_count == 0:
-                    alerts.append("No Face Detected")
-                    score_increment += 2
-                    ViolationLog.objects.create(
-                        student=request.user,
-                        test_id=test_id or 'unknown',
-                        details="No Face Detected",
-                        score=2
-                    )
-
-                # --- RULE 2: MULTIPLE PERSONS (+2) ---
-                elif person_count > 1:
-                    alerts.append(f"Multiple Persons Detected ({person_count})")
-                    score_increment += 2
-                    ViolationLog.objects.create(
-                        student=request.user,
-                        test_id=test_id or 'unknown',
-                        details=f"Multiple Persons ({person_count})",
-                        score=2
-                    )
-                
-                # --- RULE 3: PROHIBITED ITEMS ---
-                # Mobile Phone (+2)
-                if 'cell phone' in detected_objects or 'mobile phone' in detected_objects:
-                    alerts.append("Mobile Phone Detected")
-                    score_increment += 2
-                    ViolationLog.objects.create(
-                         student=request.user,
-                         test_id=test_id or 'unknown',
-                         details="Mobile Phone Detected",
-                         score=2
-                    )
-                
-                # Book (+1)
-                if 'book' in detected_objects:
-                    alerts.append("Book Detected")
-                    score_increment += 1
-                    ViolationLog.objects.create(
-                         student=request.user,
-                         test_id=test_id or 'unknown',
-                         details="Book Detected",
-                         score=1
-                    )
-
-                # Laptop (+1) - if distinct from current device
-                if 'laptop' in detected_objects:
-                    alerts.append("Laptop Detected")
-                    score_increment += 1
-                    ViolationLog.objects.create(
-                         student=request.user,
-                         test_id=test_id or 'unknown',
-                         details="Laptop Detected",
-                         score=1
-                    )
-
-            # --- RULE 4: AUDIO DETECTION (+1) ---
-            # app.js sends 'average' as voice_db. Adjust threshold based on testing.
-            try:
-                if voice_db and float(voice_db) > 50: # Example threshold
-                     alerts.append("High Audio Level")
-                     score_increment += 1
-                     ViolationLog.objects.create(
-                         student=request.user,
-                         test_id=test_id or 'unknown',
-                         details=f"High Volume ({voice_db})",
-                         score=1
-                    )
-            except (ValueError, TypeError):
-                pass
+            # Pixels are decoded once, by the first stage that needs them
+            frame = Frame.from_base64(image_data)
 
-            # --- CALCULATE TOTAL SCORE ---
-            # Sum up scores from ViolationLog
-            from django.db.models import Sum
-            total_score = ViolationLog.objects.filter(
-                student=request.user, 
-                test_id=test_id or 'unknown'
-            ).aggregate(Sum('score'))['score__sum'] or 0
-
-            # --- RULE 5: AUTO SUBMIT (>10) ---
-            if total_score > 10:
-                print(f"Terminating exam for {request.user}. Score: {total_score}")
-                return JsonResponse({
-                    'status': 'terminate',
-                    'message': 'Cheating score exceeded limit. Exam terminated.',
-                    'score': total_score
-                })
+            if FRAME_QUEUE is not None:
+                return _queue_frame(request.user, test_id, frame, voice_db)
 
-            return JsonResponse({
-                'status': 'processed',
-                'alert': ", ".join(alerts) if alerts else None,
-                'score': total_score
-            })
+            return JsonResponse(_score_frame(request.user, test_id, frame, voice_db))
             
         except Exception as e:
             print(f"Monitoring error: {e}")
@@ -416,14 +509,147 @@ def video_feed_view(request):
     return JsonResponse({'status': 'processed'})
 
 
+def _detector_input_size(test_id=None):
+    """
+    Input size of the exam's object detector; frames larger than this are
+    only scaled down again by the model. Falls back to YOLO_INPUT_SIZE when
+    the model is not loaded in this process (e.g. with the detector pool).
+    """
+    model = None
+    if DETECTOR_POOL is None:
+        variant = DETECTOR_VARIANTS.get(proctoring_type(test_id)) if test_id and DETECTOR_VARIANTS else None
+        model = MODELS.get(f'yolo:{variant}') if variant in YOLO_VARIANTS else load_yolo_model()
+    size = getattr(model, 'imgsz', None) or (getattr(model, 'overrides', None) or {}).get('imgsz')
+    if isinstance(size, (list, tuple)):
+        size = max(size)
+    return int(size or getattr(settings, 'YOLO_INPUT_SIZE', 640))
+
+
+def _capture_size(test_id=None):
+    """Capture ``(width, height)`` for an exam: PROCTORING_CAPTURE_SIZE, or 4:3 at the model's input size."""
+    configured = getattr(settings, 'PROCTORING_CAPTURE_SIZE', None)
+    if configured:
+        return tuple(configured)
+    side = _detector_input_size(test_id)
+    if 'faces' in resolve_stages(_vision_stages(test_id)):
+        side = max(side, FACE_INPUT_SIZE[0])
+    return side, side * 3 // 4
+
+
+def _capture_config(test_id=None):
+    """Capture settings advertised to clients of the binary frame endpoint."""
+    width, height = _capture_size(test_id)
+    return {
+        'width': width,
+        'height': height,
+        'format': getattr(settings, 'PROCTORING_CAPTURE_FORMAT', 'image/jpeg'),
+        'quality': getattr(settings, 'PROCTORING_CAPTURE_QUALITY', 0.7),
+        'max_bytes': getattr(settings, 'PROCTORING_MAX_FRAME_BYTES', 2 * 1024 * 1024),
+        # With an ROI hint: full frame at this fraction of the size, plus the crop
+        'roi_frame_scale': getattr(settings, 'PROCTORING_ROI_FRAME_SCALE', 0.5) if ROI_HINTS else None,
+        # Path of the proctoring WebSocket (exams/websocket.py), if served
+        'websocket': '/ws/proctoring/' if getattr(settings, 'PROCTORING_WEBSOCKET', False) else None,
+    }
+
+
+def _frame_buffer(request, field='frame'):
+    """
+    Encoded frame bytes from a raw-body or multipart upload, as a memoryview
+    over the request data (no copy is made). Only ``frame`` may be the raw body.
+    """
+    upload = request.FILES.get(field)
+    if upload is None:
+        if field != 'frame':
+            return None
+        return memoryview(request.body)
+    stream = getattr(upload, 'file', None)
+    if hasattr(stream, 'getbuffer'):
+        return stream.getbuffer()
+    return memoryview(upload.read())
+
+
+@login_required
+@csrf_exempt
+def frame_upload_view(request):
+    """
+    Binary frame ingestion for exam monitoring.
+
+    GET returns the capture size/format the client should use for the exam
+    in ``testid``. POST accepts a JPEG/WebP frame either as the raw request
+    body (with ``testid`` and ``voice_db`` in the query string) or as the
+    ``frame`` file of a multipart form, and answers with the same verdict as
+    ``/video_feed``. A multipart upload may add a sharper crop of the
+    verdict's ``roi`` area as the ``roi`` file, with ``roi_box``
+    (``x1,y1,x2,y2`` fractions of the frame) saying where it was taken.
+    """
+    if request.method == 'GET':
+        return JsonResponse(_capture_config(request.GET.get('testid')))
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid method'}, status=405)
+
+    try:
+        params = request.POST if request.FILES else request.GET
+        test_id = params.get('testid')
+        voice_db = params.get('voice_db')
+
+        buffer = _frame_buffer(request)
+        roi_buffer = _frame_buffer(request, 'roi') if request.FILES else None
+        if not buffer.nbytes:
+            return JsonResponse({'status': 'no_image'})
+        upload_bytes = buffer.nbytes + (roi_buffer.nbytes if roi_buffer is not None else 0)
+        if upload_bytes > getattr(settings, 'PROCTORING_MAX_FRAME_BYTES', 2 * 1024 * 1024):
+            return JsonResponse({'status': 'error', 'message': 'Frame too large'}, status=413)
+
+        # Decode straight from the request bytes into a BGR array
+        frame = Frame.from_bytes(buffer)
+        try:
+            frame.bgr
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': 'Could not decode frame'}, status=400)
+        if roi_buffer is not None and roi_buffer.nbytes:
+            # The crop only sharpens the face stages; a bad one is dropped
+            try:
+                roi = Frame.from_bytes(roi_buffer)
+                roi.bgr
+                frame.attach_roi(roi, params.get('roi_box', '').split(','))
+            except ValueError:
+                pass
+
+        if FRAME_QUEUE is not None:
+            return _queue_frame(request.user, test_id, frame, voice_db)
+
+        return JsonResponse(_score_frame(request.user, test_id, frame, voice_db))
+
+    except Exception as e:
+        print(f"Monitoring error: {e}")
+        return JsonResponse({'status': 'error', 'message': str(e)})
+
+
+@require_GET
+def model_health_view(request):
+    """
+    Readiness probe: 200 once every preloaded model is loaded and warm, else
+    503. Anonymous callers only get each model's state; timings, errors and
+    the worker pid are for staff.
+    """
+    ready = MODELS.ready
+    status = MODELS.status()
+    if request.user.is_authenticated and request.user.is_staff:
+        payload = {'ready': ready, 'pid': os.getpid(), 'models': status}
+    else:
+        payload = {'ready': ready, 'models': {name: {'state': model['state']} for name, model in status.items()}}
+    return JsonResponse(payload, status=200 if ready else 503)
+
+
 @login_required
 def scan_360_view(request, test_id):
     """Render the 360-degree environment scan page."""
     if request.user.user_type != "student":
         return redirect("professor_index")
 
-    # Load model if not loaded
-    load_yolo_model()
+    # Load model if not loaded (the detector pool keeps its own copy)
+    if DETECTOR_POOL is None:
+        load_yolo_model()
     
     return render(request, "scan360.html", {"test_id": test_id})
 
@@ -443,90 +669,63 @@ def process_scan_frame(request):
         if not image_data or not test_id:
             print("Missing data in scan request")
             return JsonResponse({'error': 'Missing data'}, status=400)
-            
-        # Decode image
-        # Format: data:image/jpeg;base64,...
-        if 'base64,' in image_data:
-            image_data = image_data.split('base64,')[1]
-            
-        image_bytes = base64.b64decode(image_data)
-        image = Image.open(BytesIO(image_bytes))
-        
-        # Run Detection
-        is_clean = True
-        detected_objects = []
-        
-        if YOLO_MODEL:
-            # Convert to cv2 format for YOLO (or pass PIL)
-            # YOLOv8 supports PIL images directly
-            # Run inference with lower confidence to see if ANYTHING is detected
-            results = YOLO_MODEL(image, verbose=False, conf=0.25) 
-            
-            # Process results
-            # Classes: 0:person, 67:cell phone, 63:laptop, 73:book, etc. (COCO indices)
-            # We rely on class names
-            
-            for result in results:
-                # Debug: print all detected classes
-                if len(result.boxes) > 0:
-                    print(f"DEBUG: Detected {len(result.boxes)} objects")
-                
-                for box in result.boxes:
-                    cls_id = int(box.cls[0])
-                    # Handle both integer and string keys in names
-                    if hasattr(result, 'names'):
-                        class_name = result.names[cls_id]
-                    else:
-                         class_name = str(cls_id)
-
-                    conf = float(box.conf[0])
-                    print(f"DEBUG: Found {class_name} ({conf:.2f})")
-                    
-                    if conf > 0.4: # Slightly lower threshold
-                        detected_objects.append(class_name)
-                        
-                        # Check restricted
-                        # Logic: Multiple people is bad. Phone/Book is bad.
-                        
-                        if class_name in RESTRICTED_CLASSES or (class_name == 'person' and detected_objects.count('person') > 1):
-                            # Allow one person (the student)
-                            if class_name == 'person' and detected_objects.count('person') == 1:
-                                pass
-                            else:
-                                is_clean = False
-                                print(f"DEBUG: Violation found: {class_name}")
-
-        else:
-            print("ERROR: YOLO_MODEL is not loaded")
-        
-        # Deduplicate detected list
-        detected_objects = list(set(detected_objects))
-        
-        # Deduplicate detected list
-        detected_objects = list(set(detected_objects))
-        
-        # Log violation if not clean
-        if not is_clean:
-            # Check if recent violation exists to avoid spamming DB
-            # For 360 scan, we can just log every time or throttle
-            # Here we just log
-            ViolationLog.objects.create(
-                student=request.user,
-                test_id=test_id,
-                details=f"Scan Violation: Found {', '.join(detected_objects)}",
-                evidence="[Base64 Image Omitted]" 
-            )
-            
-        return JsonResponse({
-            'clean': is_clean,
-            'detected': detected_objects
-        })
+
+        return JsonResponse(_scan_frame(request.user, test_id, image_data))
         
     except Exception as e:
         print(f"Scan processing error: {e}")
         return JsonResponse({'error': str(e)}, status=500)
 
 
+def _scan_frame(user, test_id, image_data):
+    """Check one 360-scan frame for restricted objects and extra people; returns the response payload."""
+    # Decode image
+    # Format: data:image/jpeg;base64,...
+    frame = Frame.from_base64(image_data)
+    
+    # Run Detection
+    is_clean = True
+    detected_objects = []
+    
+    # Run inference with lower confidence to see if ANYTHING is detected
+    detections = _detect_objects(frame.bgr, conf=0.25, test_id=test_id)
+    
+    if detections is not None:
+        
+        # Debug: print all detected classes
+        if len(detections) > 0:
+            print(f"DEBUG: Detected {len(detections)} objects: {detections.class_names()}")
+        
+        # Slightly lower threshold
+        class_ids = detections.class_ids[detections.confidences > 0.4]
+        metadata = detections.metadata
+        detected_objects = metadata.unique_names(class_ids)
+        
+        # Logic: Multiple people is bad. Phone/Book is bad.
+        # Allow one person (the student)
+        if metadata.is_restricted(class_ids).any() or metadata.person_count(class_ids) > 1:
+            is_clean = False
+            print(f"DEBUG: Violation found: {detected_objects}")
+
+    else:
+        print("ERROR: YOLO_MODEL is not loaded")
+    
+    # Log violation if not clean
+    if not is_clean:
+        # Repeats are merged by the "scan" suppression window
+        record_violations(
+            user,
+            test_id,
+            [("scan", f"Scan Violation: Found {', '.join(detected_objects)}", 0, ViolationLog.Category.SCAN)],
+            evidence="[Base64 Image Omitted]"
+        )
+        
+    return {
+        'clean': is_clean,
+        'detected': detected_objects
+    }
+
+
 @login_required
 def calculator_view(request):
     """Simple calculator page for exam purposes."""
@@ -1166,6 +1365,42 @@ def update_practical_question_view(request, test_id, qid):
     return render(request, "updateQuestionsPQA.html", {"uresults": uresults})
 
 
+def _session_rows(test_id):
+    """Every started session of a test, with its counters, from one TestSessionSummary query."""
+    summaries = TestSessionSummary.objects.filter(
+        test_id=test_id,
+        time_left__isnull=False
+    ).select_related('student')
+    return [
+        {
+            'email': summary.student.email,
+            'test_id': test_id,
+            'time_left': summary.time_left,
+            'completed': summary.completed,
+            'name': getattr(summary.student, 'name', summary.student.email),
+            'total_score': summary.total_score,
+            'violation_count': summary.violation_count,
+            'last_event_at': summary.last_event_at,
+        }
+        for summary in summaries
+    ]
+
+
+def _student_log_context(test_id, email, logs):
+    """Template context of the per-student log pages; name and counters come from the session summary."""
+    summary = TestSessionSummary.objects.filter(
+        test_id=test_id,
+        student__email=email
+    ).select_related('student').first()
+    return {
+        "testid": test_id,
+        "email": email,
+        "name": getattr(summary.student, 'name', email) if summary else email,
+        "summary": summary,
+        "callresults": logs
+    }
+
+
 @csrf_exempt
 @login_required
 def display_students_details_view(request):
@@ -1188,20 +1423,7 @@ def display_students_details_view(request):
         
         test_type = teacher_record.test_type
         
-        # Get student logs for this test
-        student_logs = StudentTestInfo.objects.filter(test_id=test_id)
-        
-        # Prepare data for the template
-        log_data = []
-        for log in student_logs:
-            log_entry = {
-                'email': log.email,
-                'test_id': test_id,
-                'time_left': log.time_left,
-                'completed': log.completed,
-                'name': getattr(log.uid, 'name', log.email)  # Try to get student name
-            }
-            log_data.append(log_entry)
+        log_data = _session_rows(test_id)
         
         # Route to different templates based on test type
         if test_type == 'subjective':
@@ -1234,22 +1456,7 @@ def live_monitoring_view(request):
             messages.error(request, "Test not found.")
             return redirect('livemonitoringtid')
         
-        # Get student logs for this test (active sessions)
-        # Assuming StudentTestInfo tracks active test-taking sessions
-        student_logs = StudentTestInfo.objects.filter(test_id=test_id)
-        
-        # Prepare data for the template
-        log_data = []
-        for log in student_logs:
-            student = Student.objects.filter(email=log.email, test_id=test_id).first()
-            log_entry = {
-                'email': log.email,
-                'time_left': log.time_left,
-                'completed': log.completed,
-                'test_id': test_id,
-                'name': getattr(log.uid, 'name', log.email)  # Try to get student name
-            }
-            log_data.append(log_entry)
+        log_data = _session_rows(test_id)
         
         return render(request, "live_monitoring.html", {
             "callresults": log_data, 
@@ -1274,35 +1481,9 @@ def ajax_student_monitoring_stats_view(request, test_id, email):
     if not teacher_record:
         return JsonResponse({'error': 'Test not found'}, status=404)
     
-    # This is a placeholder - in a real implementation, you would query
-    # the actual monitoring logs from your database tables
-    # For now, returning sample data
     try:
-        # Get all logs for this student and test
-        logs = ViolationLog.objects.filter(test_id=test_id, student__email=email)
-        
-        # Calculate stats based on log details
-        window_events = logs.filter(details__icontains="Tab Switch").count()
-        mobile_detected = logs.filter(
-            models.Q(details__icontains="Mobile Phone") | 
-            models.Q(details__icontains="Cell Phone")
-        ).count()
-        person_events = logs.filter(
-            models.Q(details__icontains="Person") | 
-            models.Q(details__icontains="Face")
-        ).count()
-        audio_events = logs.filter(details__icontains="High Volume").count()
-        
-        total_logs = logs.count()
-        
-        stats = {
-            'win': window_events,
-            'mob': mobile_detected,
-            'per': person_events,
-            'aud': audio_events,
-            'tot': total_logs
-        }
-        
+        # Every counter from the session summary row (see monitoring.monitoring_stats)
+        stats = monitoring_stats(test_id, email).get(email) or dict.fromkeys(STAT_KEYS, 0)
         return JsonResponse(stats)
     
     except Exception as e:
@@ -1604,16 +1785,7 @@ def winevent_students_logs_view(request, test_id, email):
     # Get window event logs
     window_logs = WindowEstimationLog.objects.filter(test_id=test_id, email=email)
     
-    # Get student name
-    student = Student.objects.filter(email=email, test_id=test_id).first()
-    student_name = getattr(student, 'name', email) if student else email
-    
-    return render(request, "wineventstudentlog.html", {
-        "testid": test_id,
-        "email": email,
-        "name": student_name,
-        "callresults": window_logs
-    })
+    return render(request, "wineventstudentlog.html", _student_log_context(test_id, email, window_logs))
 
 
 @csrf_exempt
@@ -1632,16 +1804,7 @@ def person_display_students_logs_view(request, test_id, email):
     # Get proctoring logs with person detection
     proctoring_logs = ProctoringLog.objects.filter(test_id=test_id, email=email)
     
-    # Get student name
-    student = Student.objects.filter(email=email, test_id=test_id).first()
-    student_name = getattr(student, 'name', email) if student else email
-    
-    return render(request, "persondisplaystudentslogs.html", {
-        "testid": test_id,
-        "email": email,
-        "name": student_name,
-        "callresults": proctoring_logs
-    })
+    return render(request, "persondisplaystudentslogs.html", _student_log_context(test_id, email, proctoring_logs))
 
 
 @csrf_exempt
@@ -1660,16 +1823,7 @@ def mob_display_students_logs_view(request, test_id, email):
     # Get proctoring logs with mobile detection
     proctoring_logs = ProctoringLog.objects.filter(test_id=test_id, email=email)
     
-    # Get student name
-    student = Student.objects.filter(email=email, test_id=test_id).first()
-    student_name = getattr(student, 'name', email) if student else email
-    
-    return render(request, "mobdisplaystudentslogs.html", {
-        "testid": test_id,
-        "email": email,
-        "name": student_name,
-        "callresults": proctoring_logs
-    })
+    return render(request, "mobdisplaystudentslogs.html", _student_log_context(test_id, email, proctoring_logs))
 
 
 @csrf_exempt
@@ -1688,16 +1842,7 @@ def audio_display_students_logs_view(request, test_id, email):
     # Get proctoring logs with audio data
     proctoring_logs = ProctoringLog.objects.filter(test_id=test_id, email=email)
     
-    # Get student name
-    student = Student.objects.filter(email=email, test_id=test_id).first()
-    student_name = getattr(student, 'name', email) if student else email
-    
-    return render(request, "audiodisplaystudentslogs.html", {
-        "testid": test_id,
-        "email": email,
-        "name": student_name,
-        "callresults": proctoring_logs
-    })
+    return render(request, "audiodisplaystudentslogs.html", _student_log_context(test_id, email, proctoring_logs))
 
 
 @csrf_exempt
@@ -1716,16 +1861,7 @@ def display_students_logs_view(request, test_id, email):
     # Get all proctoring logs
     proctoring_logs = ProctoringLog.objects.filter(test_id=test_id, email=email)
     
-    # Get student name
-    student = Student.objects.filter(email=email, test_id=test_id).first()
-    student_name = getattr(student, 'name', email) if student else email
-    
-    return render(request, "displaystudentslogs.html", {
-        "testid": test_id,
-        "email": email,
-        "name": student_name,
-        "callresults": proctoring_logs
-    })
+    return render(request, "displaystudentslogs.html", _student_log_context(test_id, email, proctoring_logs))
 
 
 @login_required
@@ -1831,7 +1967,9 @@ def student_monitoring_stats_view(request, test_id, email):
     # Pass the test_id and email to the template
     context = {
         'testid': test_id,
-        'email': email
+        'email': email,
+        # Path of the monitoring WebSocket (exams/websocket.py), if served
+        'feed': '/ws/monitoring/' if getattr(settings, 'PROCTORING_WEBSOCKET', False) else None,
     }
     
     return render(request, "stat_student_monitoring.html", context)
@@ -1901,45 +2039,57 @@ def delete_questions_view(request, test_id):
     return JsonResponse({'error': 'Invalid request method'}, status=405)
 
 
-from .vp_detector import Detector
+def _record_environment_violation(user, test_id, check_results):
+    """Log an unsafe environment snapshot as a violation."""
+    details = []
+    if check_results.get('is_virtualized'): details.append("Virtual Machine Detected")
+    if check_results.get('is_debugged'): details.append("Debugger Detected")
+    if check_results.get('is_sandboxed'): details.append("Sandbox Detected")
+
+    record_violations(
+        user,
+        test_id,
+        # High score for environment manipulation
+        [("environment", f"Environment Violation: {', '.join(details)}", 5, ViolationLog.Category.ENVIRONMENT)]
+    )
+
+
+# Environment checks run in the background (see exams/environment_probe.py);
+# requests only read the published snapshot.
+ENVIRONMENT_PROBE = EnvironmentProbe(
+    snapshot_path(),
+    interval=getattr(settings, 'ENVIRONMENT_PROBE_INTERVAL', 60),
+    in_process=getattr(settings, 'ENVIRONMENT_PROBE_IN_PROCESS', True),
+)
+
 
 @csrf_exempt
 def check_environment_view(request):
     """
     Check if the environment is safe (no VM, debugger, sandbox).
-    Returns JSON status.
+    Returns JSON status from the latest environment snapshot; until the
+    first snapshot is published the environment is reported safe with
+    ``pending`` set.
     """
     try:
-        detector = Detector()
-        
-        # Run checks
-        is_safe = detector.is_safe
-        check_results = detector.get_all_checks
+        snapshot = ENVIRONMENT_PROBE.snapshot()
+        if snapshot is None:
+            return JsonResponse({'is_safe': True, 'pending': True, 'checks': {}})
+
+        is_safe = snapshot['is_safe']
+        check_results = snapshot['checks']
         
         # Log if unsafe
-        if not is_safe:
-            # If user is authenticated, log a violation
-            if request.user.is_authenticated:
-                details = []
-                if check_results.get('is_virtualized'): details.append("Virtual Machine Detected")
-                if check_results.get('is_debugged'): details.append("Debugger Detected")
-                if check_results.get('is_sandboxed'): details.append("Sandbox Detected")
-                
-                # Create a violation log
-                # We use a special test_id 'SYSTEM_CHECK' or similar if not in a test
-                # Or try to get test_id from request if sent
-                test_id = request.POST.get('test_id') or request.GET.get('test_id') or 'SYSTEM_CHECK'
-                
-                ViolationLog.objects.create(
-                    student=request.user,
-                    test_id=test_id,
-                    details=f"Environment Violation: {', '.join(details)}",
-                    score=5 # High score for environment manipulation
-                )
+        if not is_safe and request.user.is_authenticated:
+            # We use a special test_id 'SYSTEM_CHECK' or similar if not in a test
+            # Or try to get test_id from request if sent
+            test_id = request.POST.get('test_id') or request.GET.get('test_id') or 'SYSTEM_CHECK'
+            _record_environment_violation(request.user, test_id, check_results)
         
         return JsonResponse({
             'is_safe': is_safe,
-            'checks': check_results
+            'checks': check_results,
+            'checked_at': snapshot['checked_at'],
         })
         
     except Exception as e:
@@ -0,0 +1,153 @@
+"""
+Per-process write buffer for ViolationLog rows.
+
+Violations are collected in memory and written with one ``bulk_create`` (and
+one running-score update per session) every ``max_events`` rows or
+``flush_ms`` milliseconds, whichever comes first, instead of one transaction
+per row. Pending scores are tracked per session so callers still see an
+up-to-date total before the rows reach the database; :meth:`total_score`
+reads the written and pending parts without holding the flush lock, and
+reads again if a flush of the session may have committed between them
+(which would count its rows twice). The buffer is flushed on
+interpreter exit and whenever a caller asks for it (e.g. before terminating
+an exam). Rows whose ``occurrences`` changed after they were buffered (see
+``suppression``) are re-saved on the next flush.
+"""
+import atexit
+import os
+import threading
+import time
+
+from django.db import close_old_connections
+
+
+class ViolationBuffer:
+    """
+    ``write(rows, merged)`` performs the actual database write for a list of
+    unsaved ``ViolationLog`` instances plus already-buffered rows that absorbed
+    further hits; it is always called with the buffer's flush lock held, so
+    writes from one process never interleave.
+    """
+
+    def __init__(self, write, max_events=50, flush_ms=500):
+        self._write = write
+        self.max_events = max(1, int(max_events))
+        self.flush_interval = max(1, int(flush_ms)) / 1000.0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._rows = []
+        self._merged = {}
+        self._pending_scores = {}
+        # Sessions with rows in the running flush, and the number of flushes done
+        self._in_flight = frozenset()
+        self._flushes = 0
+        self._oldest = None
+        self._pid = None
+        atexit.register(self.flush)
+
+    def add(self, rows):
+        """Buffer ``rows``; flushes synchronously once ``max_events`` are waiting."""
+        self._ensure_flusher()
+        with self._lock:
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.extend(rows)
+            for row in rows:
+                key = (row.student_id, row.test_id)
+                self._pending_scores[key] = self._pending_scores.get(key, 0) + row.score
+            full = len(self._rows) >= self.max_events
+        if full:
+            self.flush()
+
+    def merge(self, row):
+        """Mark a buffered (or already written) row as changed since it was added."""
+        self._ensure_flusher()
+        with self._lock:
+            if not self._rows and not self._merged:
+                self._oldest = time.monotonic()
+            self._merged[id(row)] = row
+
+    def pending_score(self, student_id, test_id):
+        """Score of this session's rows that have not been written yet."""
+        with self._lock:
+            return self._pending_scores.get((student_id, test_id), 0)
+
+    def total_score(self, student_id, test_id, written_score, attempts=3):
+        """
+        ``written_score()`` (the session's score in the database) plus its
+        pending score. The query runs outside the buffer's locks; when a
+        flush of this session was running or finished meanwhile, its rows may
+        be in both parts (or neither), so the read is repeated. After
+        ``attempts`` such reads it waits for the flush instead.
+        """
+        key = (student_id, test_id)
+        for _ in range(attempts):
+            with self._lock:
+                flushes = self._flushes
+                flushing = key in self._in_flight
+                pending = self._pending_scores.get(key, 0)
+            if flushing:
+                time.sleep(0.001)
+                continue
+            written = written_score()
+            with self._lock:
+                if self._flushes == flushes and key not in self._in_flight:
+                    return written + pending
+        with self._flush_lock:
+            return written_score() + self.pending_score(student_id, test_id)
+
+    def flush(self):
+        """Write every buffered row now."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+                merged, self._merged = self._merged, {}
+                self._oldest = None
+                if not rows and not merged:
+                    return
+                self._in_flight = frozenset((row.student_id, row.test_id) for row in rows)
+            try:
+                self._write(rows, list(merged.values()))
+            except Exception as e:
+                print(f"Violation flush failed ({len(rows)} rows): {e}")
+                # Keep the rows for the next attempt
+                with self._lock:
+                    self._rows[:0] = rows
+                    for key, row in merged.items():
+                        self._merged.setdefault(key, row)
+                    self._oldest = self._oldest or time.monotonic()
+                    self._in_flight = frozenset()
+                    self._flushes += 1
+                return
+            # Only now are these scores visible in the database; total_score
+            # discards reads of these sessions made while they were in flight
+            with self._lock:
+                self._in_flight = frozenset()
+                self._flushes += 1
+                for row in rows:
+                    key = (row.student_id, row.test_id)
+                    remaining = self._pending_scores.get(key, 0) - row.score
+                    if remaining:
+                        self._pending_scores[key] = remaining
+                    else:
+                        self._pending_scores.pop(key, None)
+
+    def _ensure_flusher(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            # Rows buffered by a parent process belong to the parent
+            self._rows, self._merged, self._pending_scores, self._oldest = [], {}, {}, None
+            self._pid = pid
+            threading.Thread(target=self._run, name="violation-flusher", daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval / 2)
+            oldest = self._oldest
+            if oldest is not None and time.monotonic() - oldest >= self.flush_interval:
+                self.flush()
+                close_old_connections()
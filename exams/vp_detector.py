@@ -5,8 +5,6 @@ import time
 import ctypes
 import platform
 import subprocess
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
-from functools import partial
 from typing import List, Set, Dict
 import psutil
 
@@ -20,9 +18,32 @@ class VPDError(Exception):
 class Detector:
     """
     Comprehensive detection system for virtual environments, sandboxes, and debuggers.
-    Combines multiple detection techniques across different platforms with multiprocessing.
+    Combines multiple detection techniques across different platforms.
+
+    Each check runs at most once per Detector; every property reads the same
+    evaluation (see ``results``).
     """
 
+    # name -> (check group, check method), in evaluation order
+    CHECKS = {
+        "vm_hardware": ("VMChecks", "check_vm_hardware"),
+        "vm_mac": ("VMChecks", "check_mac_address"),
+        "vm_artifacts": ("VMChecks", "check_vm_artifacts"),
+        "cpu_features": ("VMChecks", "check_cpu_features"),
+        "hypervisor": ("DebuggerChecks", "check_hypervisor"),
+        "sandbox_files": ("DebuggerChecks", "check_sandbox_files"),
+        "debugger_present": ("DebuggerChecks", "detect_debugger"),
+        "suspicious_processes": ("ProcessChecks", "detect_suspicious_processes"),
+        "timing_anomaly": ("DebuggerChecks", "anti_timing_check"),
+    }
+    VIRTUALIZED = ("vm_hardware", "vm_mac", "vm_artifacts", "cpu_features")
+    DEBUGGED = ("debugger_present", "timing_anomaly")
+    SANDBOXED = ("sandbox_files", "suspicious_processes")
+
+    def __init__(self):
+        self._results = None
+        self.errors: Dict[str, str] = {}
+
     class VMChecks:
         """Virtual machine detection methods using hardware and system artifacts."""
         
@@ -224,18 +245,18 @@ class Detector:
         
         @staticmethod
         def detect_suspicious_processes() -> bool:
-            """Threaded detection of known sandbox/VM-related processes."""
+            """Detection of known sandbox/VM-related processes."""
             suspicious_processes: Set[str] = {
                 "vmtoolsd", "vboxservice", "wireshark",
                 "fiddler", "sandboxie", "processhacker"
             }
 
-            def process_check(proc: psutil.Process) -> bool:
-                try: return proc.info["name"].lower() in suspicious_processes
-                except (psutil.NoSuchProcess, psutil.AccessDenied): return False
-
-            with ThreadPoolExecutor() as executor:
-                return any(f.result() for f in as_completed([executor.submit(process_check, p) for p in psutil.process_iter(["name"])]))
+            # process_iter fetches the names up front; the loop only compares strings
+            for proc in psutil.process_iter(["name"]):
+                name = proc.info.get("name")
+                if name and name.lower() in suspicious_processes:
+                    return True
+            return False
 
     class HelperFunctions:
         """Enhanced utility methods with error handling."""
@@ -253,73 +274,54 @@ class Detector:
                     continue
             return False
 
-    @property
-    def venv_active(self) -> bool:
+    def run_checks(self) -> Dict[str, bool]:
         """
-        Optimized multiprocess check with batch processing and improved cancellation.
+        Run every check once. A check that fails (e.g. its system tool is
+        missing) counts as not detected and is listed in ``errors``.
         """
-        check_groups = [
-            # Group related checks to minimize process creation
-            [
-                self.VMChecks.check_vm_hardware,
-                self.VMChecks.check_mac_address,
-                self.VMChecks.check_vm_artifacts,
-            ],
-            [
-                self.VMChecks.check_cpu_features,
-                self.DebuggerChecks.check_hypervisor,
-                self.DebuggerChecks.check_sandbox_files,
-            ],
-            [
-                self.DebuggerChecks.detect_debugger,
-                partial(self.DebuggerChecks.anti_timing_check),
-                self.ProcessChecks.detect_suspicious_processes,
-            ]
-        ]
-
-        try:
-            with ProcessPoolExecutor(max_workers=3) as executor:
-                futures = []
-                for group in check_groups:
-                    futures.append(executor.submit(self._run_check_group, group))
-                for future in as_completed(futures):
-                    if future.result():
-                        # Cancel remaining checks
-                        for f in futures: f.cancel()
-                        return True
-            return False
-        except Exception as e:
-            raise VPDError(f"Multiprocess check failed: {e}")
+        results = {}
+        for name, (group, method) in self.CHECKS.items():
+            try:
+                results[name] = bool(getattr(getattr(self, group), method)())
+            except (VPDError, OSError) as e:
+                results[name] = False
+                self.errors[name] = str(e)
+            except Exception as e:
+                # A broken check must not stop the others (or the prober)
+                print(f"Environment check {name} failed: {e!r}")
+                results[name] = False
+                self.errors[name] = repr(e)
+        return results
+
+    @property
+    def results(self) -> Dict[str, bool]:
+        """Result of every check, by name; computed on first access."""
+        if self._results is None:
+            self._results = self.run_checks()
+        return self._results
+
+    def _any(self, names) -> bool:
+        return any(self.results[name] for name in names)
 
-    def _run_check_group(self, checks: List[callable]) -> bool:
-        """Run a group of checks in the current process."""
-        return any(check() for check in checks)
+    @property
+    def venv_active(self) -> bool:
+        """True if any check detected an analysis environment."""
+        return any(self.results.values())
 
     @property
     def is_virtualized(self) -> bool:
         """Check if the environment is virtualized."""
-        return any((
-            self.VMChecks.check_vm_hardware(),
-            self.VMChecks.check_mac_address(),
-            self.VMChecks.check_vm_artifacts(),
-            self.VMChecks.check_cpu_features(),
-        ))
+        return self._any(self.VIRTUALIZED)
 
     @property
     def is_debugged(self) -> bool:
         """Check if a debugger is attached."""
-        return any((
-            self.DebuggerChecks.detect_debugger(),
-            self.DebuggerChecks.anti_timing_check(),
-        ))
+        return self._any(self.DEBUGGED)
 
     @property
     def is_sandboxed(self) -> bool:
         """Check if in a sandbox environment."""
-        return any((
-            self.DebuggerChecks.check_sandbox_files(),
-            self.ProcessChecks.detect_suspicious_processes(),
-        ))
+        return self._any(self.SANDBOXED)
     
     @property
     def is_analyzed(self) -> bool:
@@ -403,15 +405,5 @@ class Detector:
             "is_debugged": self.is_debugged,
             "is_sandboxed": self.is_sandboxed,
             "venv_active": self.venv_active,
-            "detailed": {
-                "vm_hardware": self.VMChecks.check_vm_hardware(),
-                "vm_mac": self.VMChecks.check_mac_address(),
-                "vm_artifacts": self.VMChecks.check_vm_artifacts(),
-                "cpu_features": self.VMChecks.check_cpu_features(),
-                "hypervisor": self.DebuggerChecks.check_hypervisor(),
-                "sandbox_files": self.DebuggerChecks.check_sandbox_files(),
-                "debugger_present": self.DebuggerChecks.detect_debugger(),
-                "suspicious_processes": self.ProcessChecks.detect_suspicious_processes(),
-                "timing_anomaly": self.DebuggerChecks.anti_timing_check(),
-            }
+            "detailed": dict(self.results),
         }
@@ -0,0 +1,245 @@
+"""
+WebSocket channel for exam proctoring (ASGI only; ``PROCTORING_WEBSOCKET``).
+
+The exam page keeps one socket open per exam session at
+``/ws/proctoring/?testid=<test id>`` instead of sending one HTTP request per
+frame, so frames skip the middleware stack, cookies and the per-request
+session save. The socket is authenticated once, from the session cookie, on
+connect.
+
+Client -> server:
+
+* binary message: one encoded JPEG/WebP frame
+* ``{"type": "audio", "voice_db": <level>}``: audio level for the next frames
+* ``{"type": "window_event"}``: the exam window lost focus
+
+Server -> client:
+
+* ``{"type": "verdict", ...}``: the ``/video_feed`` verdict for a frame; with
+  ``status`` ``"terminate"`` the socket is closed after it
+* ``{"type": "error", "message": ...}``
+
+The same router serves the professor's live monitoring feed at
+``/ws/monitoring/?testid=<test id>[&email=<student>]``: only the test's owner
+may connect, and the socket receives ``{"type": "stats", "students":
+{email: counters}}`` with the counters that changed (see ``monitoring``).
+
+Backpressure: each socket has one frame being scored and at most one
+waiting; a newer frame replaces the waiting one (counted in ``dropped`` of
+the next verdict), and ``next_interval_ms`` tells the client how fast to
+send. Frames are scored on the bounded pool of ``async_views``.
+"""
+import asyncio
+import json
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import parse_cookie
+
+PATH = '/ws/proctoring/'
+MONITORING_PATH = '/ws/monitoring/'
+
+# Application close codes
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_FORBIDDEN = 4403
+CLOSE_TERMINATED = 4000
+
+
+def _header(scope, name):
+    for key, value in scope.get('headers', ()):
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def _same_origin(scope):
+    """Browsers send Origin on WebSocket handshakes; refuse other sites' pages."""
+    origin = _header(scope, b'origin')
+    return origin is None or urlparse(origin).netloc == _header(scope, b'host')
+
+
+def _session_user(cookie_header):
+    """The logged-in user of the session cookie in ``cookie_header``, or None."""
+    from django.contrib.auth import get_user
+
+    session_key = parse_cookie(cookie_header or '').get(settings.SESSION_COOKIE_NAME)
+    if not session_key:
+        return None
+    session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+    user = get_user(SimpleNamespace(session=session))
+    return user if user.is_authenticated else None
+
+
+def _owns_test(user, test_id):
+    from .models import Teacher
+
+    return user.user_type == 'teacher' and Teacher.objects.filter(test_id=test_id, uid=user).exists()
+
+
+def _query_param(scope, name):
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    return (query.get(name) or [None])[0]
+
+
+class _Session:
+    """One proctoring socket: the latest waiting frame and the scoring loop."""
+
+    def __init__(self, user, test_id, send):
+        self.user = user
+        self.test_id = test_id
+        self.send = send
+        self.voice_db = None
+        self.pending = None
+        self.dropped = 0
+        self.closed = False
+        self.wakeup = asyncio.Event()
+
+    def offer(self, data):
+        if self.pending is not None:
+            self.dropped += 1
+        self.pending = data
+        self.wakeup.set()
+
+    async def send_json(self, payload):
+        await self.send({'type': 'websocket.send', 'text': json.dumps(payload)})
+
+    async def score_frames(self):
+        from . import async_views, views
+
+        while not self.closed:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            data, self.pending = self.pending, None
+            if data is None:
+                continue
+            dropped, self.dropped = self.dropped, 0
+
+            if not async_views.EXECUTOR.try_acquire():
+                await self.send_json({'type': 'verdict', 'status': 'busy', 'alert': None, 'score': 0})
+                continue
+            try:
+                frame = views.Frame.from_bytes(data)
+                verdict = await async_views.EXECUTOR.run(
+                    views._score_frame, self.user, self.test_id, frame, self.voice_db
+                )
+            except ValueError:
+                await self.send_json({'type': 'error', 'message': 'Could not decode frame'})
+                continue
+            except Exception as e:
+                print(f"Monitoring error: {e}")
+                await self.send_json({'type': 'error', 'message': str(e)})
+                continue
+
+            await self.send_json(dict(verdict, type='verdict', dropped=dropped))
+            if verdict.get('status') == 'terminate':
+                views._forget_session(self.user, self.test_id)
+                self.closed = True
+                await self.send({'type': 'websocket.close', 'code': CLOSE_TERMINATED})
+
+    async def handle_text(self, text):
+        from .scoring import TAB_SWITCH_EVENT, record_violations
+
+        try:
+            message = json.loads(text)
+        except ValueError:
+            return
+        kind = message.get('type') if isinstance(message, dict) else None
+        if kind == 'audio':
+            self.voice_db = message.get('voice_db')
+        elif kind == 'window_event':
+            await sync_to_async(record_violations)(self.user, self.test_id, [TAB_SWITCH_EVENT])
+
+
+async def proctoring_socket(scope, receive, send):
+    """ASGI application for one proctoring WebSocket."""
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+    if not _same_origin(scope):
+        await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+        return
+    user = await sync_to_async(_session_user)(_header(scope, b'cookie'))
+    if user is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        return
+
+    test_id = _query_param(scope, 'testid')
+    max_bytes = getattr(settings, 'PROCTORING_MAX_FRAME_BYTES', 2 * 1024 * 1024)
+    await send({'type': 'websocket.accept'})
+
+    session = _Session(user, test_id, send)
+    scorer = asyncio.ensure_future(session.score_frames())
+    try:
+        while not session.closed:
+            event = await receive()
+            if event['type'] == 'websocket.disconnect':
+                break
+            if event['type'] != 'websocket.receive':
+                continue
+            if event.get('bytes') is not None:
+                if len(event['bytes']) > max_bytes:
+                    await session.send_json({'type': 'error', 'message': 'Frame too large'})
+                else:
+                    session.offer(event['bytes'])
+            elif event.get('text') is not None:
+                await session.handle_text(event['text'])
+    finally:
+        session.closed = True
+        session.wakeup.set()
+        scorer.cancel()
+
+
+async def monitoring_socket(scope, receive, send):
+    """ASGI application for one professor's live monitoring socket."""
+    from .monitoring import MONITORING_FEED
+
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+    if not _same_origin(scope):
+        await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+        return
+    user = await sync_to_async(_session_user)(_header(scope, b'cookie'))
+    if user is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        return
+    test_id = _query_param(scope, 'testid')
+    if not test_id or not await sync_to_async(_owns_test)(user, test_id):
+        await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+        return
+    await send({'type': 'websocket.accept'})
+
+    subscriber = MONITORING_FEED.subscribe(test_id, _query_param(scope, 'email'))
+
+    async def push():
+        while True:
+            students = await subscriber.next()
+            await send({'type': 'websocket.send', 'text': json.dumps({'type': 'stats', 'students': students})})
+
+    pusher = asyncio.ensure_future(push())
+    try:
+        # Nothing is expected from the dashboard; wait for it to go away
+        while (await receive())['type'] != 'websocket.disconnect':
+            pass
+    finally:
+        MONITORING_FEED.unsubscribe(test_id, subscriber)
+        pusher.cancel()
+
+
+def websocket_router(http_application):
+    """ASGI application serving the proctoring and monitoring sockets and passing everything else to Django."""
+
+    async def application(scope, receive, send):
+        if scope['type'] == 'websocket':
+            if scope['path'] == PATH:
+                return await proctoring_socket(scope, receive, send)
+            if scope['path'] == MONITORING_PATH:
+                return await monitoring_socket(scope, receive, send)
+            await receive()
+            return await send({'type': 'websocket.close'})
+        return await http_application(scope, receive, send)
+
+    return application
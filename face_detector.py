@@ -27,9 +27,12 @@ def get_face_detector(modelFile=None,
         model = cv2.dnn.readNetFromCaffe(configFile, modelFile)
     return model
 
-def find_faces(img, model):
+def find_faces(img, model, resized=None):
+    # ``resized`` may pass in an already 300x300 copy of ``img``
     h, w = img.shape[:2]
-    blob = cv2.dnn.blobFromImage(cv2.resize(img, (300, 300)), 1.0,
+    if resized is None:
+        resized = cv2.resize(img, (300, 300))
+    blob = cv2.dnn.blobFromImage(resized, 1.0,
 	(300, 300), (104.0, 177.0, 123.0))
     model.setInput(blob)
     res = model.forward()
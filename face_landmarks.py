@@ -76,34 +76,73 @@ def move_box(box, offset):
         return [left_x, top_y, right_x, bottom_y]
 
 def detect_marks(img, model, face):
-    offset_y = int(abs((face[3] - face[1]) * 0.1))
-    box_moved = move_box(face, [0, offset_y])
-    facebox = get_square_box(box_moved)
-    
-    h, w = img.shape[:2]
-    if facebox[0] < 0:
-        facebox[0] = 0
-    if facebox[1] < 0:
-        facebox[1] = 0
-    if facebox[2] > w:
-        facebox[2] = w
-    if facebox[3] > h:
-        facebox[3] = h
-    
-    face_img = img[facebox[1]: facebox[3],
-                     facebox[0]: facebox[2]]
-    face_img = cv2.resize(face_img, (320, 320))
-    face_img = cv2.cvtColor(face_img, cv2.COLOR_BGR2RGB)
-    
+    """Landmarks of one face; see ``detect_marks_batch`` for many faces."""
+    return detect_marks_batch([(img, face)], model)[0]
+
+
+def square_boxes(faces, shape=None):
+    """
+    Vectorized ``move_box`` + ``get_square_box`` + clamping for an ``(N, 4)``
+    array of face boxes, as done per face by ``detect_marks``. Boxes are
+    clamped to ``shape`` (height, width) when given.
+    """
+    boxes = np.array(faces, dtype=np.int64).reshape(-1, 4)
+    # Shift down by 10% of the height
+    offset_y = (np.abs(boxes[:, 3] - boxes[:, 1]) * 0.1).astype(np.int64)
+    boxes[:, [1, 3]] += offset_y[:, None]
+
+    left, top, right, bottom = boxes.T
+    diff = (bottom - top) - (right - left)
+    delta = (np.abs(diff) / 2).astype(np.int64)
+    odd = np.mod(diff, 2) == 1
+    slim, short = diff > 0, diff < 0
+    # Height > width, a slim box: widen. Width > height, a short box: heighten.
+    boxes[:, 0] -= np.where(slim, delta, 0)
+    boxes[:, 2] += np.where(slim, delta + odd, 0)
+    boxes[:, 1] -= np.where(short, delta, 0)
+    boxes[:, 3] += np.where(short, delta + odd, 0)
+
+    if shape is not None:
+        h, w = shape[:2]
+        np.maximum(boxes[:, :2], 0, out=boxes[:, :2])
+        np.minimum(boxes[:, 2], w, out=boxes[:, 2])
+        np.minimum(boxes[:, 3], h, out=boxes[:, 3])
+    return boxes
+
+
+def detect_marks_batch(items, model):
+    """
+    Landmarks for many faces in one predict call.
+
+    ``items`` is a list of ``(img, face)`` pairs - several faces of one frame,
+    or faces from frames of different sessions. All crops are stacked into a
+    single ``[N, 320, 320, 3]`` tensor. Returns one ``(68, 2)`` array per item,
+    or ``None`` for a face whose box lies outside its image.
+    """
+    if not items:
+        return []
+    crops, boxes, index = [], [], []
+    for i, (img, face) in enumerate(items):
+        box = square_boxes([face], img.shape)[0]
+        if box[2] <= box[0] or box[3] <= box[1]:
+            continue
+        face_img = cv2.resize(img[box[1]: box[3], box[0]: box[2]], (320, 320))
+        crops.append(cv2.cvtColor(face_img, cv2.COLOR_BGR2RGB))
+        boxes.append(box)
+        index.append(i)
+
+    results = [None] * len(items)
+    if not crops:
+        return results
+
     predictions = model.signatures["predict"](
-        tf.constant([face_img], dtype=tf.uint8))
-
-    marks = np.array(predictions['output']).flatten()[:136]
-    marks = np.reshape(marks, (-1, 2))
-    
-    marks *= (facebox[2] - facebox[0])
-    marks[:, 0] += facebox[0]
-    marks[:, 1] += facebox[1]
+        tf.constant(np.stack(crops), dtype=tf.uint8))
+    boxes = np.array(boxes)
+    marks = np.array(predictions['output']).reshape(len(crops), -1)[:, :136].reshape(-1, 68, 2)
+    marks *= (boxes[:, 2] - boxes[:, 0])[:, None, None]
+    marks += boxes[:, None, :2]
     marks = marks.astype(np.uint)
+    for i, face_marks in zip(index, marks):
+        results[i] = face_marks
+    return results
 
-    return marks
\ No newline at end of file
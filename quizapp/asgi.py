@@ -4,8 +4,22 @@ ASGI config for quizapp project.
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'quizapp.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Proctoring WebSocket (exams/websocket.py) next to the Django HTTP app
+if getattr(settings, 'PROCTORING_WEBSOCKET', False):
+    from exams.websocket import websocket_router  # noqa: E402
+
+    application = websocket_router(django_application)
+else:
+    application = django_application
+
+# Load and warm up inference models before this worker takes traffic
+from exams.model_registry import preload_models  # noqa: E402
+
+preload_models()
@@ -24,6 +24,7 @@ from exams.views import (
     randomize_view,
     window_event_view,
     video_feed_view,
+    model_health_view,
     calculator_view,
     create_test_view,
     create_test_lqa_view,
@@ -53,6 +54,10 @@ from exams.views import (
     publish_results_view,
 )
 
+# ASGI deployments serve the proctoring endpoints from async views
+if getattr(settings, 'PROCTORING_ASYNC_VIEWS', False):
+    from exams.async_views import video_feed_view, window_event_view  # noqa: F811
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('accounts.urls')),
@@ -92,6 +97,7 @@ urlpatterns = [
     path('randomize', randomize_view, name='randomize'),
     path('window_event', window_event_view, name='window_event'),
     path('video_feed', video_feed_view, name='video_feed'),
+    path('health/models', model_health_view, name='model_health'),
     path('calc', calculator_view, name='calculator'),
     path('create-test', create_test_view, name='create_test'),
     path('create_test_lqa', create_test_lqa_view, name='create_test_lqa'),
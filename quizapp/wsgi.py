@@ -9,3 +9,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'quizapp.settings')
 
 application = get_wsgi_application()
+
+# Load and warm up inference models before this worker takes traffic
+from exams.model_registry import preload_models  # noqa: E402
+
+preload_models()
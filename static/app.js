@@ -73,6 +73,8 @@ var javascriptNode = null;
 var array = null;
 var values = 0;
 var length = null;
+// Capture period in ms; the server may slow it down while the scene is static
+var captureInterval = 1000;
 
 function startStreaming() {
     stream = document.getElementById("stream");
@@ -134,12 +136,134 @@ function stopStreaming() {
     }
 }
 
+// Capture settings advertised by the server for binary frame uploads
+var captureConfig = null;
+
+function loadCaptureConfig() {
+    captureConfig = {};
+    $.getJSON('/exams/frame/', { testid: tid }, function (config) {
+        captureConfig = config;
+        if (capture && config.width && config.height) {
+            capture.width = config.width;
+            capture.height = config.height;
+        }
+        if (config.websocket) openProctorSocket(config.websocket);
+    });
+}
+
+// Proctoring WebSocket, when the server offers one: frames go up as binary
+// messages and verdicts come back on the same socket. While it is closed,
+// frames are uploaded over HTTP.
+var proctorSocket = null;
+var socketSentAt = 0;
+
+function openProctorSocket(path) {
+    if (typeof WebSocket === 'undefined' || proctorSocket) return;
+    var scheme = window.location.protocol === 'https:' ? 'wss://' : 'ws://';
+    var socket = new WebSocket(scheme + window.location.host + path + '?testid=' + encodeURIComponent(tid));
+    socket.onopen = function () {
+        proctorSocket = socket;
+        socketSentAt = 0;
+    };
+    socket.onmessage = function (event) {
+        var data = JSON.parse(event.data);
+        socketSentAt = 0;
+        if (data.type === 'verdict') {
+            handleFeedResponse(data);
+        } else if (data.type === 'error') {
+            console.log("Frame upload failed: " + data.message);
+        }
+    };
+    socket.onclose = function (event) {
+        proctorSocket = null;
+        // 4xxx: terminated or refused; anything else is retried
+        if (event.code < 4000) {
+            setTimeout(function () { openProctorSocket(path); }, 5000);
+        }
+    };
+}
+
+function socketReady() {
+    return proctorSocket !== null && proctorSocket.readyState === WebSocket.OPEN;
+}
+
+// Face area of the last verdict ([x1, y1, x2, y2] fractions), if any
+var roiHint = null;
+var roiCanvas = null;
+var smallCanvas = null;
+
+function handleFeedResponse(data) {
+    // console.log(data);
+
+    if (data.next_interval_ms) {
+        captureInterval = data.next_interval_ms;
+    }
+    if ('roi' in data) {
+        roiHint = data.roi;
+    }
+
+    // Handle Termination
+    if (data.status === 'terminate') {
+        if (typeof Swal !== 'undefined') {
+            Swal.fire({
+                icon: 'error',
+                title: 'Exam Terminated',
+                text: 'You have exceeded the maximum number of violations (10). Your exam is being submitted.',
+                allowOutsideClick: false,
+                timer: 5000,
+                timerProgressBar: true
+            }).then(() => {
+                // Simulate finish button click
+                document.getElementById('finishBtn').click();
+            });
+        } else {
+            alert("Exam Terminated: Excessive Violations.");
+            document.getElementById('finishBtn').click();
+        }
+        return; // Stop processing
+    }
+
+    if (data.warning) {
+        // Play alert sound if available
+        try {
+            const audio = new Audio('/static/assets/alert.mp3');
+            audio.play().catch(e => console.log("Audio play failed"));
+        } catch (e) { }
+
+        // Show visual alert
+        if (typeof Swal !== 'undefined') {
+            const Toast = Swal.mixin({
+                toast: true,
+                position: 'top-end',
+                showConfirmButton: false,
+                timer: 3000,
+                timerProgressBar: true,
+                didOpen: (toast) => {
+                    toast.addEventListener('mouseenter', Swal.stopTimer)
+                    toast.addEventListener('mouseleave', Swal.resumeTimer)
+                }
+            });
+
+            Toast.fire({
+                icon: 'error',
+                title: data.warning
+            });
+        } else {
+            // Fallback if SweetAlert not loaded
+            console.warn("VIOLATION:", data.warning);
+            // Maybe use a custom div or standard alert (though alert is blocking)
+            // document.getElementById('warning-banner').innerText = data.warning;
+        }
+    }
+}
+
 function captureSnapshot() {
     if (null != cameraStream && capture && stream) {
+        var binaryUpload = typeof capture.toBlob === 'function' && typeof fetch === 'function';
+        if (binaryUpload && captureConfig === null) loadCaptureConfig();
+
         var ctx = capture.getContext('2d');
         ctx.drawImage(stream, 0, 0, capture.width, capture.height);
-        var d1 = capture.toDataURL("image/png");
-        var res = d1.replace("data:image/png;base64,", "");
 
         var average = 0;
         if (length > 0) average = values / length;
@@ -148,69 +272,89 @@ function captureSnapshot() {
         // console.log(Math.round(average - 40));
 
         if (average) {
-            $.post("/video_feed", {
-                data: { 'imgData': res, 'voice_db': average, 'testid': tid }
-            },
-                function (data) {
-                    // console.log(data);
-
-                    // Handle Termination
-                    if (data.status === 'terminate') {
-                        if (typeof Swal !== 'undefined') {
-                            Swal.fire({
-                                icon: 'error',
-                                title: 'Exam Terminated',
-                                text: 'You have exceeded the maximum number of violations (10). Your exam is being submitted.',
-                                allowOutsideClick: false,
-                                timer: 5000,
-                                timerProgressBar: true
-                            }).then(() => {
-                                // Simulate finish button click
-                                document.getElementById('finishBtn').click();
-                            });
-                        } else {
-                            alert("Exam Terminated: Excessive Violations.");
-                            document.getElementById('finishBtn').click();
-                        }
-                        return; // Stop processing
-                    }
-
-                    if (data.warning) {
-                        // Play alert sound if available
-                        try {
-                            const audio = new Audio('/static/assets/alert.mp3');
-                            audio.play().catch(e => console.log("Audio play failed"));
-                        } catch (e) { }
-
-                        // Show visual alert
-                        if (typeof Swal !== 'undefined') {
-                            const Toast = Swal.mixin({
-                                toast: true,
-                                position: 'top-end',
-                                showConfirmButton: false,
-                                timer: 3000,
-                                timerProgressBar: true,
-                                didOpen: (toast) => {
-                                    toast.addEventListener('mouseenter', Swal.stopTimer)
-                                    toast.addEventListener('mouseleave', Swal.resumeTimer)
-                                }
-                            });
-
-                            Toast.fire({
-                                icon: 'error',
-                                title: data.warning
-                            });
-                        } else {
-                            // Fallback if SweetAlert not loaded
-                            console.warn("VIOLATION:", data.warning);
-                            // Maybe use a custom div or standard alert (though alert is blocking)
-                            // document.getElementById('warning-banner').innerText = data.warning;
-                        }
-                    }
-                });
+            if (binaryUpload && socketReady()) {
+                // One frame in flight: the next goes up once its verdict is back
+                if (!socketSentAt || Date.now() - socketSentAt > 10000) {
+                    socketSentAt = Date.now();
+                    proctorSocket.send(JSON.stringify({ type: 'audio', voice_db: average }));
+                    capture.toBlob(function (blob) {
+                        if (blob && socketReady()) proctorSocket.send(blob);
+                    }, captureConfig.format || 'image/jpeg', captureConfig.quality || 0.7);
+                }
+            } else if (binaryUpload && roiHint && captureConfig.roi_frame_scale) {
+                uploadWithRoi(average);
+            } else if (binaryUpload) {
+                // Send the encoded frame as the raw request body
+                var format = captureConfig.format || 'image/jpeg';
+                capture.toBlob(function (blob) {
+                    if (!blob) return;
+                    var query = '?testid=' + encodeURIComponent(tid) + '&voice_db=' + encodeURIComponent(average);
+                    fetch('/exams/frame/' + query, {
+                        method: 'POST',
+                        headers: {
+                            'Content-Type': 'application/octet-stream',
+                            'X-CSRFToken': getCsrfToken()
+                        },
+                        body: blob
+                    })
+                        .then(function (response) { return response.json(); })
+                        .then(handleFeedResponse)
+                        .catch(function (err) { console.log("Frame upload failed: " + err); });
+                }, format, captureConfig.quality || 0.7);
+            } else {
+                // Legacy clients: base64 PNG form post
+                var d1 = capture.toDataURL("image/png");
+                var res = d1.replace("data:image/png;base64,", "");
+                $.post("/video_feed", {
+                    data: { 'imgData': res, 'voice_db': average, 'testid': tid }
+                }, handleFeedResponse);
+            }
         }
     }
-    setTimeout(captureSnapshot, 1000);
+    setTimeout(captureSnapshot, captureInterval);
+}
+
+// Send a reduced full frame plus the face area cropped at the camera's
+// native resolution, as a multipart form
+function uploadWithRoi(average) {
+    var videoWidth = stream.videoWidth || capture.width;
+    var videoHeight = stream.videoHeight || capture.height;
+    var box = roiHint;
+    var sx = Math.floor(box[0] * videoWidth), sy = Math.floor(box[1] * videoHeight);
+    var sw = Math.ceil((box[2] - box[0]) * videoWidth), sh = Math.ceil((box[3] - box[1]) * videoHeight);
+    if (sw < 2 || sh < 2) return;
+
+    smallCanvas = smallCanvas || document.createElement('canvas');
+    smallCanvas.width = Math.round(capture.width * captureConfig.roi_frame_scale);
+    smallCanvas.height = Math.round(capture.height * captureConfig.roi_frame_scale);
+    smallCanvas.getContext('2d').drawImage(stream, 0, 0, smallCanvas.width, smallCanvas.height);
+
+    roiCanvas = roiCanvas || document.createElement('canvas');
+    roiCanvas.width = sw;
+    roiCanvas.height = sh;
+    roiCanvas.getContext('2d').drawImage(stream, sx, sy, sw, sh, 0, 0, sw, sh);
+
+    var format = captureConfig.format || 'image/jpeg';
+    var quality = captureConfig.quality || 0.7;
+    smallCanvas.toBlob(function (frameBlob) {
+        roiCanvas.toBlob(function (roiBlob) {
+            if (!frameBlob || !roiBlob) return;
+            var form = new FormData();
+            form.append('frame', frameBlob, 'frame');
+            form.append('roi', roiBlob, 'roi');
+            form.append('roi_box', [sx / videoWidth, sy / videoHeight, (sx + sw) / videoWidth, (sy + sh) / videoHeight].join(','));
+            form.append('testid', tid);
+            form.append('voice_db', average);
+            fetch('/exams/frame/', {
+                method: 'POST',
+                headers: { 'X-CSRFToken': getCsrfToken() },
+                body: form
+            })
+                .then(function (response) { return response.json(); })
+                .then(handleFeedResponse)
+                .catch(function (err) { console.log("Frame upload failed: " + err); });
+        }, format, quality);
+    }, format, quality);
 }
 
 
@@ -221,7 +365,9 @@ $(document).ready(function () {
     // Window focus handling
     window.onfocus = function (event) {
         mySnackBar();
-        if (typeof tid !== 'undefined') {
+        if (typeof tid !== 'undefined' && socketReady()) {
+            proctorSocket.send(JSON.stringify({ type: 'window_event' }));
+        } else if (typeof tid !== 'undefined') {
             $.ajax({
                 data: { 'testid': tid },
                 type: "POST",
@@ -0,0 +1,11 @@
+"""
+Shared vision engine for proctoring: one decoded :class:`Frame` passed
+through an optional set of stages (objects, faces, landmarks, head pose,
+gaze) by :class:`VisionPipeline`, with optional per-session face
+tracking (:class:`FaceTracker`).
+"""
+from .face_tracking import FaceTracker
+from .frame import Frame
+from .pipeline import STAGES, VisionPipeline, resolve_stages, signals
+
+__all__ = ["FaceTracker", "Frame", "STAGES", "VisionPipeline", "resolve_stages", "signals"]
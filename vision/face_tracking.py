@@ -0,0 +1,172 @@
+"""
+Detect-then-track face boxes.
+
+The SSD face detector is run on the first frame of a session, every
+``detect_every`` frames after that, and whenever tracking is lost. On the
+frames in between, each face box is carried forward by following corner
+features inside it with pyramidal Lucas-Kanade optical flow on a downscaled
+grayscale copy of the frame - a fraction of the cost of the SSD forward pass.
+
+A track is lost when fewer than ``min_points`` of a box's features survive
+the forward-backward flow check, when the box leaves the frame, or when the
+frame size changes. While no face is found the detector runs on every frame,
+so a face coming back into view is picked up immediately.
+
+State is kept per exam session, keyed like :class:`exams.motion.MotionGate`
+(``(user_id, test_id)``), and dropped after ``idle_seconds`` without frames.
+"""
+import threading
+import time
+
+_LK_WINDOW = (15, 15)
+_LK_LEVELS = 2
+
+
+class _Track:
+    __slots__ = ("gray", "scale", "boxes", "points", "since_detect", "seen_at", "lock")
+
+    def __init__(self):
+        self.gray = None
+        self.scale = 1.0
+        self.boxes = []          # face boxes in full-frame pixels
+        self.points = []         # per box, (K, 1, 2) float32 features in ``gray`` pixels
+        self.since_detect = 0
+        self.seen_at = 0.0
+        self.lock = threading.Lock()
+
+
+class FaceTracker:
+    """Per-session face tracker keyed by ``(user_id, test_id)``."""
+
+    def __init__(self, detect_every=10, track_width=320, max_points=30, min_points=6,
+                 max_error=1.0, idle_seconds=900):
+        self.detect_every = max(1, int(detect_every))
+        self.track_width = int(track_width)
+        self.max_points = int(max_points)
+        self.min_points = int(min_points)
+        self.max_error = float(max_error)
+        self.idle_seconds = float(idle_seconds)
+        self.detections = 0
+        self.tracked = 0
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def faces(self, key, frame, detect):
+        """
+        Face boxes ``[x1, y1, x2, y2]`` for ``frame`` (a :class:`vision.Frame`)
+        in session ``key``; ``detect()`` runs the face detector on it.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            track = self._sessions.get(key)
+            if track is None:
+                track = self._sessions[key] = _Track()
+            track.seen_at = now
+
+        # Frames of one session are handled in order; sessions run in parallel
+        with track.lock:
+            height, width = frame.shape[:2]
+            scale = min(1.0, self.track_width / float(width))
+            gray = frame.resized((max(1, int(width * scale)), max(1, int(height * scale))), "gray")
+
+            boxes = None
+            if (track.boxes and track.since_detect < self.detect_every - 1
+                    and track.gray is not None and track.gray.shape == gray.shape):
+                boxes = self._follow(track, gray, (width, height))
+
+            if boxes is None:
+                boxes = [list(map(int, box)) for box in detect()]
+                track.points = [self._features(gray, box, scale) for box in boxes]
+                if any(points is None for points in track.points):
+                    # A face without trackable texture: detect again next frame
+                    track.points = []
+                    track.boxes = []
+                else:
+                    track.boxes = boxes
+                track.since_detect = 0
+                self.detections += 1
+            else:
+                track.since_detect += 1
+                self.tracked += 1
+            track.gray = gray
+            track.scale = scale
+            return [list(box) for box in boxes]
+
+    def forget(self, key):
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def _features(self, gray, box, scale):
+        """Corner features inside ``box``, in ``gray`` pixels, or None if too few."""
+        import cv2
+        import numpy as np
+
+        x1, y1, x2, y2 = (int(round(v * scale)) for v in box)
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(gray.shape[1], x2), min(gray.shape[0], y2)
+        if x2 - x1 < 4 or y2 - y1 < 4:
+            return None
+        mask = np.zeros(gray.shape, dtype=np.uint8)
+        mask[y1:y2, x1:x2] = 255
+        points = cv2.goodFeaturesToTrack(gray, self.max_points, 0.01, 3, mask=mask)
+        if points is None or len(points) < self.min_points:
+            return None
+        return points.astype(np.float32)
+
+    def _follow(self, track, gray, size):
+        """Boxes moved along the optical flow, or None if any face was lost."""
+        import cv2
+        import numpy as np
+
+        lk_params = dict(
+            winSize=_LK_WINDOW,
+            maxLevel=_LK_LEVELS,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03),
+        )
+        previous = np.concatenate(track.points)
+        current, status, _ = cv2.calcOpticalFlowPyrLK(track.gray, gray, previous, None, **lk_params)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, track.gray, current, None, **lk_params)
+        good = (
+            (status.ravel() == 1) & (back_status.ravel() == 1)
+            & (np.abs(back - previous).reshape(-1, 2).max(axis=1) < self.max_error)
+        )
+
+        width, height = size
+        boxes, points, start = [], [], 0
+        for box, box_points in zip(track.boxes, track.points):
+            segment = slice(start, start + len(box_points))
+            start += len(box_points)
+            keep = good[segment]
+            if keep.sum() < self.min_points:
+                return None
+            old = previous[segment][keep].reshape(-1, 2)
+            new = current[segment][keep].reshape(-1, 2)
+
+            # Median shift, and median change of the spread around the centre for scale
+            shift = np.median(new - old, axis=0) / track.scale
+            old_spread = np.linalg.norm(old - old.mean(axis=0), axis=1)
+            new_spread = np.linalg.norm(new - new.mean(axis=0), axis=1)
+            usable = old_spread > 1e-3
+            zoom = float(np.median(new_spread[usable] / old_spread[usable])) if usable.any() else 1.0
+
+            cx, cy = (box[0] + box[2]) / 2 + shift[0], (box[1] + box[3]) / 2 + shift[1]
+            half_w, half_h = (box[2] - box[0]) * zoom / 2, (box[3] - box[1]) * zoom / 2
+            moved = [int(cx - half_w), int(cy - half_h), int(cx + half_w), int(cy + half_h)]
+            if moved[2] <= 0 or moved[3] <= 0 or moved[0] >= width or moved[1] >= height:
+                return None
+            boxes.append(moved)
+            points.append(new.reshape(-1, 1, 2).astype(np.float32))
+
+        track.boxes = boxes
+        track.points = points
+        return boxes
+
+    def _sweep(self, now):
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        stale = [key for key, track in self._sessions.items() if now - track.seen_at > self.idle_seconds]
+        for key in stale:
+            del self._sessions[key]
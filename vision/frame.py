@@ -0,0 +1,150 @@
+"""
+A single proctoring frame shared by every pipeline stage.
+
+The image is decoded at most once (lazily, from the encoded bytes it was built
+from) and every derived variant - colour conversions and resized copies - is
+computed once and cached, so stages that need the same input (e.g. RGB at
+320x320) share it. Stage results are stored on the frame as well.
+
+A frame may carry a region of interest: a higher-resolution crop of part of
+the scene (the face area, from the client's ROI hint) sent alongside a
+low-resolution full frame. Face stages then read face pixels from the crop.
+
+OpenCV and NumPy are imported when a frame is first decoded or converted, so
+importing this module does not load them.
+"""
+import base64
+
+
+class Frame:
+
+    __slots__ = ("_encoded", "_bgr", "_cache", "roi", "roi_box",
+                 "objects", "faces", "landmarks", "head_poses", "gaze")
+
+    RESULT_FIELDS = ("objects", "faces", "landmarks", "head_poses", "gaze")
+
+    def __init__(self, bgr=None, encoded=None):
+        if bgr is None and encoded is None:
+            raise ValueError("Frame needs an image or encoded bytes")
+        self._bgr = bgr
+        self._encoded = encoded
+        self._cache = {}
+        self.roi = None          # Frame with a sharper crop of part of this one
+        self.roi_box = None      # where it sits, (x1, y1, x2, y2) as fractions of the frame
+        # Stage results (None until the stage has run)
+        self.objects = None      # Detections
+        self.faces = None        # list of [x1, y1, x2, y2]
+        self.landmarks = None    # list of (68, 2) arrays, one per face
+        self.head_poses = None   # list of (pitch, yaw) in degrees, one per face
+        self.gaze = None         # gaze.GAZE_* code
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Frame from JPEG/PNG/WebP bytes (or any buffer); decoded on first use."""
+        return cls(encoded=data)
+
+    @classmethod
+    def from_base64(cls, text):
+        """Frame from base64 image data, with or without a ``data:`` URL prefix."""
+        if "base64," in text:
+            text = text.split("base64,", 1)[1]
+        return cls(encoded=base64.b64decode(text))
+
+    @classmethod
+    def from_image(cls, image):
+        """Frame from a BGR array, or a PIL image (RGB)."""
+        import cv2
+        import numpy as np
+
+        if isinstance(image, np.ndarray):
+            return cls(bgr=image)
+        return cls(bgr=cv2.cvtColor(np.asarray(image.convert("RGB")), cv2.COLOR_RGB2BGR))
+
+    @property
+    def bgr(self):
+        """The decoded image as a BGR ``uint8`` array."""
+        if self._bgr is None:
+            import cv2
+            import numpy as np
+
+            bgr = cv2.imdecode(np.frombuffer(self._encoded, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if bgr is None:
+                raise ValueError("Could not decode frame")
+            self._bgr, self._encoded = bgr, None
+        return self._bgr
+
+    @property
+    def shape(self):
+        return self.bgr.shape
+
+    @property
+    def gray(self):
+        return self.variant("gray")
+
+    @property
+    def rgb(self):
+        return self.variant("rgb")
+
+    def variant(self, color="bgr", size=None):
+        """
+        The frame in ``color`` ('bgr', 'rgb' or 'gray'), resized to ``size``
+        ``(width, height)`` if given. Each variant is computed once.
+        """
+        if color == "bgr" and size is None:
+            return self.bgr
+        key = (color, size)
+        cached = self._cache.get(key)
+        if cached is None:
+            import cv2
+
+            if size is not None:
+                image = cv2.resize(self.variant(color), size)
+            elif color == "rgb":
+                image = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB)
+            elif color == "gray":
+                image = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+            else:
+                raise ValueError(f"Unknown colour {color!r}")
+            cached = self._cache[key] = image
+        return cached
+
+    def resized(self, size, color="bgr"):
+        return self.variant(color, tuple(size))
+
+    def attach_roi(self, roi, box):
+        """
+        Attach ``roi`` (a Frame) as the crop of this frame's ``box``, given as
+        ``(x1, y1, x2, y2)`` fractions of the frame size.
+        """
+        x1, y1, x2, y2 = (min(1.0, max(0.0, float(v))) for v in box)
+        if x2 <= x1 or y2 <= y1:
+            raise ValueError("Empty region of interest")
+        self.roi, self.roi_box = roi, (x1, y1, x2, y2)
+
+    def face_source(self, face):
+        """
+        ``(image, box, scale, offset)`` to read the face ``box`` (frame pixels)
+        from: the ROI crop when it contains the face, else the frame itself.
+        A point ``p`` of ``image`` is ``p / scale + offset`` in the frame.
+        """
+        if self.roi is not None:
+            height, width = self.shape[:2]
+            x1, y1, x2, y2 = self.roi_box
+            left, top, right, bottom = x1 * width, y1 * height, x2 * width, y2 * height
+            if left <= face[0] and top <= face[1] and face[2] <= right and face[3] <= bottom:
+                roi_height, roi_width = self.roi.shape[:2]
+                scale = (roi_width / (right - left), roi_height / (bottom - top))
+                box = [
+                    int((face[0] - left) * scale[0]), int((face[1] - top) * scale[1]),
+                    int((face[2] - left) * scale[0]), int((face[3] - top) * scale[1]),
+                ]
+                return self.roi.bgr, box, scale, (left, top)
+        return self.bgr, face, (1.0, 1.0), (0.0, 0.0)
+
+    def results(self):
+        """Stage results, for reuse on a following unchanged frame."""
+        return {name: getattr(self, name) for name in self.RESULT_FIELDS}
+
+    def apply(self, results):
+        for name, value in (results or {}).items():
+            setattr(self, name, value)
@@ -0,0 +1,68 @@
+"""
+Eye-gaze direction via the optional ``gaze_tracking`` library.
+
+When the library is missing or incompatible, a no-op tracker is used and
+every frame reports ``GAZE_NOT_FOUND``. The library is only imported when the
+first frame is checked.
+"""
+import threading
+
+# camera.py status codes
+GAZE_NOT_FOUND, GAZE_BLINKING, GAZE_CENTER, GAZE_LEFT, GAZE_RIGHT = 0, 1, 2, 3, 4
+
+
+class _NoGazeTracking:  # fallback no-op implementation
+    def __init__(self):
+        self._frame = None
+
+    def refresh(self, frame):
+        self._frame = frame
+
+    def annotated_frame(self):
+        # Return the last seen frame (or None) for compatibility
+        return self._frame
+
+    def is_blinking(self):
+        return False
+
+    def is_right(self):
+        return False
+
+    def is_left(self):
+        return False
+
+    def is_center(self):
+        return False
+
+
+def _new_tracker():
+    # Gaze tracking is optional; provide a safe fallback if the external
+    # library is not installed or is incompatible on this system.
+    try:
+        from gaze_tracking import GazeTracking  # type: ignore
+    except Exception:
+        GazeTracking = _NoGazeTracking
+    return GazeTracking()
+
+
+_tracker = None
+_lock = threading.Lock()
+
+
+def direction(bgr):
+    """Gaze status code for a BGR frame."""
+    global _tracker
+    # The tracker keeps per-frame state, so calls are serialised
+    with _lock:
+        if _tracker is None:
+            _tracker = _new_tracker()
+        _tracker.refresh(bgr)
+        if _tracker.is_blinking():
+            return GAZE_BLINKING
+        if _tracker.is_right():
+            return GAZE_RIGHT
+        if _tracker.is_left():
+            return GAZE_LEFT
+        if _tracker.is_center():
+            return GAZE_CENTER
+        return GAZE_NOT_FOUND
@@ -0,0 +1,167 @@
+"""
+Head-pose estimation from the 68 facial landmarks.
+
+The six landmarks below are matched to a generic 3D face model with
+``cv2.solvePnP``; pitch comes from where the projected nose direction points,
+yaw from the projected annotation box (as in the original ``camera.py``).
+Angles are in degrees; a turn of ``TURN_THRESHOLD`` or more counts as looking
+up/down/left/right.
+
+Camera intrinsics are cached per frame size and the 3D points are built
+once. Only ``solvePnP`` runs per face; projecting the points and turning them
+into angles is done for all faces at once with NumPy. A degenerate face
+(collapsed landmarks, failed solve) gets NaN angles, which count as facing
+the camera.
+"""
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+# Nose tip, chin, left eye left corner, right eye right corner,
+# left mouth corner, right mouth corner
+LANDMARK_IDS = [30, 8, 36, 45, 48, 54]
+
+MODEL_POINTS = np.array([
+    (0.0, 0.0, 0.0),             # Nose tip
+    (0.0, -330.0, -65.0),        # Chin
+    (-225.0, 170.0, -135.0),     # Left eye left corner
+    (225.0, 170.0, -135.0),      # Right eye right corne
+    (-150.0, -150.0, -125.0),    # Left Mouth corner
+    (150.0, -150.0, -125.0)      # Right mouth corner
+])
+
+TURN_THRESHOLD = 48
+
+# camera.py status codes
+HEAD_CENTER, HEAD_UP, HEAD_DOWN, HEAD_LEFT, HEAD_RIGHT = 0, 1, 2, 3, 4
+
+_DIST_COEFFS = np.zeros((4, 1))  # Assuming no lens distortion
+
+# UPnP always fell back to EPnP and newer OpenCV builds dropped the flag
+_PNP_FLAGS = getattr(cv2, "SOLVEPNP_UPNP", cv2.SOLVEPNP_EPNP)
+
+
+@lru_cache(maxsize=16)
+def _intrinsics(height, width):
+    """Camera matrix plus its focal lengths and principal point as (2,) vectors."""
+    focal_length = width
+    center = (width / 2, height / 2)
+    matrix = np.array(
+        [[focal_length, 0, center[0]],
+         [0, focal_length, center[1]],
+         [0, 0, 1]], dtype="double"
+    )
+    focal, principal = matrix[[0, 1], [0, 1]], matrix[[0, 1], [2, 2]]
+    for array in (matrix, focal, principal):
+        array.flags.writeable = False
+    return matrix, focal, principal
+
+
+def camera_matrix(size):
+    """Pinhole intrinsics for a frame of ``size`` (height, width[, channels]); cached."""
+    return _intrinsics(int(size[0]), int(size[1]))[0]
+
+
+@lru_cache(maxsize=16)
+def _projected_points(width):
+    """Nose direction end point followed by the annotation box corners."""
+    rear_size, rear_depth = 1, 0
+    front_size, front_depth = width, width * 2
+    points = np.array([
+        (0.0, 0.0, 1000.0),
+        (-rear_size, -rear_size, rear_depth),
+        (-rear_size, rear_size, rear_depth),
+        (rear_size, rear_size, rear_depth),
+        (rear_size, -rear_size, rear_depth),
+        (-rear_size, -rear_size, rear_depth),
+        (-front_size, -front_size, front_depth),
+        (-front_size, front_size, front_depth),
+        (front_size, front_size, front_depth),
+        (front_size, -front_size, front_depth),
+        (-front_size, -front_size, front_depth),
+    ], dtype=float)
+    points.flags.writeable = False
+    return points
+
+
+def _solve(image_points, matrix):
+    """Rotation matrix and translation of one face, or None if it cannot be solved."""
+    try:
+        ok, rotation_vector, translation_vector = cv2.solvePnP(
+            MODEL_POINTS, image_points, matrix, _DIST_COEFFS, flags=_PNP_FLAGS)
+    except cv2.error:
+        return None
+    if not ok:
+        return None
+    return cv2.Rodrigues(rotation_vector)[0], translation_vector.reshape(3)
+
+
+def estimate_many(marks_list, size):
+    """
+    ``(N, 2)`` array of ``(pitch, yaw)`` in whole degrees for the landmarks of
+    N faces in a frame of ``size``; NaN rows for faces that cannot be solved.
+    """
+    n = len(marks_list)
+    if not n:
+        return np.zeros((0, 2))
+    matrix, focal, principal = _intrinsics(int(size[0]), int(size[1]))
+    image_points = np.stack([np.asarray(marks, dtype="double")[LANDMARK_IDS] for marks in marks_list])
+
+    # Landmarks collapsed onto a line or a point have no pose
+    spread = image_points.max(axis=1) - image_points.min(axis=1)
+    valid = (spread > 0).all(axis=1)
+    rotations = np.zeros((n, 3, 3))
+    translations = np.zeros((n, 3))
+    for i in np.flatnonzero(valid):
+        solved = _solve(image_points[i], matrix)
+        if solved is None:
+            valid[i] = False
+        else:
+            rotations[i], translations[i] = solved
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Pinhole projection (no distortion) of the nose end and box points
+        camera = _projected_points(int(size[1])) @ rotations.transpose(0, 2, 1) + translations[:, None, :]
+        uv = np.trunc(camera[..., :2] / camera[..., 2:3] * focal + principal)
+        valid &= np.isfinite(uv).all(axis=(1, 2))
+        uv[~valid] = 0
+
+        # Pitch: slope of the nose direction (vertical as 90)
+        p1 = np.trunc(image_points[:, 0])
+        d = uv[:, 0] - p1
+        pitch = np.where(d[:, 0] == 0, 90.0, np.trunc(np.degrees(np.arctan(d[:, 1] / d[:, 0]))))
+
+        # Yaw: angle of the normal to the box's front-to-rear line
+        box = uv[:, 1:].astype(np.int64)
+        x1, x2 = box[:, 2], (box[:, 5] + box[:, 8]) // 2
+        d = x2 - x1
+        yaw = np.trunc(np.degrees(np.arctan(-d[:, 0] / d[:, 1])))
+        yaw = np.where((d == 0).all(axis=1), 90.0, yaw)
+
+    angles = np.stack([pitch, yaw], axis=1)
+    angles[~valid] = np.nan
+    return angles
+
+
+def estimate(marks, size):
+    """``(pitch, yaw)`` in whole degrees for one face's landmarks in a frame of ``size``."""
+    pitch, yaw = estimate_many([marks], size)[0]
+    return pitch, yaw
+
+
+def directions(pitch, yaw):
+    """``(vertical, horizontal)`` status codes for a head pose (NaN counts as centred)."""
+    if pitch >= TURN_THRESHOLD:
+        vertical = HEAD_DOWN
+    elif pitch <= -TURN_THRESHOLD:
+        vertical = HEAD_UP
+    else:
+        vertical = HEAD_CENTER
+    if yaw >= TURN_THRESHOLD:
+        horizontal = HEAD_RIGHT
+    elif yaw <= -TURN_THRESHOLD:
+        horizontal = HEAD_LEFT
+    else:
+        horizontal = HEAD_CENTER
+    return vertical, horizontal
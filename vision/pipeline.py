@@ -0,0 +1,174 @@
+"""
+Staged proctoring vision pipeline.
+
+Stages run in a fixed order on one :class:`~vision.frame.Frame`::
+
+    decode -> objects -> faces -> landmarks -> head_pose -> gaze
+
+Callers pick the stages they need (per exam); the stages those depend on are
+added automatically (``head_pose`` needs ``landmarks``, which needs
+``faces``). Models are obtained through the callables given to the pipeline
+and are only requested when a stage that uses them runs.
+
+With a :class:`~vision.face_tracking.FaceTracker`, the ``faces`` stage of a
+frame that belongs to a session only runs the face detector every few frames
+and tracks the boxes in between. When a frame carries a region-of-interest
+crop, ``landmarks`` and ``gaze`` read the face from the crop.
+"""
+import threading
+
+from . import gaze
+
+STAGES = ("decode", "objects", "faces", "landmarks", "head_pose", "gaze")
+
+_REQUIRES = {
+    "landmarks": ("faces",),
+    "head_pose": ("landmarks",),
+}
+
+FACE_INPUT_SIZE = (300, 300)
+
+
+def resolve_stages(stages):
+    """``stages`` plus their dependencies, in pipeline order."""
+    wanted = set()
+    pending = list(stages)
+    while pending:
+        stage = pending.pop()
+        if stage not in STAGES:
+            raise ValueError(f"Unknown vision stage {stage!r}")
+        if stage not in wanted:
+            wanted.add(stage)
+            pending.extend(_REQUIRES.get(stage, ()))
+    return tuple(stage for stage in STAGES if stage in wanted)
+
+
+class _Lazy:
+    """Calls ``loader()`` once, on first use."""
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._value = self._loader()
+                    self._loaded = True
+        return self._value
+
+
+def _default_face_model():
+    from face_detector import get_face_detector
+    return get_face_detector()
+
+
+def _default_landmark_model():
+    from face_landmarks import get_landmark_model
+    return get_landmark_model()
+
+
+class VisionPipeline:
+    """
+    ``object_detector(frame, conf)`` returns ``Detections`` for a Frame (or
+    ``None`` when no detector is available); ``face_model()`` and
+    ``landmark_model()`` return the OpenCV face detector and the landmark
+    model, or ``None``. ``face_tracker`` is an optional ``FaceTracker``.
+    """
+
+    def __init__(self, object_detector=None, face_model=None, landmark_model=None, conf=0.4,
+                 face_tracker=None):
+        self.object_detector = object_detector
+        self.face_model = face_model or _Lazy(_default_face_model)
+        self.landmark_model = landmark_model or _Lazy(_default_landmark_model)
+        self.conf = conf
+        self.face_tracker = face_tracker
+
+    def run(self, frame, stages=("objects",), object_detector=None, session=None):
+        """
+        Run ``stages`` (and their dependencies) on ``frame``; returns the frame.
+        ``session`` identifies the stream the frame belongs to, for face tracking.
+        """
+        for stage in resolve_stages(stages):
+            getattr(self, f"_{stage}")(frame, object_detector=object_detector, session=session)
+        return frame
+
+    def _decode(self, frame, **options):
+        frame.bgr
+
+    def _objects(self, frame, object_detector=None, **options):
+        detector = object_detector or self.object_detector
+        frame.objects = detector(frame, self.conf) if detector is not None else None
+
+    def _faces(self, frame, session=None, **options):
+        model = self.face_model()
+        if model is None:
+            frame.faces = []
+            return
+        from face_detector import find_faces
+
+        def detect():
+            return find_faces(frame.bgr, model, resized=frame.resized(FACE_INPUT_SIZE))
+
+        if self.face_tracker is not None and session is not None:
+            frame.faces = self.face_tracker.faces(session, frame, detect)
+        else:
+            frame.faces = detect()
+
+    def _landmarks(self, frame, **options):
+        model = self.landmark_model()
+        if model is None or not frame.faces:
+            frame.landmarks = []
+            return
+        import numpy as np
+        from face_landmarks import detect_marks_batch
+
+        # Every face of the frame in one predict call; faces whose box falls
+        # outside the frame get no landmarks and are dropped
+        sources = [frame.face_source(face) for face in frame.faces]
+        marks = detect_marks_batch([(image, box) for image, box, _, _ in sources], model)
+        for i, (face_marks, (_, _, scale, offset)) in enumerate(zip(marks, sources)):
+            if face_marks is not None and scale != (1.0, 1.0):
+                # Back from ROI crop to frame pixels
+                marks[i] = (face_marks / np.array(scale) + np.array(offset)).astype(face_marks.dtype)
+        kept = [(face, face_marks) for face, face_marks in zip(frame.faces, marks) if face_marks is not None]
+        frame.faces = [face for face, _ in kept]
+        frame.landmarks = [face_marks for _, face_marks in kept]
+
+    def _head_pose(self, frame, **options):
+        from . import head_pose
+
+        frame.head_poses = [tuple(angles) for angles in head_pose.estimate_many(frame.landmarks, frame.shape)]
+
+    def _gaze(self, frame, **options):
+        frame.gaze = gaze.direction(frame.roi.bgr if frame.roi is not None else frame.bgr)
+
+
+def signals(frame):
+    """
+    Behaviour flags derived from a frame's face stages, for scoring rules:
+    ``head_up``, ``head_down``, ``head_left``, ``head_right``, ``gaze_left``,
+    ``gaze_right``.
+    """
+    found = set()
+    if frame.head_poses:
+        from . import head_pose
+
+        for pitch, yaw in frame.head_poses:
+            vertical, horizontal = head_pose.directions(pitch, yaw)
+            if vertical == head_pose.HEAD_UP:
+                found.add("head_up")
+            elif vertical == head_pose.HEAD_DOWN:
+                found.add("head_down")
+            if horizontal == head_pose.HEAD_LEFT:
+                found.add("head_left")
+            elif horizontal == head_pose.HEAD_RIGHT:
+                found.add("head_right")
+    if frame.gaze == gaze.GAZE_LEFT:
+        found.add("gaze_left")
+    elif frame.gaze == gaze.GAZE_RIGHT:
+        found.add("gaze_right")
+    return found